@@ -1,21 +1,42 @@
 from __future__ import annotations
 
-from copy import deepcopy
+from functools import lru_cache
 from typing import List
 
+import base64
+import io
+
 import dash
-from dash import Dash, Input, Output, dcc, html
-import plotly.express as px
+from dash import Dash, Input, Output, Patch, State, dash_table, dcc, html
+import numpy as np
 import plotly.graph_objects as go
 
+import dashboard_cache
+import instrumentation
+import jobs
+import metrics_api
 import model
+import optimizer
+import portfolio
 
-baseline_assumptions = model.load_baseline_assumptions()
-baseline_opex = baseline_assumptions["operating_expense_total"]
+baseline_assumptions = model.load_frozen_baseline()
 
 app: Dash = dash.Dash(__name__)
 app.title = "8-Plex Investment Dashboard"
 server = app.server
+result_cache = dashboard_cache.from_environment()
+instrumentation.registry.add_collector(
+    lambda: {f"dashboard_cache_{name}": value for name, value in result_cache.stats().items()},
+    counters=[f"dashboard_cache_{name}" for name in dashboard_cache.COUNTER_STATS],
+)
+instrumentation.register_endpoints(server)
+metrics_api.register_endpoints(server)
+
+
+@lru_cache(maxsize=None)
+def job_manager() -> jobs.JobManager:
+    # Created on first use so importing the app does not create the jobs database.
+    return jobs.JobManager()
 
 
 def format_currency(value: float) -> str:
@@ -26,17 +47,369 @@ def format_percentage(value: float) -> str:
     return f"{value * 100:,.2f}%"
 
 
-def build_metric_cards(metrics: dict) -> List[html.Div]:
-    card_definitions = [
+def metric_card_values(metrics: dict) -> List[tuple[str, str]]:
+    return [
         ("NOI", format_currency(metrics["noi"])),
         ("Cash Flow", format_currency(metrics["cash_flow"])),
         ("Cash on Cash", format_percentage(metrics["cash_on_cash"])),
         ("DSCR", f"{metrics['dscr']:.2f}x"),
         ("Cap Rate", format_percentage(metrics["cap_rate"])),
     ]
+
+
+METRIC_CARD_IDS = ("noi", "cash-flow", "cash-on-cash", "dscr", "cap-rate")
+
+
+def render_metric_cards(card_values) -> List[html.Div]:
+    return [
+        html.Div([html.P(label), html.H3(value, id=f"metric-{card_id}")], className="metric-card")
+        for card_id, (label, value) in zip(METRIC_CARD_IDS, card_values)
+    ]
+
+
+GRID_RESOLUTION = 100
+
+GRID_AXES = {
+    "rate-ltv": {
+        "label": "Interest Rate × Loan to Value",
+        "x": ("interest_rate", "Interest Rate (%)", 100),
+        "y": ("loan_to_value", "Loan to Value (%)", 100),
+    },
+    "price-rent": {
+        "label": "Purchase Price × Rents",
+        "x": ("purchase_price", "Purchase Price", 1),
+        "y": ("rent_scale", "Rents vs Current (%)", 100),
+    },
+}
+
+# Inputs a grid axis replaces outright, and inputs a grid axis is laid out around (see grid_axis_values).
+GRID_AXIS_INPUTS = {"interest-slider": "interest_rate", "ltv-slider": "loan_to_value"}
+RELATIVE_AXIS_INPUTS = {"purchase-price-input": "purchase_price"}
+
+
+def build_assumptions(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct) -> model.FrozenAssumptions:
+    # Looked up per call so workers sharing a reference block pick up a reloaded workbook.
+    baseline = model.load_frozen_baseline()
+    assumptions = baseline
+    overrides = {}
+    if purchase_price:
+        overrides["purchase_price"] = purchase_price
+    if upper_rent:
+        assumptions = assumptions.with_unit(0, rent=upper_rent)
+    if lower_rent:
+        assumptions = assumptions.with_unit(1, rent=lower_rent)
+    if operating_expenses:
+        overrides["operating_expense_total"] = operating_expenses
+        baseline_opex = baseline["operating_expense_total"]
+        scale = operating_expenses / baseline_opex if baseline_opex else 1
+        overrides["operating_expenses"] = {name: value * scale for name, value in baseline["operating_expenses"].items()}
+    if interest_rate_pct is not None:
+        overrides["interest_rate"] = interest_rate_pct / 100
+    if ltv_pct is not None:
+        overrides["loan_to_value"] = ltv_pct / 100
+        overrides["deposit_pct"] = 1 - overrides["loan_to_value"]
+    return assumptions.with_(**overrides) if overrides else assumptions
+
+
+def grid_axis_values(name: str, assumptions: model.Assumptions) -> np.ndarray:
+    if name == "interest_rate":
+        return np.linspace(0.02, 0.07, GRID_RESOLUTION)
+    if name == "loan_to_value":
+        return np.linspace(0.60, 0.95, GRID_RESOLUTION)
+    if name == "purchase_price":
+        price = assumptions["purchase_price"]
+        return np.linspace(price * 0.7, price * 1.3, GRID_RESOLUTION)
+    return np.linspace(0.8, 1.2, GRID_RESOLUTION)
+
+
+def build_heatmap(values: np.ndarray, x: np.ndarray, y: np.ndarray, axes: dict, title: str, colorscale: str) -> go.Figure:
+    _, x_title, x_scale = axes["x"]
+    _, y_title, y_scale = axes["y"]
+    figure = go.Figure(data=[go.Heatmap(z=values, x=x * x_scale, y=y * y_scale, colorscale=colorscale)])
+    figure.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title, template="plotly_white")
+    return figure
+
+
+def build_tornado(tornado) -> go.Figure:
+    figure = go.Figure(
+        data=[
+            go.Bar(y=tornado["label"], x=tornado["low"], orientation="h", name="-10%", marker_color="#e63946"),
+            go.Bar(y=tornado["label"], x=tornado["high"], orientation="h", name="+10%", marker_color="#19a974"),
+        ]
+    )
+    figure.update_layout(
+        title="Annual Cash Flow Sensitivity (±10%)",
+        xaxis_title="Change in USD",
+        barmode="overlay",
+        template="plotly_white",
+    )
+    return figure
+
+
+BREAKDOWN_LABELS = ["Gross Rent", "Other Income", "Operating Expenses", "Debt Service"]
+
+
+def breakdown_values(metrics: dict) -> List[float]:
+    return [
+        metrics["gross_rent_annual"],
+        metrics["other_income_annual"],
+        -metrics["operating_expenses_annual"],
+        -metrics["debt_service_annual"],
+    ]
+
+
+def build_breakdown_figure(values: List[float]) -> go.Figure:
+    figure = go.Figure(
+        data=[go.Bar(x=BREAKDOWN_LABELS, y=values, marker_color=["#0b5fff", "#19a974", "#ff8c42", "#e63946"])]
+    )
+    figure.update_layout(
+        title="Income vs Expense Breakdown (Annual)",
+        yaxis_title="USD",
+        template="plotly_white",
+    )
+    return figure
+
+
+def build_cashflow_figure(months: List[int], values: List[float]) -> go.Figure:
+    figure = go.Figure(
+        data=[go.Scatter(x=months, y=values, mode="lines+markers", line=dict(color="#0b5fff", width=3))]
+    )
+    figure.update_layout(
+        title="Monthly Cash Flow Projection",
+        xaxis_title="Month",
+        yaxis_title="USD per Month",
+        template="plotly_white",
+    )
+    return figure
+
+
+def compute_dashboard(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct) -> dict:
+    assumptions = build_assumptions(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct)
+
+    with instrumentation.stage("dashboard.metrics"):
+        metrics = model.calculate_metrics(assumptions)
+    with instrumentation.stage("dashboard.projection"):
+        cash_flows = model.project_monthly_cash_flows(assumptions)
+
+    return {
+        "metrics": metrics,
+        "cards": metric_card_values(metrics),
+        "breakdown": breakdown_values(metrics),
+        "months": cash_flows["Month"].tolist(),
+        "cashflow": cash_flows["Net Cash Flow"].tolist(),
+    }
+
+
+def dashboard_result(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct) -> dict:
+    inputs = (purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct)
+    key = f"{model.baseline_version()[:16]}:{dashboard_cache.cache_key(inputs)}"
+    with instrumentation.stage("dashboard.cache_lookup"):
+        result = result_cache.get(key)
+    if result is None:
+        result = compute_dashboard(*dashboard_cache.normalize_inputs(inputs))
+        with instrumentation.stage("dashboard.cache_store"):
+            result_cache.put(key, result)
+    return result
+
+
+def compute_sensitivity(assumptions: model.Assumptions, grid_axes: str) -> dict:
+    axes = GRID_AXES[grid_axes or "rate-ltv"]
+    x_name, y_name = axes["x"][0], axes["y"][0]
+    x = grid_axis_values(x_name, assumptions)
+    y = grid_axis_values(y_name, assumptions)
+    grid = model.evaluate_grid(assumptions, x_name, x, y_name, y)
+    return {
+        "axes": axes,
+        "x": x,
+        "y": y,
+        "dscr": grid["dscr"],
+        "cash_on_cash": grid["cash_on_cash"] * 100,
+    }
+
+
+def patch_heatmap(values: np.ndarray, x: np.ndarray, y: np.ndarray, axes: dict, relabel: bool = True) -> Patch:
+    patch = Patch()
+    patch["data"][0]["z"] = values.tolist()
+    if not relabel:
+        return patch
+    _, x_title, x_scale = axes["x"]
+    _, y_title, y_scale = axes["y"]
+    patch["data"][0]["x"] = (x * x_scale).tolist()
+    patch["data"][0]["y"] = (y * y_scale).tolist()
+    patch["layout"]["xaxis"]["title"]["text"] = x_title
+    patch["layout"]["yaxis"]["title"]["text"] = y_title
+    return patch
+
+
+def patch_tornado(tornado) -> Patch:
+    patch = Patch()
+    labels = tornado["label"].tolist()
+    for index, column in enumerate(("low", "high")):
+        patch["data"][index]["y"] = labels
+        patch["data"][index]["x"] = tornado[column].tolist()
+    return patch
+
+
+PORTFOLIO_TABLE_ROWS = 1000
+
+PORTFOLIO_COLUMNS = [
+    {"name": "Rank", "id": "rank", "type": "numeric"},
+    {"name": "Property", "id": "property_id"},
+    {"name": "Name", "id": "name"},
+    {"name": "Price", "id": "purchase_price", "type": "numeric"},
+    {"name": "NOI", "id": "noi", "type": "numeric"},
+    {"name": "Cash Flow", "id": "cash_flow", "type": "numeric"},
+    {"name": "Cash on Cash", "id": "cash_on_cash", "type": "numeric"},
+    {"name": "DSCR", "id": "dscr", "type": "numeric"},
+    {"name": "Cap Rate", "id": "cap_rate", "type": "numeric"},
+    {"name": "Equity", "id": "equity_required", "type": "numeric"},
+]
+
+
+def portfolio_total_cards(totals: dict) -> List[html.Div]:
+    card_definitions = [
+        ("Properties", f"{totals['properties']:,}"),
+        ("Aggregate NOI", format_currency(totals["noi"])),
+        ("Aggregate Cash Flow", format_currency(totals["cash_flow"])),
+        ("Weighted DSCR", f"{totals['weighted_dscr']:.2f}x"),
+        ("Total Equity", format_currency(totals["equity_required"])),
+    ]
     return [html.Div([html.P(label), html.H3(value)], className="metric-card") for label, value in card_definitions]
 
 
+OPTIMIZER_OBJECTIVES = {
+    "cash_on_cash": "Cash on Cash",
+    "cash_flow": "Annual Cash Flow",
+    "dscr": "DSCR",
+    "cap_rate": "Cap Rate",
+}
+OPTIMIZER_DEFAULT_VARIABLES = ["purchase_price", "loan_to_value", "amort_years", "rent_scale"]
+
+
+def build_frontier_figure(pareto=None, best=None) -> go.Figure:
+    equity = [] if pareto is None else pareto["equity_required"].tolist()
+    cash_flow = [] if pareto is None else pareto["cash_flow"].tolist()
+    figure = go.Figure(
+        data=[
+            go.Scatter(x=equity, y=cash_flow, mode="lines+markers", name="Pareto frontier", marker_color="#457b9d"),
+            go.Scatter(
+                x=[] if best is None else [best["equity_required"]],
+                y=[] if best is None else [best["cash_flow"]],
+                mode="markers",
+                name="Best objective",
+                marker={"color": "#e63946", "size": 12, "symbol": "star"},
+            ),
+        ]
+    )
+    figure.update_layout(
+        title="Cash Flow vs. Equity Required",
+        xaxis_title="Equity Required (USD)",
+        yaxis_title="Annual Cash Flow (USD)",
+        template="plotly_white",
+    )
+    return figure
+
+
+def optimizer_summary(result: dict, objective: str) -> str:
+    best = result["best"]
+    if best is None:
+        return f"No feasible deal among {result['evaluated']:,} combinations; relax the constraints."
+    parts = []
+    for name in OPTIMIZER_DEFAULT_VARIABLES + ["interest_rate"]:
+        if name not in best:
+            continue
+        value = best[name]
+        if name == "purchase_price":
+            parts.append(f"price {format_currency(value)}")
+        elif name in ("loan_to_value", "interest_rate"):
+            parts.append(f"{optimizer.OPTIMIZER_VARIABLES[name].lower()} {format_percentage(value)}")
+        elif name == "amort_years":
+            parts.append(f"{value:.0f}-year amortization")
+        else:
+            parts.append(f"rents x{value:.2f}")
+    return (
+        f"Best {OPTIMIZER_OBJECTIVES[objective].lower()}: {', '.join(parts)} -> cash flow {format_currency(best['cash_flow'])}, "
+        f"DSCR {best['dscr']:.2f}x, equity {format_currency(best['equity_required'])} "
+        f"({result['feasible']:,} feasible of {result['evaluated']:,} evaluated)."
+    )
+
+
+JOB_KINDS = {
+    "grid": "High-resolution sensitivity grid",
+    "risk": "Monte Carlo risk (1M paths)",
+    "projection": "40-year IRR surface",
+}
+JOB_GRID_RESOLUTION = 600
+JOB_RISK_PATHS = 1_000_000
+JOB_POLL_MS = 500
+
+
+def job_params(kind: str, assumptions: model.FrozenAssumptions, grid_axes: str | None) -> dict:
+    if kind == "grid":
+        axes = GRID_AXES[grid_axes or "rate-ltv"]
+        params = {"assumptions": assumptions}
+        for axis in ("x", "y"):
+            name = axes[axis][0]
+            values = grid_axis_values(name, assumptions)
+            params[axis] = {"name": name, "low": float(values[0]), "high": float(values[-1]), "points": JOB_GRID_RESOLUTION}
+        return params
+    if kind == "risk":
+        return {"assumptions": assumptions, "paths": JOB_RISK_PATHS}
+    return {
+        "assumptions": assumptions,
+        "years": model.MAX_PROJECTION_YEARS,
+        "rent_growth": {"low": 0.0, "high": 0.05, "points": 51},
+        "exit_cap_rate": {"low": 0.04, "high": 0.08, "points": 41},
+    }
+
+
+def build_job_figure(job: dict | None = None, result: dict | None = None) -> go.Figure:
+    if job is None or result is None:
+        figure = go.Figure()
+        figure.update_layout(title="Background Analysis", template="plotly_white")
+        return figure
+    if job["kind"] == "grid":
+        axes = GRID_AXES[job.get("grid_axes") or "rate-ltv"]
+        x, y = np.asarray(result["x"]), np.asarray(result["y"])
+        return build_heatmap(np.asarray(result["dscr"]), x, y, axes, f"DSCR ({len(x)} x {len(y)})", "RdYlGn")
+    if job["kind"] == "risk":
+        summary = result["cash_flow"]
+        edges = np.asarray(summary["edges"])
+        figure = go.Figure(data=[go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=summary["histogram"], marker_color="#457b9d")])
+        figure.update_layout(
+            title=f"Annual Cash Flow over {result['paths']:,} paths (P(DSCR < {result['dscr_threshold']}) = "
+            f"{format_percentage(result['prob_dscr_below'])})",
+            xaxis_title="Annual Cash Flow (USD)",
+            yaxis_title="Paths",
+            template="plotly_white",
+        )
+        return figure
+    irr = np.asarray(result["irr"], dtype=np.float64) * 100
+    figure = go.Figure(
+        data=[
+            go.Heatmap(
+                z=irr,
+                x=np.asarray(result["rent_growth"]) * 100,
+                y=np.asarray(result["exit_cap_rate"]) * 100,
+                colorscale="RdYlGn",
+            )
+        ]
+    )
+    figure.update_layout(
+        title="Levered IRR (%)",
+        xaxis_title="Annual Rent Growth (%)",
+        yaxis_title="Exit Cap Rate (%)",
+        template="plotly_white",
+    )
+    return figure
+
+
+# Figures are built once here; callbacks below only patch the values that change.
+initial_result = compute_dashboard(None, None, None, None, None, None)
+initial_sensitivity = compute_sensitivity(baseline_assumptions, "rate-ltv")
+initial_tornado = model.sensitivity_tornado(baseline_assumptions)
+
+
 app.layout = html.Div(
     className="page-container",
     children=[
@@ -134,21 +507,159 @@ app.layout = html.Div(
                 ),
             ],
         ),
-        html.Section(id="metrics-container", className="metrics-grid", children=build_metric_cards(model.calculate_metrics(baseline_assumptions))),
+        html.Section(id="metrics-container", className="metrics-grid", children=render_metric_cards(initial_result["cards"])),
+        html.Section(
+            className="charts-grid",
+            children=[
+                dcc.Graph(id="income-breakdown", figure=build_breakdown_figure(initial_result["breakdown"])),
+                dcc.Graph(
+                    id="cashflow-projection",
+                    figure=build_cashflow_figure(initial_result["months"], initial_result["cashflow"]),
+                ),
+            ],
+        ),
+        html.Section(
+            className="controls-grid",
+            children=[
+                html.Div(
+                    className="control-card",
+                    children=[
+                        html.Label("Sensitivity Grid"),
+                        dcc.RadioItems(
+                            id="grid-axes",
+                            options=[{"label": axes["label"], "value": key} for key, axes in GRID_AXES.items()],
+                            value="rate-ltv",
+                        ),
+                    ],
+                ),
+            ],
+        ),
+        html.Section(
+            className="charts-grid",
+            children=[
+                dcc.Graph(
+                    id="dscr-heatmap",
+                    figure=build_heatmap(
+                        initial_sensitivity["dscr"],
+                        initial_sensitivity["x"],
+                        initial_sensitivity["y"],
+                        initial_sensitivity["axes"],
+                        "DSCR",
+                        "RdYlGn",
+                    ),
+                ),
+                dcc.Graph(
+                    id="coc-heatmap",
+                    figure=build_heatmap(
+                        initial_sensitivity["cash_on_cash"],
+                        initial_sensitivity["x"],
+                        initial_sensitivity["y"],
+                        initial_sensitivity["axes"],
+                        "Cash on Cash (%)",
+                        "Blues",
+                    ),
+                ),
+                dcc.Graph(id="cashflow-tornado", figure=build_tornado(initial_tornado)),
+            ],
+        ),
+        html.Section(
+            className="controls-grid",
+            children=[
+                html.Div(
+                    className="control-card",
+                    children=[
+                        html.Label("Optimize For"),
+                        dcc.Dropdown(
+                            id="optimizer-objective",
+                            options=[{"label": label, "value": key} for key, label in OPTIMIZER_OBJECTIVES.items()],
+                            value="cash_on_cash",
+                            clearable=False,
+                        ),
+                    ],
+                ),
+                html.Div(
+                    className="control-card",
+                    children=[
+                        html.Label("Search Over"),
+                        dcc.Checklist(
+                            id="optimizer-variables",
+                            options=[{"label": label, "value": key} for key, label in optimizer.OPTIMIZER_VARIABLES.items()],
+                            value=OPTIMIZER_DEFAULT_VARIABLES,
+                        ),
+                    ],
+                ),
+                html.Div(
+                    className="control-card",
+                    children=[
+                        html.Label("Minimum DSCR"),
+                        dcc.Input(id="optimizer-min-dscr", type="number", value=1.25, step=0.05),
+                        html.Label("Equity Budget (USD)"),
+                        dcc.Input(id="optimizer-equity-budget", type="number", value=500_000, step=10_000),
+                        html.Button("Find best deal", id="optimizer-run"),
+                        html.P(id="optimizer-status"),
+                    ],
+                ),
+            ],
+        ),
         html.Section(
             className="charts-grid",
+            children=[dcc.Graph(id="optimizer-frontier", figure=build_frontier_figure())],
+        ),
+        html.Section(
+            className="controls-grid",
             children=[
-                dcc.Graph(id="income-breakdown"),
-                dcc.Graph(id="cashflow-projection"),
+                html.Div(
+                    className="control-card",
+                    children=[
+                        html.Label("Background Analysis"),
+                        dcc.Dropdown(
+                            id="job-kind",
+                            options=[{"label": label, "value": key} for key, label in JOB_KINDS.items()],
+                            value="grid",
+                            clearable=False,
+                        ),
+                        html.Button("Run in background", id="job-run"),
+                        html.Button("Cancel", id="job-cancel"),
+                        html.Progress(id="job-progress", max=1, value=0),
+                        html.P(id="job-status"),
+                        dcc.Store(id="job"),
+                        dcc.Interval(id="job-poll", interval=JOB_POLL_MS, disabled=True),
+                    ],
+                ),
             ],
         ),
+        html.Section(
+            className="charts-grid",
+            children=[dcc.Graph(id="job-result", figure=build_job_figure())],
+        ),
+        html.Section(
+            className="controls-grid",
+            children=[
+                html.Div(
+                    className="control-card",
+                    children=[
+                        html.Label("Portfolio (CSV or Parquet)"),
+                        dcc.Upload(id="portfolio-upload", children=html.Button("Upload deal pipeline")),
+                        html.P(id="portfolio-status"),
+                    ],
+                ),
+            ],
+        ),
+        html.Section(id="portfolio-totals", className="metrics-grid"),
+        dash_table.DataTable(
+            id="portfolio-table",
+            columns=PORTFOLIO_COLUMNS,
+            data=[],
+            sort_action="native",
+            filter_action="native",
+            page_size=25,
+        ),
     ],
 )
 
 
 @app.callback(
-    Output("metrics-container", "children"),
-    Output("income-breakdown", "figure"),
+    *[Output(f"metric-{card_id}", "children") for card_id in METRIC_CARD_IDS],
     Output("cashflow-projection", "figure"),
     Input("purchase-price-input", "value"),
     Input("upper-rent-slider", "value"),
@@ -156,63 +667,224 @@ app.layout = html.Div(
     Input("opex-slider", "value"),
     Input("interest-slider", "value"),
     Input("ltv-slider", "value"),
+    prevent_initial_call=True,
 )
+@instrumentation.timed("dashboard.update_dashboard")
 def update_dashboard(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct):
-    assumptions = model.load_baseline_assumptions()
-    if purchase_price:
-        assumptions["purchase_price"] = purchase_price
-    if upper_rent:
-        assumptions["unit_mix"][0]["rent"] = upper_rent
-    if lower_rent:
-        assumptions["unit_mix"][1]["rent"] = lower_rent
-    if operating_expenses:
-        assumptions["operating_expense_total"] = operating_expenses
-        scale = operating_expenses / baseline_opex if baseline_opex else 1
-        assumptions["operating_expenses"] = {
-            name: value * scale for name, value in assumptions["operating_expenses"].items()
-        }
-    if interest_rate_pct is not None:
-        assumptions["interest_rate"] = interest_rate_pct / 100
-    if ltv_pct is not None:
-        assumptions["loan_to_value"] = ltv_pct / 100
-        assumptions["deposit_pct"] = 1 - assumptions["loan_to_value"]
+    result = dashboard_result(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct)
+    with instrumentation.stage("dashboard.patch"):
+        cashflow = Patch()
+        cashflow["data"][0]["y"] = result["cashflow"]
+    return (*[value for _, value in result["cards"]], cashflow)
+
+
+@app.callback(
+    Output("income-breakdown", "figure"),
+    Input("upper-rent-slider", "value"),
+    Input("lower-rent-slider", "value"),
+    Input("opex-slider", "value"),
+    State("purchase-price-input", "value"),
+    State("interest-slider", "value"),
+    State("ltv-slider", "value"),
+    prevent_initial_call=True,
+)
+def update_income_breakdown(upper_rent, lower_rent, operating_expenses, purchase_price, interest_rate_pct, ltv_pct):
+    result = dashboard_result(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct)
+    breakdown = Patch()
+    for index in range(3):
+        breakdown["data"][0]["y"][index] = result["breakdown"][index]
+    return breakdown
 
-    metrics = model.calculate_metrics(assumptions)
-    cash_flows = model.project_monthly_cash_flows(assumptions)
 
-    metric_cards = build_metric_cards(metrics)
+@app.callback(
+    Output("income-breakdown", "figure", allow_duplicate=True),
+    Input("purchase-price-input", "value"),
+    Input("interest-slider", "value"),
+    Input("ltv-slider", "value"),
+    State("upper-rent-slider", "value"),
+    State("lower-rent-slider", "value"),
+    State("opex-slider", "value"),
+    prevent_initial_call=True,
+)
+def update_debt_service(purchase_price, interest_rate_pct, ltv_pct, upper_rent, lower_rent, operating_expenses):
+    result = dashboard_result(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct)
+    breakdown = Patch()
+    breakdown["data"][0]["y"][3] = result["breakdown"][3]
+    return breakdown
 
-    breakdown = go.Figure(
-        data=[
-            go.Bar(
-                x=["Gross Rent", "Other Income", "Operating Expenses", "Debt Service"],
-                y=[
-                    metrics["gross_rent_annual"],
-                    metrics["other_income_annual"],
-                    -metrics["operating_expenses_annual"],
-                    -metrics["debt_service_annual"],
-                ],
-                marker_color=["#0b5fff", "#19a974", "#ff8c42", "#e63946"],
-            )
-        ]
-    )
-    breakdown.update_layout(
-        title="Income vs Expense Breakdown (Annual)",
-        yaxis_title="USD",
-        template="plotly_white",
-    )
 
-    cashflow_fig = px.line(
-        cash_flows,
-        x="Month",
-        y="Net Cash Flow",
-        markers=True,
-        title="Monthly Cash Flow Projection",
+def triggered_input() -> str | None:
+    try:
+        return dash.ctx.triggered_id
+    except dash.exceptions.MissingCallbackContextException:
+        return None
+
+
+@app.callback(
+    Output("dscr-heatmap", "figure"),
+    Output("coc-heatmap", "figure"),
+    Input("purchase-price-input", "value"),
+    Input("upper-rent-slider", "value"),
+    Input("lower-rent-slider", "value"),
+    Input("opex-slider", "value"),
+    Input("interest-slider", "value"),
+    Input("ltv-slider", "value"),
+    Input("grid-axes", "value"),
+    prevent_initial_call=True,
+)
+def update_sensitivity(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct, grid_axes):
+    trigger = triggered_input()
+    axes = GRID_AXES[grid_axes or "rate-ltv"]
+    names = (axes["x"][0], axes["y"][0])
+    # The grid overrides its own axes at every cell, so moving one of those sliders leaves both heatmaps unchanged.
+    if GRID_AXIS_INPUTS.get(trigger) in names:
+        return dash.no_update, dash.no_update
+    assumptions = build_assumptions(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct)
+    sensitivity = compute_sensitivity(assumptions, grid_axes)
+    x, y = sensitivity["x"], sensitivity["y"]
+    # Axis values only move when the axes are switched, or when an axis is laid out around the input that moved.
+    relabel = trigger in (None, "grid-axes") or RELATIVE_AXIS_INPUTS.get(trigger) in names
+
+    return (
+        patch_heatmap(sensitivity["dscr"], x, y, axes, relabel),
+        patch_heatmap(sensitivity["cash_on_cash"], x, y, axes, relabel),
     )
-    cashflow_fig.update_traces(line=dict(color="#0b5fff", width=3))
-    cashflow_fig.update_layout(template="plotly_white", yaxis_title="USD per Month")
 
-    return metric_cards, breakdown, cashflow_fig
+
+@app.callback(
+    Output("cashflow-tornado", "figure"),
+    Input("purchase-price-input", "value"),
+    Input("upper-rent-slider", "value"),
+    Input("lower-rent-slider", "value"),
+    Input("opex-slider", "value"),
+    Input("interest-slider", "value"),
+    Input("ltv-slider", "value"),
+    prevent_initial_call=True,
+)
+def update_tornado(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct):
+    assumptions = build_assumptions(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct)
+    return patch_tornado(model.sensitivity_tornado(assumptions))
+
+
+@app.callback(
+    Output("portfolio-totals", "children"),
+    Output("portfolio-table", "data"),
+    Output("portfolio-status", "children"),
+    Input("portfolio-upload", "contents"),
+    State("portfolio-upload", "filename"),
+    prevent_initial_call=True,
+)
+def update_portfolio(contents, filename):
+    if not contents:
+        return [], [], ""
+    _, encoded = contents.split(",", 1)
+    file_format = "parquet" if (filename or "").lower().endswith((".parquet", ".pq")) else "csv"
+    try:
+        result = portfolio.score_portfolio(
+            io.BytesIO(base64.b64decode(encoded)),
+            top_n=PORTFOLIO_TABLE_ROWS,
+            file_format=file_format,
+        )
+    except (ImportError, ValueError, KeyError) as error:
+        return [], [], f"Could not score {filename}: {error}"
+    totals = result["totals"]
+    status = f"Scored {totals['properties']:,} properties from {filename}; showing the top {len(result['rankings']):,}."
+    return portfolio_total_cards(totals), portfolio.ranking_records(result["rankings"]), status
+
+
+@app.callback(
+    Output("optimizer-frontier", "figure"),
+    Output("optimizer-status", "children"),
+    Input("optimizer-run", "n_clicks"),
+    State("optimizer-objective", "value"),
+    State("optimizer-variables", "value"),
+    State("optimizer-min-dscr", "value"),
+    State("optimizer-equity-budget", "value"),
+    State("purchase-price-input", "value"),
+    State("upper-rent-slider", "value"),
+    State("lower-rent-slider", "value"),
+    State("opex-slider", "value"),
+    State("interest-slider", "value"),
+    State("ltv-slider", "value"),
+    prevent_initial_call=True,
+)
+def update_optimizer(
+    n_clicks,
+    objective,
+    variables,
+    min_dscr,
+    equity_budget,
+    purchase_price,
+    upper_rent,
+    lower_rent,
+    operating_expenses,
+    interest_rate_pct,
+    ltv_pct,
+):
+    if not variables:
+        return dash.no_update, "Pick at least one input to search over."
+    assumptions = build_assumptions(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct)
+    constraints = {"dscr": (min_dscr, None), "equity_required": (None, equity_budget)}
+    result = optimizer.optimize(assumptions, variables, objective=objective, constraints=constraints)
+    return build_frontier_figure(result["pareto"], result["best"]), optimizer_summary(result, objective)
+
+
+@app.callback(
+    Output("job", "data"),
+    Output("job-poll", "disabled"),
+    Output("job-status", "children"),
+    Input("job-run", "n_clicks"),
+    State("job-kind", "value"),
+    State("grid-axes", "value"),
+    State("purchase-price-input", "value"),
+    State("upper-rent-slider", "value"),
+    State("lower-rent-slider", "value"),
+    State("opex-slider", "value"),
+    State("interest-slider", "value"),
+    State("ltv-slider", "value"),
+    prevent_initial_call=True,
+)
+def start_job(n_clicks, kind, grid_axes, purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct):
+    # Heavy work runs in the job pool; this callback returns as soon as the job is queued.
+    assumptions = build_assumptions(purchase_price, upper_rent, lower_rent, operating_expenses, interest_rate_pct, ltv_pct)
+    job_id = job_manager().submit(kind, job_params(kind, assumptions, grid_axes))
+    return {"id": job_id, "kind": kind, "grid_axes": grid_axes}, False, f"{JOB_KINDS[kind]} queued."
+
+
+@app.callback(
+    Output("job-status", "children", allow_duplicate=True),
+    Input("job-cancel", "n_clicks"),
+    State("job", "data"),
+    prevent_initial_call=True,
+)
+def cancel_job(n_clicks, job):
+    if not job:
+        return dash.no_update
+    return "Cancelling..." if job_manager().cancel(job["id"]) else dash.no_update
+
+
+@app.callback(
+    Output("job-progress", "value"),
+    Output("job-status", "children", allow_duplicate=True),
+    Output("job-result", "figure"),
+    Output("job-poll", "disabled", allow_duplicate=True),
+    Input("job-poll", "n_intervals"),
+    State("job", "data"),
+    prevent_initial_call=True,
+)
+def poll_job(n_intervals, job):
+    status = job_manager().status(job["id"]) if job else None
+    if status is None:
+        return 0, "", dash.no_update, True
+    label = JOB_KINDS[status["kind"]]
+    if status["status"] == jobs.DONE:
+        return 1, f"{label} finished.", build_job_figure(job, job_manager().result(job["id"])), True
+    if status["status"] == jobs.FAILED:
+        return status["progress"], f"{label} failed: {status['error']}", dash.no_update, True
+    if status["status"] == jobs.CANCELLED:
+        return status["progress"], f"{label} cancelled.", dash.no_update, True
+    detail = f" ({status['message']})" if status["message"] else ""
+    return status["progress"], f"{label} {status['status']}: {status['progress']:.0%}{detail}", dash.no_update, False
 
 
 if __name__ == "__main__":
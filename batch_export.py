@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Mapping, Optional, Union
+
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+import model
+
+ExportTarget = Union[str, Path, IO[bytes]]
+
+EXPORT_FORMATS = ("xlsx", "parquet")
+XLSX_MAX_ROWS = 1_048_576
+DEFAULT_ROW_GROUP_SIZE = 100_000
+DEFAULT_SCENARIO_CHUNK = 1_000
+
+INTEGER_COLUMNS = ("row", "scenario", "month")
+STRING_COLUMNS = ("id", "error", "name", "file")
+LIST_COLUMNS = ("monthly_net_cash_flow",)
+
+WORKBOOK_TITLE = "8plex model - UofA"
+WORKBOOK_SHEET = "UofA"
+MONTHLY_SHEET = "Monthly"
+
+# Headers and number formats follow the labels and formats of the matching cells in 8plexmodel.xlsx.
+WORKBOOK_LAYOUT: Dict[str, tuple[str, str]] = {
+    "row": ("Row", "General"),
+    "id": ("Scenario", "General"),
+    "error": ("Error", "General"),
+    "scenario": ("Scenario #", "General"),
+    "month": ("Month", "General"),
+    "purchase_price": ("Purchase price", "#,##0"),
+    "gross_rent_annual": ("Rent (annual)", "#,##0"),
+    "other_income_annual": ("Other income (annual)", "#,##0"),
+    "total_income_annual": ("Total including other income", "#,##0"),
+    "operating_expenses_annual": ("Total Op Ex", "#,##0"),
+    "noi": ("Net Operating Income", "#,##0"),
+    "monthly_debt_service": ("Debt service (monthly)", "#,##0"),
+    "debt_service_annual": ("Debt service (annual)", "#,##0"),
+    "cash_flow": ("CF after debt", "#,##0"),
+    "cash_on_cash": ("Cash on cash", "0.0%"),
+    "dscr": ("DSCR", "0.0%"),
+    "cap_rate": ("Cap rate", "0.0%"),
+    "equity_required": ("Deposit", "#,##0"),
+    "total_loan": ("Total loan size", "#,##0"),
+    "exit_value": ("Exit value", "#,##0"),
+    "exit_proceeds": ("Exit proceeds", "#,##0"),
+    "ending_loan_balance": ("Ending loan balance", "#,##0"),
+    "irr": ("IRR", "0.0%"),
+    "equity_multiple": ("Equity multiple", "0.00"),
+    **{name: (label, "#,##0") for name, label in model.PROJECTION_LABELS.items()},
+}
+
+
+def _file_format(target: ExportTarget, file_format: Optional[str]) -> str:
+    if file_format:
+        return file_format
+    name = str(target) if isinstance(target, (str, Path)) else str(getattr(target, "name", ""))
+    return "parquet" if name.lower().endswith((".parquet", ".pq")) else "xlsx"
+
+
+class XlsxExporter:
+    def __init__(
+        self,
+        target: ExportTarget,
+        columns: List[str],
+        sheet: str = "Results",
+        layout: bool = False,
+        max_rows: int = XLSX_MAX_ROWS,
+    ) -> None:
+        from openpyxl import Workbook
+
+        unsupported = [name for name in columns if name in LIST_COLUMNS]
+        if unsupported:
+            raise ValueError(f"Columns {unsupported} hold series and cannot be written to xlsx cells")
+        self.target = target
+        self.columns = columns
+        self.sheet = WORKBOOK_SHEET if layout and sheet == "Results" else sheet
+        self.layout = layout
+        self.max_rows = max_rows
+        self.rows = 0
+        self._workbook = Workbook(write_only=True)
+        self._worksheet = None
+        self._sheets = 0
+        self._sheet_rows = 0
+        self._cells: List[Any] = []
+
+    def _new_sheet(self) -> None:
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        self._sheets += 1
+        title = self.sheet if self._sheets == 1 else f"{self.sheet} ({self._sheets})"
+        worksheet = self._workbook.create_sheet(title)
+        if self.layout:
+            # Mirrors the UofA sheet: title in B2, labels from row 4, column B wide enough for them.
+            worksheet.column_dimensions["B"].width = 31.66
+            worksheet.freeze_panes = "C5"
+            heading = WriteOnlyCell(worksheet, value=WORKBOOK_TITLE)
+            heading.font = Font(bold=True)
+            worksheet.append([])
+            worksheet.append([None, heading])
+            worksheet.append([])
+            worksheet.append([None, *(WORKBOOK_LAYOUT.get(name, (name, ""))[0] for name in self.columns)])
+            # openpyxl serializes each row on append, so one styled cell per column is reused for every row.
+            self._cells = [None]
+            for name in self.columns:
+                cell = WriteOnlyCell(worksheet)
+                cell.number_format = WORKBOOK_LAYOUT.get(name, (name, "General"))[1]
+                self._cells.append(cell)
+            self._sheet_rows = 4
+        else:
+            worksheet.freeze_panes = "A2"
+            worksheet.append(list(self.columns))
+            self._sheet_rows = 1
+        self._worksheet = worksheet
+
+    def write(self, frame: pd.DataFrame) -> None:
+        values = frame[self.columns].astype(object)
+        values = values.where(frame[self.columns].notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if self._worksheet is None or self._sheet_rows >= self.max_rows:
+                self._new_sheet()
+            if self.layout:
+                for cell, value in zip(self._cells[1:], row):
+                    cell.value = value
+                self._worksheet.append(self._cells)
+            else:
+                self._worksheet.append(row)
+            self._sheet_rows += 1
+        self.rows += len(frame)
+
+    def close(self) -> None:
+        if self._worksheet is None:
+            self._new_sheet()
+        self._workbook.save(self.target)
+
+
+def arrow_schema(columns: List[str], types: Mapping[str, Any] | None = None):
+    import pyarrow as pa
+
+    fields = []
+    for name in columns:
+        if types and name in types:
+            fields.append(pa.field(name, types[name]))
+        elif name in INTEGER_COLUMNS:
+            fields.append(pa.field(name, pa.int64()))
+        elif name in STRING_COLUMNS:
+            fields.append(pa.field(name, pa.string()))
+        elif name in LIST_COLUMNS:
+            fields.append(pa.field(name, pa.list_(pa.float64())))
+        else:
+            fields.append(pa.field(name, pa.float64()))
+    return pa.schema(fields)
+
+
+class ParquetExporter:
+    def __init__(
+        self,
+        target: ExportTarget,
+        columns: List[str],
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        types: Mapping[str, Any] | None = None,
+        compression: str = "snappy",
+    ) -> None:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise ImportError("Writing Parquet requires pyarrow (pip install pyarrow)") from error
+        self.columns = columns
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self.schema = arrow_schema(columns, types)
+        self._writer = pq.ParquetWriter(target, self.schema, compression=compression)
+        self._pending: List[Any] = []
+        self._pending_rows = 0
+
+    def _flush(self, final: bool = False) -> None:
+        import pyarrow as pa
+
+        if not self._pending:
+            return
+        table = pa.concat_tables(self._pending)
+        # Only whole row groups are written until close, so every group but the last has the same size.
+        full = len(table) if final else len(table) - len(table) % self.row_group_size
+        if full:
+            self._writer.write_table(table.slice(0, full), row_group_size=self.row_group_size)
+        remainder = table.slice(full)
+        self._pending = [remainder] if len(remainder) else []
+        self._pending_rows = len(remainder)
+
+    def write(self, frame: pd.DataFrame) -> None:
+        import pyarrow as pa
+
+        self._pending.append(pa.Table.from_pandas(frame[self.columns], schema=self.schema, preserve_index=False))
+        self._pending_rows += len(frame)
+        self.rows += len(frame)
+        if self._pending_rows >= self.row_group_size:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush(final=True)
+        self._writer.close()
+
+
+def open_exporter(
+    target: ExportTarget,
+    columns: List[str],
+    file_format: str | None = None,
+    layout: bool = False,
+    **options: Any,
+) -> Union[XlsxExporter, ParquetExporter]:
+    file_format = _file_format(target, file_format)
+    if file_format == "parquet":
+        return ParquetExporter(target, columns, **options)
+    if file_format == "xlsx":
+        return XlsxExporter(target, columns, layout=layout, **options)
+    raise ValueError(f"Unknown export format {file_format!r}; expected one of {EXPORT_FORMATS}")
+
+
+def export_frames(
+    frames: Iterable[pd.DataFrame],
+    target: ExportTarget,
+    columns: List[str] | None = None,
+    file_format: str | None = None,
+    layout: bool = False,
+    **options: Any,
+) -> int:
+    exporter = None
+    try:
+        for frame in frames:
+            if exporter is None:
+                exporter = open_exporter(target, columns or [str(name) for name in frame.columns], file_format, layout, **options)
+            exporter.write(frame)
+        if exporter is None:
+            if columns is None:
+                raise ValueError("columns are required to export an empty result set")
+            exporter = open_exporter(target, columns, file_format, layout, **options)
+    except BaseException:
+        # Release the file, but let the original error propagate rather than one raised while closing.
+        if exporter is not None:
+            with contextlib.suppress(Exception):
+                exporter.close()
+        raise
+    exporter.close()
+    return exporter.rows
+
+
+def _scenario_chunks(scenarios: Union[pd.DataFrame, Iterable[pd.DataFrame]], chunk_size: int) -> Iterator[pd.DataFrame]:
+    if isinstance(scenarios, pd.DataFrame):
+        for start in range(0, len(scenarios), chunk_size):
+            yield scenarios.iloc[start : start + chunk_size]
+    else:
+        yield from scenarios
+
+
+def iter_monthly_projections(
+    scenarios: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    years: int = 1,
+    chunk_size: int = DEFAULT_SCENARIO_CHUNK,
+    **options: Any,
+) -> Iterator[pd.DataFrame]:
+    start = 0
+    for chunk in _scenario_chunks(scenarios, chunk_size):
+        if chunk.empty:
+            continue
+        projection = model.project_cash_flows_batch(chunk, years=years, detail=True, **{"irr": False, **options})
+        months = len(projection["month"])
+        count = len(chunk)
+        # Series come back as (month, scenario); transposing gives one scenario's months as consecutive rows.
+        frame = pd.DataFrame(
+            {
+                "scenario": np.repeat(np.arange(start, start + count), months),
+                "month": np.tile(projection["month"], count),
+                **{name: projection[name].T.reshape(-1) for name in model.PROJECTION_SERIES},
+            }
+        )
+        if "id" in chunk:
+            frame.insert(1, "id", np.repeat(chunk["id"].astype(str).to_numpy(), months))
+        start += count
+        yield frame
+
+
+def export_monthly_projections(
+    scenarios: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    target: ExportTarget,
+    years: int = 1,
+    file_format: str | None = None,
+    layout: bool = False,
+    chunk_size: int = DEFAULT_SCENARIO_CHUNK,
+    projection_options: Mapping[str, Any] | None = None,
+    **options: Any,
+) -> int:
+    if _file_format(target, file_format) == "xlsx":
+        options.setdefault("sheet", MONTHLY_SHEET)
+    frames = iter_monthly_projections(scenarios, years, chunk_size, **(projection_options or {}))
+    return export_frames(frames, target, file_format=file_format, layout=layout, **options)
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINE_PATH = Path(__file__).resolve().with_name("baseline.json")
+DEFAULT_THRESHOLD = 0.5
+BATCH_SIZES = (1_000, 100_000, 1_000_000)
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def best_of(function: Callable[[], object], repeat: int = 5, number: int | None = None) -> float:
+    if number is None:
+        number, _ = timeit.Timer(function).autorange()
+    return min(timeit.repeat(function, repeat=repeat, number=number)) / number
+
+
+def import_seconds(module: str, repeat: int = 3) -> float:
+    def spawn(code: str) -> float:
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+        return time.perf_counter() - started
+
+    interpreter = min(spawn("pass") for _ in range(repeat))
+    return max(min(spawn(f"import {module}") for _ in range(repeat)) - interpreter, 0.0)
+
+
+def model_benchmarks() -> Dict[str, Callable[[], float]]:
+    import model
+
+    assumptions = model.load_baseline_assumptions()
+    monthly_payment = model.calculate_metrics(assumptions)["monthly_debt_service"]
+    total_loan = model.calculate_metrics(assumptions)["total_loan"]
+
+    benchmarks: Dict[str, Callable[[], float]] = {
+        "model.calculate_metrics": lambda: best_of(lambda: model.calculate_metrics(assumptions)),
+        "model.project_monthly_cash_flows": lambda: best_of(lambda: model.project_monthly_cash_flows(assumptions)),
+        "model._infer_interest_rate": lambda: best_of(
+            lambda: model._infer_interest_rate(monthly_payment, total_loan, assumptions["amort_years"])
+        ),
+        "model.load_baseline_assumptions": lambda: best_of(model.load_baseline_assumptions),
+    }
+    for size in BATCH_SIZES:
+        benchmarks[f"model.calculate_metrics_batch[{size}]"] = _batch_benchmark(model, assumptions, size)
+    return benchmarks
+
+
+def _batch_benchmark(model, assumptions, size: int) -> Callable[[], float]:
+    def run() -> float:
+        frame = model.scenario_frame([assumptions]).iloc[[0] * size].reset_index(drop=True)
+        return best_of(lambda: model.calculate_metrics_batch(frame), repeat=3, number=1)
+
+    return run
+
+
+def app_benchmarks() -> Dict[str, Callable[[], float]]:
+    inputs = (2_400_000, 2500, 1500, 60000, 4.5, 80)
+
+    # app is imported inside each benchmark so model-only runs never pay for Dash.
+    def cold() -> float:
+        import app
+
+        def call() -> None:
+            app.result_cache.clear()
+            app.update_dashboard(*inputs)
+
+        return best_of(call)
+
+    def cached() -> float:
+        import app
+
+        return best_of(lambda: app.update_dashboard(*inputs))
+
+    def sensitivity() -> float:
+        import app
+
+        return best_of(lambda: (app.update_sensitivity(*inputs, "rate-ltv"), app.update_tornado(*inputs)), repeat=3)
+
+    return {
+        "app.update_dashboard[cold]": cold,
+        "app.update_dashboard[cached]": cached,
+        "app.update_sensitivity": sensitivity,
+    }
+
+
+def startup_benchmarks() -> Dict[str, Callable[[], float]]:
+    return {
+        "import.model": lambda: import_seconds("model"),
+        "import.app": lambda: import_seconds("app"),
+    }
+
+
+def collect(selected: Optional[List[str]] = None, skip_large: bool = False) -> Dict[str, float]:
+    benchmarks: Dict[str, Callable[[], float]] = {}
+    for group in (model_benchmarks, app_benchmarks, startup_benchmarks):
+        benchmarks.update(group())
+    results: Dict[str, float] = {}
+    for name, benchmark in benchmarks.items():
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        if skip_large and name.endswith(f"[{BATCH_SIZES[-1]}]"):
+            continue
+        results[name] = benchmark()
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    regressions = []
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        if reference and seconds > reference * (1 + threshold):
+            regressions.append(f"{name}: {seconds * 1e6:,.1f} us vs baseline {reference * 1e6:,.1f} us (+{seconds / reference - 1:.0%})")
+    return regressions
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.system(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark model hot paths, dashboard callbacks and startup.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, e.g. 0.5 = 50%%")
+    parser.add_argument("--update", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--only", action="append", help="run benchmarks whose name contains this text")
+    parser.add_argument("--quick", action="store_true", help="skip the 1M-scenario batch benchmark")
+    parser.add_argument("--output", type=Path, help="also write this run's results as JSON")
+    args = parser.parse_args(argv)
+
+    results = collect(args.only, skip_large=args.quick)
+    for name, seconds in results.items():
+        print(f"{name:45s} {seconds * 1e6:14,.1f} us")
+
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True))
+    if args.update:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"results": {}}
+        baseline["environment"] = report["environment"]
+        baseline["results"].update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update to record one.")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text())["results"], args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock, local
+from typing import Any, Dict, Iterable, Optional
+
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SHARED_CACHE_ENV = "DASHBOARD_CACHE_PATH"
+COUNTER_STATS = ("hits", "shared_hits", "misses", "evictions")
+
+# Decimal places kept per dashboard input; finer slider noise maps onto the same cache entry.
+INPUT_PRECISION = (2, 2, 2, 2, 4, 4)
+
+
+def normalize_inputs(values: Iterable[Any], precision: Iterable[int] = INPUT_PRECISION) -> tuple:
+    normalized = []
+    for value, digits in zip(values, precision):
+        if value is None or value == "":
+            normalized.append(None)
+        else:
+            normalized.append(round(float(value), digits))
+    return tuple(normalized)
+
+
+def cache_key(values: Iterable[Any]) -> str:
+    return json.dumps(normalize_inputs(values), separators=(",", ":"))
+
+
+class _SharedStore:
+    def __init__(self, path: Path, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._local = local()
+        connection = self._connection()
+        # WAL is a property of the database file, so it is set once here rather than on every connection.
+        connection.execute("pragma journal_mode=wal")
+        connection.execute(
+            "create table if not exists results (key text primary key, payload blob not null, accessed real not null)"
+        )
+        connection.execute("create index if not exists results_accessed on results (accessed)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, reused across lookups; it closes when its thread's locals are released.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("pragma synchronous=normal")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[bytes]:
+        connection = self._connection()
+        row = connection.execute("select payload from results where key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute("update results set accessed = ? where key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key: str, payload: bytes) -> None:
+        connection = self._connection()
+        connection.execute(
+            "insert or replace into results (key, payload, accessed) values (?, ?, ?)",
+            (key, payload, time.time()),
+        )
+        connection.execute(
+            "delete from results where key in "
+            "(select key from results order by accessed desc limit -1 offset ?)",
+            (self.max_entries,),
+        )
+
+
+class ResultCache:
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        shared_path: str | Path | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self._shared = _SharedStore(Path(shared_path), max_entries) if shared_path else None
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(payload)
+        if self._shared is not None:
+            payload = self._shared.get(key)
+            if payload is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                    self._store(key, payload)
+                return json.loads(payload)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Dict[str, Any], encoder: type[json.JSONEncoder] | None = None) -> None:
+        payload = json.dumps(value, cls=encoder, separators=(",", ":")).encode()
+        with self._lock:
+            self._store(key, payload)
+        if self._shared is not None:
+            self._shared.put(key, payload)
+
+    def _store(self, key: str, payload: bytes) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        if len(payload) > self.max_bytes:
+            return
+        self._entries[key] = payload
+        self._bytes += len(payload)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+def from_environment() -> ResultCache:
+    return ResultCache(
+        max_entries=int(os.environ.get("DASHBOARD_CACHE_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        max_bytes=int(os.environ.get("DASHBOARD_CACHE_BYTES", DEFAULT_MAX_BYTES)),
+        shared_path=os.environ.get(SHARED_CACHE_ENV) or None,
+    )
@@ -0,0 +1,24 @@
+import os
+
+import shared_tables
+
+wsgi_app = "app:server"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8050")
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+def on_starting(server):
+    # Built once in the master before forking; workers inherit the env vars, including the instance token
+    # (the master's PID unless EIGHTPLEX_SHARED_TABLES_INSTANCE is set), and map the block read-only.
+    path = shared_tables.configure()
+    server.log.info("Reference tables in %s", path)
+
+
+def on_reload(server):
+    path = shared_tables.configure()
+    server.log.info("Reference tables in %s", path)
+
+
+def on_exit(server):
+    # Removes only this instance's blocks; other servers sharing the directory keep theirs.
+    shared_tables.cleanup()
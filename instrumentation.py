@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from threading import Event, Lock, Thread, get_ident
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+import os
+import sys
+
+METRICS_ENV = "EIGHTPLEX_METRICS"
+PROFILE_ENV = "EIGHTPLEX_PROFILE_INTERVAL"
+METRIC_PREFIX = "eightplex"
+UNMATCHED_ROUTE = "unmatched"
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.enabled = os.environ.get(METRICS_ENV, "").lower() in ("1", "true", "yes", "on")
+        self._histograms: Dict[str, _Histogram] = {}
+        self._collectors: List[Tuple[Callable[[], Dict[str, float]], frozenset]] = []
+        self._lock = Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = _Histogram()
+            histogram.counts[bisect_left(BUCKETS, seconds)] += 1
+            histogram.total += seconds
+            histogram.count += 1
+
+    def add_collector(self, collector: Callable[[], Dict[str, float]], counters: Iterable[str] = ()) -> None:
+        # Metrics named in counters only ever increase; everything else is exported as a gauge.
+        self._collectors.append((collector, frozenset(counters)))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                stage: {"counts": list(histogram.counts), "sum": histogram.total, "count": histogram.count}
+                for stage, histogram in self._histograms.items()
+            }
+
+    def render(self) -> str:
+        name = f"{METRIC_PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Latency of instrumented model and dashboard stages.",
+            f"# TYPE {name} histogram",
+        ]
+        for stage, histogram in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, "+Inf"), histogram["counts"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram["sum"]:.9f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram["count"]}')
+        for collector, counters in self._collectors:
+            for metric, value in sorted(collector().items()):
+                lines.append(f"# TYPE {METRIC_PREFIX}_{metric} {'counter' if metric in counters else 'gauge'}")
+                lines.append(f"{METRIC_PREFIX}_{metric} {value}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_instrumentation_enabled gauge")
+        lines.append(f"{METRIC_PREFIX}_instrumentation_enabled {int(self.enabled)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+_DISABLED_STAGE = nullcontext()
+
+
+def enable(enabled: bool = True) -> None:
+    registry.enabled = enabled
+
+
+def timed(stage: str) -> Callable[[F], F]:
+    def decorate(function: F) -> F:
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            # Disabled cost is this one attribute check.
+            if not registry.enabled:
+                return function(*args, **kwargs)
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                registry.observe(stage, perf_counter() - started)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+@contextmanager
+def _measure(name: str) -> Iterator[None]:
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, perf_counter() - started)
+
+
+def stage(name: str):
+    if not registry.enabled:
+        return _DISABLED_STAGE
+    return _measure(name)
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, max_depth: int = 64) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter[str] = Counter()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._lock = Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own = get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                with self._lock:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples.clear()
+
+
+profiler: Optional[SamplingProfiler] = None
+
+
+def register_endpoints(server, path: str = "/metrics") -> None:
+    from flask import Response, g, request
+
+    global profiler
+    interval = os.environ.get(PROFILE_ENV)
+    if interval and profiler is None:
+        profiler = SamplingProfiler(float(interval))
+        profiler.start()
+
+    @server.before_request
+    def _start_request_timer() -> None:
+        if registry.enabled:
+            g.instrumentation_started = perf_counter()
+
+    @server.after_request
+    def _observe_request(response):
+        started = g.pop("instrumentation_started", None)
+        if started is not None:
+            # Includes Dash's JSON serialization of callback outputs, which happens after the callback returns.
+            # Labelled by route pattern, not path, so arbitrary URLs (and 404 probes) cannot grow the label set.
+            route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+            registry.observe(f"http {route}", perf_counter() - started)
+        return response
+
+    @server.route(path)
+    def _metrics() -> Response:
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    @server.route(f"{path}/profile")
+    def _profile() -> Response:
+        if profiler is None:
+            return Response(f"Sampling profiler disabled; set {PROFILE_ENV}.\n", status=404, mimetype="text/plain")
+        return Response(profiler.collapsed(), mimetype="text/plain")
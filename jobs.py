@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional
+
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import numpy as np
+
+import model
+
+DATA_DIR = Path(__file__).resolve().with_name("data")
+DEFAULT_JOBS_PATH = DATA_DIR / "jobs.sqlite3"
+JOBS_PATH_ENV = "EIGHTPLEX_JOBS_PATH"
+JOB_WORKERS_ENV = "EIGHTPLEX_JOB_WORKERS"
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+_STATUS_COLUMNS = ("id", "kind", "input_hash", "status", "progress", "message", "error", "created_at", "updated_at")
+_PROGRESS_INTERVAL = 0.1
+
+Task = Callable[[Mapping[str, Any], "Progress"], Any]
+TASKS: Dict[str, Task] = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def task(name: str) -> Callable[[Task], Task]:
+    def register(function: Task) -> Task:
+        TASKS[name] = function
+        return function
+
+    return register
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, model.FrozenAssumptions):
+        return value.to_dict()
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    if isinstance(value, tuple):
+        return list(value)
+    return str(value)
+
+
+def input_hash(kind: str, params: Mapping[str, Any]) -> str:
+    payload = json.dumps({"kind": kind, "params": params}, sort_keys=True, separators=(",", ":"), default=_json_default)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+@contextmanager
+def _connect(path: Path) -> Iterator[sqlite3.Connection]:
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    try:
+        connection.row_factory = sqlite3.Row
+        connection.execute("pragma synchronous=normal")
+        yield connection
+    finally:
+        connection.close()
+
+
+def _update(path: Path, job_id: str, **fields: Any) -> None:
+    fields["updated_at"] = _now()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with _connect(path) as connection:
+        connection.execute(f"update jobs set {assignments} where id = ?", (*fields.values(), job_id))
+
+
+class Progress:
+    def __init__(self, path: Path, job_id: str) -> None:
+        self.path = path
+        self.job_id = job_id
+        self._reported = 0.0
+
+    def __call__(self, fraction: float, message: str = "") -> None:
+        now = time.monotonic()
+        if fraction < 1 and now - self._reported < _PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        # One round trip both records progress and picks up a pending cancellation.
+        with _connect(self.path) as connection:
+            row = connection.execute(
+                "update jobs set progress = ?, message = ?, updated_at = ? where id = ? returning cancel_requested",
+                (min(max(float(fraction), 0.0), 1.0), message, _now(), self.job_id),
+            ).fetchone()
+        if row is not None and row["cancel_requested"]:
+            raise JobCancelled(self.job_id)
+
+
+def _run(path: Path, job_id: str, function: Task, params: Mapping[str, Any]) -> None:
+    _update(path, job_id, status=RUNNING)
+    try:
+        result = function(params, Progress(path, job_id))
+    except JobCancelled:
+        _update(path, job_id, status=CANCELLED, message="Cancelled")
+        return
+    except Exception as error:
+        _update(path, job_id, status=FAILED, error=f"{type(error).__name__}: {error}")
+        return
+    payload = json.dumps(result, separators=(",", ":"), default=_json_default)
+    _update(path, job_id, status=DONE, progress=1.0, result=payload)
+
+
+class JobManager:
+    def __init__(self, path: str | Path | None = None, workers: int | None = None) -> None:
+        self.path = Path(path or os.environ.get(JOBS_PATH_ENV) or DEFAULT_JOBS_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = workers or int(os.environ.get(JOB_WORKERS_ENV, 0)) or os.cpu_count() or 1
+        self._executor: ProcessPoolExecutor | None = None
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        with _connect(self.path) as connection:
+            # WAL is a property of the database file, so it is set once here rather than on every connection.
+            connection.execute("pragma journal_mode=wal")
+            connection.execute(
+                "create table if not exists jobs ("
+                "id text primary key, kind text not null, input_hash text not null, status text not null, "
+                "progress real not null default 0, message text not null default '', "
+                "cancel_requested integer not null default 0, result text, error text, "
+                "created_at text not null, updated_at text not null)"
+            )
+            connection.execute("create index if not exists jobs_input_hash on jobs (input_hash, status)")
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking a threaded server copies its locks and SQLite state mid-use, so workers start from a clean process.
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    def submit(self, kind: str, params: Mapping[str, Any]) -> str:
+        if kind not in TASKS:
+            raise ValueError(f"Unknown job kind {kind!r}; expected one of {sorted(TASKS)}")
+        digest = input_hash(kind, params)
+        with self._lock:
+            # Identical inputs reuse a finished result, or join a job this process already has in flight.
+            with _connect(self.path) as connection:
+                row = connection.execute(
+                    "select id from jobs where input_hash = ? and status = ? order by updated_at desc limit 1",
+                    (digest, DONE),
+                ).fetchone()
+            if row is not None:
+                return row["id"]
+            for job_id, future in self._futures.items():
+                if not future.done() and self._hash_of(job_id) == digest and not self._cancel_requested(job_id):
+                    return job_id
+
+            job_id = uuid.uuid4().hex
+            created_at = _now()
+            with _connect(self.path) as connection:
+                connection.execute(
+                    "insert into jobs (id, kind, input_hash, status, created_at, updated_at) values (?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, digest, QUEUED, created_at, created_at),
+                )
+            # The task function travels by reference, so kinds registered outside this module resolve in the worker too.
+            future = self._pool().submit(_run, self.path, job_id, TASKS[kind], dict(params))
+            self._futures[job_id] = future
+        future.add_done_callback(lambda future, job_id=job_id: self._finished(job_id, future))
+        return job_id
+
+    def _hash_of(self, job_id: str) -> Optional[str]:
+        with _connect(self.path) as connection:
+            row = connection.execute("select input_hash from jobs where id = ?", (job_id,)).fetchone()
+        return row["input_hash"] if row is not None else None
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        with _connect(self.path) as connection:
+            row = connection.execute("select cancel_requested from jobs where id = ?", (job_id,)).fetchone()
+        return bool(row is not None and row["cancel_requested"])
+
+    def _finished(self, job_id: str, future: Future) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            _update(self.path, job_id, status=CANCELLED, message="Cancelled")
+        elif future.exception() is not None:
+            # The worker died before it could record the outcome itself.
+            error = future.exception()
+            _update(self.path, job_id, status=FAILED, error=f"{type(error).__name__}: {error}")
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with _connect(self.path) as connection:
+            row = connection.execute(f"select {', '.join(_STATUS_COLUMNS)} from jobs where id = ?", (job_id,)).fetchone()
+        return {name: row[name] for name in _STATUS_COLUMNS} if row is not None else None
+
+    def result(self, job_id: str) -> Any:
+        with _connect(self.path) as connection:
+            row = connection.execute("select result from jobs where id = ? and status = ?", (job_id, DONE)).fetchone()
+        return json.loads(row["result"]) if row is not None else None
+
+    def cancel(self, job_id: str) -> bool:
+        with _connect(self.path) as connection:
+            changed = connection.execute(
+                "update jobs set cancel_requested = 1, updated_at = ? where id = ? and status in (?, ?)",
+                (_now(), job_id, QUEUED, RUNNING),
+            ).rowcount
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+        return changed > 0
+
+    def wait(self, job_id: str, timeout: float | None = None) -> Optional[Dict[str, Any]]:
+        future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.exception(timeout)
+            except Exception:
+                pass
+        return self.status(job_id)
+
+    def clear(self, older_than: float | None = None) -> int:
+        query = "delete from jobs where status in (?, ?, ?)"
+        parameters: list = list(FINISHED_STATES)
+        if older_than is not None:
+            cutoff = datetime.fromtimestamp(time.time() - older_than, timezone.utc)
+            query += " and updated_at < ?"
+            parameters.append(cutoff.isoformat(timespec="milliseconds").replace("+00:00", "Z"))
+        with _connect(self.path) as connection:
+            return connection.execute(query, parameters).rowcount
+
+    def shutdown(self, wait: bool = True) -> None:
+        for job_id in list(self._futures):
+            self.cancel(job_id)
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+def _axis(spec: Mapping[str, Any]) -> np.ndarray:
+    return np.linspace(float(spec["low"]), float(spec["high"]), int(spec["points"]))
+
+
+@task("grid")
+def sensitivity_grid(params: Mapping[str, Any], progress: Progress) -> Dict[str, Any]:
+    x, y = _axis(params["x"]), _axis(params["y"])
+    shape_x, chunk = len(x), max(1, int(params.get("chunk_rows", 50)))
+    surfaces = {name: np.empty((len(y), shape_x)) for name in ("dscr", "cash_on_cash", "cash_flow")}
+    for start in range(0, len(y), chunk):
+        rows = y[start : start + chunk]
+        metrics = model.evaluate_grid(params["assumptions"], params["x"]["name"], x, params["y"]["name"], rows)
+        for name, surface in surfaces.items():
+            surface[start : start + len(rows)] = np.broadcast_to(metrics[name], (len(rows), shape_x))
+        progress((start + len(rows)) / len(y), f"{start + len(rows):,} of {len(y):,} rows")
+    return {"x": x, "y": y, **surfaces}
+
+
+@task("risk")
+def risk_simulation(params: Mapping[str, Any], progress: Progress) -> Dict[str, Any]:
+    paths = int(params.get("paths", 1_000_000))
+    return model.simulate_risk(
+        params["assumptions"],
+        paths=paths,
+        seed=int(params.get("seed", 0)),
+        workers=1,
+        progress=lambda fraction: progress(fraction, f"{int(fraction * paths):,} of {paths:,} paths"),
+    )
+
+
+@task("projection")
+def projection_surface(params: Mapping[str, Any], progress: Progress) -> Dict[str, Any]:
+    import pandas as pd
+
+    years = int(params.get("years", model.MAX_PROJECTION_YEARS))
+    rent_growth, exit_cap_rate = _axis(params["rent_growth"]), _axis(params["exit_cap_rate"])
+    record = model.scenario_record(params["assumptions"])
+    irr = np.empty((len(exit_cap_rate), len(rent_growth)))
+    equity_multiple = np.empty_like(irr)
+    frame = pd.DataFrame([record] * len(rent_growth))
+    # One exit cap row per pass keeps the (month, scenario) working set at a single row of the surface.
+    for index, cap_rate in enumerate(exit_cap_rate):
+        projection = model.project_cash_flows_batch(
+            frame,
+            years=years,
+            rent_growth=rent_growth,
+            expense_growth=float(params.get("expense_growth", 0.0)),
+            exit_cap_rate=cap_rate,
+            selling_cost_pct=float(params.get("selling_cost_pct", 0.0)),
+            detail=False,
+        )
+        irr[index] = projection["irr"]
+        equity_multiple[index] = projection["equity_multiple"]
+        progress((index + 1) / len(exit_cap_rate), f"{index + 1:,} of {len(exit_cap_rate):,} exit cap rates")
+    return {"rent_growth": rent_growth, "exit_cap_rate": exit_cap_rate, "irr": irr, "equity_multiple": equity_multiple}
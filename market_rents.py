@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from copy import deepcopy
+from difflib import get_close_matches
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+import model
+
+DATA_DIR = Path(__file__).resolve().parent
+MARKET_RENT_FILES: Dict[str, Path] = {
+    "edmonton": DATA_DIR / "rents.csv",
+    "alberta": DATA_DIR / "rentsv2.csv",
+}
+_DEFAULT_FILES = tuple(MARKET_RENT_FILES.items())
+BEDROOM_COLUMNS = ("Bachelor", "1BR", "2BR", "3BR", "4BR")
+FUZZY_CUTOFF = 0.75
+
+
+def normalize_location(name: str) -> str:
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    text = text.upper().replace("&", " AND ")
+    text = re.sub(r"[^A-Z0-9 ]+", "", text)
+    return " ".join(text.split())
+
+
+class MarketRentTable:
+    __slots__ = ("names", "keys", "sources", "rents", "_index")
+
+    def __init__(self, names: List[str], sources: List[str], rents: np.ndarray, keys: Optional[List[str]] = None) -> None:
+        self.names = np.array(names, dtype=object)
+        self.keys = np.array(keys if keys is not None else [normalize_location(name) for name in names], dtype=object)
+        self.sources = np.array(sources, dtype=object)
+        self.rents = rents
+        self._index: Dict[tuple[str, str], int] = {}
+        for row, (source, key) in enumerate(zip(self.sources, self.keys)):
+            self._index.setdefault((source, key), row)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def rows(self, source: Optional[str] = None) -> np.ndarray:
+        if source is None:
+            return np.arange(len(self))
+        return np.flatnonzero(self.sources == source)
+
+    def match(self, location: str, source: Optional[str] = None) -> Optional[int]:
+        key = normalize_location(location)
+        sources = [source] if source else list(MARKET_RENT_FILES)
+        for candidate_source in sources:
+            row = self._index.get((candidate_source, key))
+            if row is not None:
+                return row
+        candidates = {self.keys[row]: row for row in self.rows(source)[::-1]}
+        matches = get_close_matches(key, list(candidates), n=1, cutoff=FUZZY_CUTOFF)
+        return candidates[matches[0]] if matches else None
+
+    def rent(self, location: str, bedrooms: float, source: Optional[str] = None) -> float:
+        row = self.match(location, source)
+        if row is None:
+            raise KeyError(f"No market rent data for {location!r}")
+        return float(self.rents[row, bedroom_column(bedrooms)])
+
+
+def bedroom_column(bedrooms: float) -> int:
+    return int(min(max(round(bedrooms), 0), len(BEDROOM_COLUMNS) - 1))
+
+
+def _read_rent_file(path: Path) -> pd.DataFrame:
+    frame = pd.read_csv(path, thousands=",", na_values=["NA"], encoding="utf-8-sig")
+    frame = frame.rename(columns={frame.columns[0]: "location"})
+    for column in BEDROOM_COLUMNS:
+        if column not in frame:
+            frame[column] = np.nan
+    return frame
+
+
+def load_market_rents(files: tuple[tuple[str, Path], ...] = _DEFAULT_FILES) -> MarketRentTable:
+    if files == _DEFAULT_FILES:
+        import shared_tables
+
+        if shared_tables.enabled():
+            return shared_tables.current().market_rent_table()
+    return _cached_market_rents(files)
+
+
+@lru_cache(maxsize=None)
+def _cached_market_rents(files: tuple[tuple[str, Path], ...]) -> MarketRentTable:
+    return read_market_rents(files)
+
+
+def read_market_rents(files: tuple[tuple[str, Path], ...]) -> MarketRentTable:
+    names: List[str] = []
+    sources: List[str] = []
+    blocks: List[np.ndarray] = []
+    for source, path in files:
+        frame = _read_rent_file(path)
+        names.extend(frame["location"].astype(str))
+        sources.extend([source] * len(frame))
+        blocks.append(frame[list(BEDROOM_COLUMNS)].to_numpy(dtype=np.float64))
+    rents = np.vstack(blocks) if blocks else np.empty((0, len(BEDROOM_COLUMNS)))
+    return MarketRentTable(names, sources, rents)
+
+
+def _unit_bedrooms(unit: Mapping) -> float:
+    return unit.get("bedrooms") or model._infer_bedrooms(str(unit.get("name", "")))
+
+
+def fill_unit_mix_rents(
+    assumptions: model.Assumptions | model.FrozenAssumptions,
+    location: str,
+    source: Optional[str] = None,
+    table: MarketRentTable | None = None,
+) -> model.Assumptions | model.FrozenAssumptions:
+    table = table or load_market_rents()
+    row = table.match(location, source)
+    if row is None:
+        raise KeyError(f"No market rent data for {location!r}")
+    units = [dict(unit) for unit in assumptions.get("unit_mix", [])]
+    for unit in units:
+        rent = table.rents[row, bedroom_column(_unit_bedrooms(unit))]
+        if not np.isnan(rent):
+            unit["rent"] = float(rent)
+    if isinstance(assumptions, model.FrozenAssumptions):
+        return assumptions.with_(unit_mix=units)
+    filled = deepcopy(assumptions)
+    filled["unit_mix"] = units
+    return filled
+
+
+def rank_locations(
+    assumptions: model.Assumptions,
+    source: Optional[str] = "alberta",
+    sort_by: str = "cash_on_cash",
+    table: MarketRentTable | None = None,
+) -> pd.DataFrame:
+    table = table or load_market_rents()
+    rows = table.rows(source)
+    columns: Dict[str, object] = dict(model.scenario_record(assumptions))
+    available = np.ones(len(rows), dtype=bool)
+    for index, unit in enumerate(assumptions.get("unit_mix", [])):
+        rents = table.rents[rows, bedroom_column(_unit_bedrooms(unit))]
+        available &= ~np.isnan(rents)
+        model.override_column(columns, f"rent_{index}", rents)
+    # Every location is underwritten in one pass; the baseline scalars broadcast against the per-location rents.
+    metrics = model.metrics_arrays(columns)
+
+    frame = pd.DataFrame({"location": table.names[rows], "source": table.sources[rows]})
+    for index, _ in enumerate(assumptions.get("unit_mix", [])):
+        frame[f"rent_{index}"] = columns[f"rent_{index}"]
+    for name in ("noi", "cash_flow", "cash_on_cash", "dscr", "cap_rate"):
+        frame[name] = metrics[name]
+    frame = frame[available]
+    return frame.sort_values(sort_by, ascending=False, kind="stable", ignore_index=True)
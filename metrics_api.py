@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+import gzip
+import json
+import math
+import os
+import zlib
+
+import model
+import scoring
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+API_PREFIX = "/api/v1"
+MAX_REQUEST_BYTES = int(os.environ.get("METRICS_API_MAX_BYTES", 8 * 1024 * 1024))
+MAX_SCENARIOS = int(os.environ.get("METRICS_API_MAX_SCENARIOS", 50_000))
+MAX_MONTHLY_VALUES = int(os.environ.get("METRICS_API_MAX_MONTHLY_VALUES", 5_000_000))
+COMPRESS_MIN_BYTES = 1024
+_PROJECTION_OPTIONS = ("rent_growth", "expense_growth", "exit_cap_rate", "selling_cost_pct")
+
+
+class RequestError(ValueError):
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def loads(payload: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _read_body(request) -> bytes:
+    if request.content_length is not None and request.content_length > MAX_REQUEST_BYTES:
+        raise RequestError(f"Request body exceeds {MAX_REQUEST_BYTES} bytes", 413)
+    payload = request.stream.read(MAX_REQUEST_BYTES + 1)
+    if len(payload) > MAX_REQUEST_BYTES:
+        raise RequestError(f"Request body exceeds {MAX_REQUEST_BYTES} bytes", 413)
+    if request.headers.get("Content-Encoding", "").lower() == "gzip":
+        # Bounded inflate, so a small compressed body cannot expand past the size limit.
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            payload = inflater.decompress(payload, MAX_REQUEST_BYTES + 1)
+        except zlib.error as error:
+            raise RequestError(f"Invalid gzip body: {error}") from error
+        if len(payload) > MAX_REQUEST_BYTES or inflater.unconsumed_tail:
+            raise RequestError(f"Decompressed body exceeds {MAX_REQUEST_BYTES} bytes", 413)
+    return payload
+
+
+def parse_request(body: Any) -> Tuple[List[Any], bool, Dict[str, Any]]:
+    if isinstance(body, list):
+        body = {"scenarios": body}
+    if not isinstance(body, dict):
+        raise RequestError("Expected a JSON object or array")
+    if "scenarios" in body:
+        scenarios, single = body["scenarios"], False
+        if not isinstance(scenarios, list):
+            raise RequestError("'scenarios' must be an array")
+    elif "scenario" in body:
+        scenarios, single = [body["scenario"]], True
+    else:
+        scenarios, single = [body], True
+        body = {}
+    if len(scenarios) > MAX_SCENARIOS:
+        raise RequestError(f"At most {MAX_SCENARIOS} scenarios per request", 413)
+
+    options: Dict[str, Any] = {"baseline": bool(body.get("baseline", True))}
+    years = body.get("years")
+    if years is not None:
+        if not isinstance(years, int) or not 1 <= years <= model.MAX_PROJECTION_YEARS:
+            raise RequestError(f"'years' must be an integer between 1 and {model.MAX_PROJECTION_YEARS}")
+        options["years"] = years
+        options["monthly"] = bool(body.get("monthly", False))
+        if options["monthly"] and len(scenarios) * years * 12 > MAX_MONTHLY_VALUES:
+            raise RequestError(f"Monthly projections are limited to {MAX_MONTHLY_VALUES} values per request", 413)
+        options["projection_options"] = {
+            name: _projection_option(name, body[name], len(scenarios))
+            for name in _PROJECTION_OPTIONS
+            if body.get(name) is not None
+        }
+    return scenarios, single, options
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _projection_option(name: str, value: Any, count: int) -> Any:
+    if _is_number(value):
+        return float(value)
+    if isinstance(value, list) and len(value) == count and all(_is_number(item) for item in value):
+        return [float(item) for item in value]
+    raise RequestError(f"'{name}' must be a finite number or an array of {count} finite numbers, one per scenario")
+
+
+def compute(scenarios: List[Any], options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    baseline = model.load_frozen_baseline() if options.get("baseline", True) else None
+    frame = scoring.score_records(
+        scenarios,
+        baseline=baseline,
+        years=options.get("years"),
+        monthly=options.get("monthly", False),
+        projection_options=options.get("projection_options"),
+    )
+    return scoring.json_records(frame.drop(columns="row"))
+
+
+def register_endpoints(server, prefix: str = API_PREFIX) -> None:
+    from flask import Response, request
+
+    def respond(value: Any, status: int = 200) -> Response:
+        payload = dumps(value)
+        response = Response(payload, status=status, mimetype="application/json")
+        response.vary.add("Accept-Encoding")
+        if len(payload) >= COMPRESS_MIN_BYTES and "gzip" in request.headers.get("Accept-Encoding", "").lower():
+            response.set_data(gzip.compress(payload, compresslevel=5))
+            response.headers["Content-Encoding"] = "gzip"
+        return response
+
+    @server.route(f"{prefix}/metrics", methods=["POST"])
+    def _batch_metrics() -> Response:
+        try:
+            payload = _read_body(request)
+            try:
+                body = loads(payload)
+            except ValueError as error:
+                raise RequestError(f"Invalid JSON: {error}") from error
+            scenarios, single, options = parse_request(body)
+        except RequestError as error:
+            return respond({"error": str(error)}, error.status)
+        results = compute(scenarios, options)
+        if single:
+            return respond(results[0], 422 if results[0]["error"] else 200)
+        return respond({"count": len(results), "results": results})
+
+    @server.route(f"{prefix}/baseline", methods=["GET"])
+    def _baseline() -> Response:
+        return respond(model.load_frozen_baseline().to_dict())
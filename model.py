@@ -1,16 +1,35 @@
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from copy import deepcopy
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, TypedDict
+from types import CodeType, MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Mapping, TypedDict, Union
 
+import hashlib
+import json
+import numbers
+import os
 import re
 
-import pandas as pd
-from openpyxl import load_workbook
+import numpy as np
+
+from instrumentation import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 WORKBOOK_PATH = Path(__file__).resolve().with_name("8plexmodel.xlsx")
-_WORKBOOK = load_workbook(WORKBOOK_PATH, data_only=True)
+BASELINE_CACHE_PATH = WORKBOOK_PATH.with_name(f".{WORKBOOK_PATH.stem}.cache.json")
+# Bump whenever snapshot derivation changes in a way _builder_fingerprint cannot see (it hashes the cell maps and
+# the bytecode of the builder functions, not the helpers they call), so stale sidecar caches are rebuilt.
+_CACHE_VERSION = 2
+# Bump whenever a metric formula changes, so results stored by earlier versions are recomputed.
+METRICS_VERSION = 1
+# Set (normally by gunicorn.conf.py) to a directory holding the shared reference block; see shared_tables.
+SHARED_TABLES_ENV = "EIGHTPLEX_SHARED_TABLES"
 
 CELL_MAP: Dict[str, tuple[str, str]] = {
     "purchase_price": ("UofA", "C4"),
@@ -99,8 +118,269 @@ class Assumptions(TypedDict, total=False):
     other_income_items: List[OtherIncomeAssumption]
 
 
+_MISSING: Any = object()
+ASSUMPTION_FIELDS = (
+    "purchase_price",
+    "broker_fee",
+    "deposit_pct",
+    "deposit_amount",
+    "closing_rebate",
+    "interest_rate",
+    "amort_years",
+    "loan_amount",
+    "cmhc_premium_rate",
+    "loan_to_value",
+    "operating_expense_total",
+    "operating_expenses",
+    "unit_mix",
+    "other_income_items",
+)
+_FIELD_INDEX = {name: index for index, name in enumerate(ASSUMPTION_FIELDS)}
+_ROW_FIELDS = ("unit_mix", "other_income_items")
+
+
+def _freeze(name: str, value: Any) -> Any:
+    if name == "operating_expenses":
+        return MappingProxyType(dict(value))
+    if name in _ROW_FIELDS:
+        return tuple(MappingProxyType(dict(row)) for row in value)
+    return value
+
+
+def _thaw(name: str, value: Any) -> Any:
+    if name == "operating_expenses":
+        return dict(value)
+    if name in _ROW_FIELDS:
+        return [dict(row) for row in value]
+    return value
+
+
+class FrozenAssumptions(Mapping[str, Any]):
+    __slots__ = ("_values", "_extra", "_metrics", "_record", "_hash")
+
+    def __init__(self, assumptions: Mapping[str, Any]) -> None:
+        values = [_MISSING] * len(ASSUMPTION_FIELDS)
+        extra: Dict[str, Any] = {}
+        for name, value in assumptions.items():
+            index = _FIELD_INDEX.get(name)
+            if index is None:
+                extra[name] = deepcopy(value)
+            else:
+                values[index] = _freeze(name, value)
+        self._init(tuple(values), MappingProxyType(extra))
+
+    def _init(self, values: tuple, extra: Mapping[str, Any]) -> None:
+        self._values = values
+        self._extra = extra
+        self._metrics: Dict[str, float] | None = None
+        self._record: Dict[str, float] | None = None
+        self._hash: int | None = None
+
+    def __getitem__(self, key: str) -> Any:
+        index = _FIELD_INDEX.get(key)
+        if index is None:
+            return self._extra[key]
+        value = self._values[index]
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        index = _FIELD_INDEX.get(key)
+        if index is None:
+            return self._extra.get(key, default)
+        value = self._values[index]
+        return default if value is _MISSING else value
+
+    def __iter__(self):
+        for name, value in zip(ASSUMPTION_FIELDS, self._values):
+            if value is not _MISSING:
+                yield name
+        yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(value is not _MISSING for value in self._values) + len(self._extra)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, FrozenAssumptions):
+            return self._values == other._values and dict(self._extra) == dict(other._extra)
+        return isinstance(other, Mapping) and self.to_dict() == dict(other)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(json.dumps(self.to_dict(), sort_keys=True, default=str))
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"FrozenAssumptions({self.to_dict()!r})"
+
+    def __reduce__(self) -> tuple:
+        return FrozenAssumptions, (self.to_dict(),)
+
+    def __copy__(self) -> FrozenAssumptions:
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> FrozenAssumptions:
+        return self
+
+    def to_dict(self) -> Assumptions:
+        assumptions: Dict[str, Any] = {
+            name: _thaw(name, value) for name, value in zip(ASSUMPTION_FIELDS, self._values) if value is not _MISSING
+        }
+        assumptions.update(deepcopy(dict(self._extra)))
+        return assumptions  # type: ignore[return-value]
+
+    def with_(self, **overrides: Any) -> FrozenAssumptions:
+        changes: Dict[int, Any] = {}
+        extra = self._extra
+        for name, value in overrides.items():
+            index = _FIELD_INDEX.get(name)
+            if index is None:
+                extra = MappingProxyType({**extra, name: deepcopy(value)})
+            else:
+                changes[index] = _freeze(name, value)
+        return self._replace(changes, extra)
+
+    def with_unit(self, index: int, **fields: Any) -> FrozenAssumptions:
+        units = list(self._values[_FIELD_INDEX["unit_mix"]])
+        units[index] = MappingProxyType({**units[index], **fields})
+        return self._replace({_FIELD_INDEX["unit_mix"]: tuple(units)}, self._extra)
+
+    def _replace(self, changes: Mapping[int, Any], extra: Mapping[str, Any]) -> FrozenAssumptions:
+        values = list(self._values)
+        for index, value in changes.items():
+            values[index] = value
+        # Unchanged fields, including nested rows, are shared with the original rather than copied.
+        updated = FrozenAssumptions.__new__(FrozenAssumptions)
+        updated._init(tuple(values), extra)
+        return updated
+
+
+def _mapped_cells() -> List[tuple[str, str]]:
+    cells = [*CELL_MAP.values(), *OUTPUT_CELL_MAP.values()]
+    for row_map in (UNIT_ROW_MAP, OTHER_INCOME_ROW_MAP, OPERATING_EXPENSE_ROW_MAP):
+        for data in row_map.values():
+            cells.extend(data.values())
+    return sorted(set(cells))
+
+
+def cell_key(sheet: str, cell: str) -> str:
+    return f"{sheet}!{cell}"
+
+
+def extract_cells(path: Path) -> Dict[str, Any]:
+    from openpyxl import load_workbook
+    from openpyxl.utils.cell import coordinate_to_tuple
+
+    by_sheet: Dict[str, List[str]] = {}
+    for sheet, cell in _mapped_cells():
+        by_sheet.setdefault(sheet, []).append(cell)
+
+    values: Dict[str, Any] = {}
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet, cells in by_sheet.items():
+            coordinates = {cell: coordinate_to_tuple(cell) for cell in cells}
+            min_row = min(row for row, _ in coordinates.values())
+            min_col = min(col for _, col in coordinates.values())
+            # Stream only the bounding box of the mapped cells instead of materialising the whole sheet.
+            rows = list(
+                workbook[sheet].iter_rows(
+                    min_row=min_row,
+                    max_row=max(row for row, _ in coordinates.values()),
+                    min_col=min_col,
+                    max_col=max(col for _, col in coordinates.values()),
+                    values_only=True,
+                )
+            )
+            for cell, (row, col) in coordinates.items():
+                values[cell_key(sheet, cell)] = rows[row - min_row][col - min_col]
+    finally:
+        workbook.close()
+    return values
+
+
+def _workbook_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _code_digest(code: CodeType, digest: Any) -> None:
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for constant in code.co_consts:
+        # Nested code objects (comprehensions, lambdas) repr with their address, so hash their contents instead.
+        if isinstance(constant, CodeType):
+            _code_digest(constant, digest)
+        elif isinstance(constant, frozenset):
+            digest.update(repr(sorted(map(repr, constant))).encode())
+        else:
+            digest.update(repr(constant).encode())
+
+
+@lru_cache(maxsize=None)
+def _builder_fingerprint() -> str:
+    digest = hashlib.sha256(str(_CACHE_VERSION).encode())
+    maps = (CELL_MAP, OUTPUT_CELL_MAP, UNIT_ROW_MAP, OTHER_INCOME_ROW_MAP, OPERATING_EXPENSE_ROW_MAP)
+    digest.update(json.dumps(maps, sort_keys=True).encode())
+    for builder in (build_baseline_assumptions, _infer_interest_rate, _solve_annuity_rate_scalar, _infer_bedrooms):
+        _code_digest(builder.__code__, digest)
+    return digest.hexdigest()
+
+
+def _load_snapshot(workbook_path: Path, cache_path: Path) -> Dict[str, Any]:
+    digest = _workbook_digest(workbook_path)
+    expected_cells = {cell_key(sheet, cell) for sheet, cell in _mapped_cells()}
+    try:
+        cached = json.loads(cache_path.read_text())
+        if (
+            cached.get("builder") == _builder_fingerprint()
+            and cached.get("workbook_sha256") == digest
+            and set(cached.get("cells", {})) == expected_cells
+        ):
+            return cached
+    except (OSError, ValueError):
+        pass
+
+    cells = extract_cells(workbook_path)
+    snapshot = {
+        "version": _CACHE_VERSION,
+        "builder": _builder_fingerprint(),
+        "workbook_sha256": digest,
+        "cells": cells,
+        "baseline": build_baseline_assumptions(lambda sheet, cell: cells[cell_key(sheet, cell)]),
+    }
+    temporary = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        temporary.write_text(json.dumps(snapshot, separators=(",", ":")))
+        os.replace(temporary, cache_path)
+    except OSError:
+        temporary.unlink(missing_ok=True)
+    return snapshot
+
+
+def _workbook_snapshot() -> Dict[str, Any]:
+    if os.environ.get(SHARED_TABLES_ENV):
+        import shared_tables
+
+        return shared_tables.current().snapshot
+    return _local_snapshot()
+
+
+@lru_cache(maxsize=None)
+def _local_snapshot() -> Dict[str, Any]:
+    return _load_snapshot(WORKBOOK_PATH, BASELINE_CACHE_PATH)
+
+
+def baseline_version() -> str:
+    return _workbook_snapshot()["workbook_sha256"]
+
+
+def metrics_version() -> str:
+    return f"{METRICS_VERSION}:{baseline_version()[:16]}"
+
+
 def _read_cell(sheet: str, cell: str) -> Any:
-    return _WORKBOOK[sheet][cell].value
+    return _workbook_snapshot()["cells"][cell_key(sheet, cell)]
 
 
 def _pmt(rate: float, periods: int, principal: float) -> float:
@@ -112,20 +392,71 @@ def _pmt(rate: float, periods: int, principal: float) -> float:
     return principal * rate * factor / (factor - 1)
 
 
-def _infer_interest_rate(monthly_payment: float, principal: float, amort_years: int) -> float:
+def _solve_annuity_rate(payment: Any, principal: Any, periods: Any, iterations: int = 50) -> np.ndarray:
+    payment, principal, periods = np.broadcast_arrays(
+        np.asarray(payment, dtype=np.float64),
+        np.asarray(principal, dtype=np.float64),
+        np.asarray(periods, dtype=np.float64),
+    )
+    solvable = (payment * periods > principal) & (principal > 0) & (periods > 0)
+    # Start from the simple-interest estimate; Newton on pmt(r) then converges in a handful of steps.
+    rate = np.where(solvable, np.maximum(payment / np.where(principal > 0, principal, 1.0) - 1 / np.maximum(periods, 1.0), 1e-9), 0.0)
+    for _ in range(iterations):
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            discount = np.float_power(1 + rate, -periods)
+            annuity = 1 - discount
+            value = principal * rate / annuity - payment
+            slope = principal * (annuity - rate * periods * discount / (1 + rate)) / annuity**2
+            step = np.where(solvable & (slope != 0), value / slope, 0.0)
+        rate = np.maximum(rate - step, 1e-12)
+        if np.all(np.abs(step) <= 1e-15 * np.maximum(rate, 1.0)):
+            break
+    return np.where(solvable, rate, 0.0)
+
+
+def _solve_annuity_rate_scalar(payment: float, principal: float, periods: float, iterations: int = 50) -> float:
+    if not (payment * periods > principal and principal > 0 and periods > 0):
+        return 0.0
+    # Same Newton iteration as _solve_annuity_rate in plain floats; 0-d arrays would triple the per-call cost.
+    rate = max(payment / principal - 1 / max(periods, 1.0), 1e-9)
+    for _ in range(iterations):
+        discount = (1 + rate) ** -periods
+        annuity = 1 - discount
+        value = principal * rate / annuity - payment
+        slope = principal * (annuity - rate * periods * discount / (1 + rate)) / annuity**2
+        step = value / slope if slope != 0 else 0.0
+        rate = max(rate - step, 1e-12)
+        if abs(step) <= 1e-15 * max(rate, 1.0):
+            break
+    return rate
+
+
+def _infer_interest_rate(monthly_payment: float, principal: float, amort_years: int, default: float = 0.0) -> float:
     periods = amort_years * 12
     if monthly_payment <= 0 or principal <= 0 or periods <= 0:
-        return float(_read_cell(*CELL_MAP["interest_rate_cell"]) or 0.0)
-    low = 1e-6
-    high = 0.2
-    for _ in range(100):
-        mid = (low + high) / 2
-        payment = _pmt(mid / 12, periods, principal)
-        if payment > monthly_payment:
-            high = mid
-        else:
-            low = mid
-    return (low + high) / 2
+        return default
+    return _solve_annuity_rate_scalar(float(monthly_payment), float(principal), float(periods)) * 12
+
+
+def _pmt_array(rate: Any, periods: Any, principal: Any, out: np.ndarray | None = None) -> np.ndarray:
+    rate = np.asarray(rate, dtype=np.float64)
+    periods = np.asarray(periods, dtype=np.float64)
+    principal = np.asarray(principal, dtype=np.float64)
+    if out is None:
+        out = np.empty(np.broadcast_shapes(rate.shape, periods.shape, principal.shape))
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # float_power goes through libm pow like the scalar `**`, so batch results stay bit-identical to _pmt.
+        factor = np.add(rate, 1, out=np.empty(out.shape))
+        np.float_power(factor, periods, out=factor)
+        np.multiply(principal, rate, out=out)
+        np.multiply(out, factor, out=out)
+        np.subtract(factor, 1, out=factor)
+        np.divide(out, factor, out=out)
+        zero_rate = rate == 0
+        if zero_rate.any():
+            np.divide(principal, periods, out=out, where=zero_rate)
+    np.copyto(out, 0.0, where=(periods <= 0) | (principal <= 0))
+    return out
 
 
 def _infer_bedrooms(label: str) -> float:
@@ -138,31 +469,36 @@ def _infer_bedrooms(label: str) -> float:
         return 0.0
 
 
-def _build_baseline_assumptions() -> Assumptions:
-    purchase_price = float(_read_cell(*CELL_MAP["purchase_price"]))
-    broker_fee = float(_read_cell(*CELL_MAP["broker_fee"]))
-    deposit_pct = float(_read_cell(*CELL_MAP["deposit_pct"]))
-    deposit_amount = float(_read_cell(*CELL_MAP["deposit_amount"]))
-    closing_rebate = float(_read_cell(*CELL_MAP["closing_rebate"]))
-    operating_expense_total = float(_read_cell(*CELL_MAP["total_operating_expenses"]))
-    loan_amount = float(_read_cell(*CELL_MAP["loan_amount"]))
-    cmhc_premium_amount = float(_read_cell(*CELL_MAP["cmhc_premium_amount"]))
-    amort_years = int(_read_cell(*CELL_MAP["amort_years"]))
-    base_monthly_payment = float(_read_cell(*CELL_MAP["mortgage_monthly_payment"]) or 0.0)
-    premium_monthly_payment = float(_read_cell(*CELL_MAP["premium_monthly_payment"]) or 0.0)
+def build_baseline_assumptions(read_cell: Callable[[str, str], Any] = _read_cell) -> Assumptions:
+    purchase_price = float(read_cell(*CELL_MAP["purchase_price"]))
+    broker_fee = float(read_cell(*CELL_MAP["broker_fee"]))
+    deposit_pct = float(read_cell(*CELL_MAP["deposit_pct"]))
+    deposit_amount = float(read_cell(*CELL_MAP["deposit_amount"]))
+    closing_rebate = float(read_cell(*CELL_MAP["closing_rebate"]))
+    operating_expense_total = float(read_cell(*CELL_MAP["total_operating_expenses"]))
+    loan_amount = float(read_cell(*CELL_MAP["loan_amount"]))
+    cmhc_premium_amount = float(read_cell(*CELL_MAP["cmhc_premium_amount"]))
+    amort_years = int(read_cell(*CELL_MAP["amort_years"]))
+    base_monthly_payment = float(read_cell(*CELL_MAP["mortgage_monthly_payment"]) or 0.0)
+    premium_monthly_payment = float(read_cell(*CELL_MAP["premium_monthly_payment"]) or 0.0)
     monthly_payment = base_monthly_payment + premium_monthly_payment
     total_loan = loan_amount + cmhc_premium_amount
-    inferred_interest_rate = _infer_interest_rate(monthly_payment, total_loan, amort_years)
+    inferred_interest_rate = _infer_interest_rate(
+        monthly_payment,
+        total_loan,
+        amort_years,
+        default=float(read_cell(*CELL_MAP["interest_rate_cell"]) or 0.0),
+    )
     cmhc_premium_rate = cmhc_premium_amount / loan_amount if loan_amount else 0.0
 
     unit_mix: List[UnitAssumption] = []
     for data in UNIT_ROW_MAP.values():
-        label = str(_read_cell(*data["label"]))
+        label = str(read_cell(*data["label"]))
         unit_mix.append(
             {
                 "name": label,
-                "units": float(_read_cell(*data["units"])),
-                "rent": float(_read_cell(*data["rent"])),
+                "units": float(read_cell(*data["units"])),
+                "rent": float(read_cell(*data["rent"])),
                 "bedrooms": _infer_bedrooms(label),
             }
         )
@@ -171,17 +507,17 @@ def _build_baseline_assumptions() -> Assumptions:
     for data in OTHER_INCOME_ROW_MAP.values():
         other_income_items.append(
             {
-                "name": str(_read_cell(*data["label"])),
-                "units": float(_read_cell(*data["units"])),
-                "usage": float(_read_cell(*data["usage"])),
-                "monthly_amount": float(_read_cell(*data["monthly_amount"])),
+                "name": str(read_cell(*data["label"])),
+                "units": float(read_cell(*data["units"])),
+                "usage": float(read_cell(*data["usage"])),
+                "monthly_amount": float(read_cell(*data["monthly_amount"])),
             }
         )
 
     operating_expenses: Dict[str, float] = {}
     for data in OPERATING_EXPENSE_ROW_MAP.values():
-        label = str(_read_cell(*data["label"]))
-        operating_expenses[label] = float(_read_cell(*data["value"]))
+        label = str(read_cell(*data["label"]))
+        operating_expenses[label] = float(read_cell(*data["value"]))
 
     return Assumptions(
         purchase_price=purchase_price,
@@ -201,14 +537,51 @@ def _build_baseline_assumptions() -> Assumptions:
     )
 
 
-_BASELINE_ASSUMPTIONS = _build_baseline_assumptions()
-
 
+@timed("model.load_baseline_assumptions")
 def load_baseline_assumptions() -> Assumptions:
-    return deepcopy(_BASELINE_ASSUMPTIONS)
+    return deepcopy(_workbook_snapshot()["baseline"])
+
 
+def load_frozen_baseline() -> FrozenAssumptions:
+    if os.environ.get(SHARED_TABLES_ENV):
+        import shared_tables
 
-def calculate_metrics(assumptions: Assumptions) -> Dict[str, float]:
+        return shared_tables.current().frozen_baseline()
+    return _local_frozen_baseline()
+
+
+@lru_cache(maxsize=None)
+def _local_frozen_baseline() -> FrozenAssumptions:
+    return FrozenAssumptions(_local_snapshot()["baseline"])
+
+
+def merge_assumptions(base: Assumptions | FrozenAssumptions, overrides: Mapping[str, Any]) -> Assumptions:
+    merged: Dict[str, Any] = base.to_dict() if isinstance(base, FrozenAssumptions) else deepcopy(dict(base))
+    for name, value in overrides.items():
+        if name == "operating_expenses":
+            merged[name] = {**merged.get(name, {}), **value}
+        elif name in _ROW_FIELDS:
+            rows = [dict(row) for row in merged.get(name, [])]
+            for index, row in enumerate(value):
+                if index < len(rows):
+                    rows[index].update(row)
+                else:
+                    rows.append(dict(row))
+            merged[name] = rows
+        else:
+            merged[name] = deepcopy(value)
+    if "operating_expenses" in overrides and "operating_expense_total" not in overrides:
+        # Otherwise the baseline total would mask the overridden line items.
+        merged["operating_expense_total"] = sum(merged["operating_expenses"].values())
+    if "loan_to_value" in overrides and "deposit_pct" not in overrides:
+        merged["deposit_pct"] = 1 - float(overrides["loan_to_value"])
+    elif "deposit_pct" in overrides and "loan_to_value" not in overrides:
+        merged["loan_to_value"] = 1 - float(overrides["deposit_pct"])
+    return merged  # type: ignore[return-value]
+
+
+def _metric_inputs(assumptions: Assumptions) -> tuple:
     purchase_price = float(assumptions.get("purchase_price", 0.0))
     broker_fee = float(assumptions.get("broker_fee", 0.0))
     deposit_pct = float(assumptions.get("deposit_pct", 0.0))
@@ -217,28 +590,46 @@ def calculate_metrics(assumptions: Assumptions) -> Dict[str, float]:
 
     unit_mix = assumptions.get("unit_mix", [])
     gross_rent_monthly = sum(unit["units"] * unit["rent"] for unit in unit_mix)
-    gross_rent_annual = gross_rent_monthly * 12
 
     other_income_items = assumptions.get("other_income_items", [])
     other_income_monthly = sum(item["units"] * item["usage"] * item["monthly_amount"] for item in other_income_items)
+
+    return (
+        purchase_price,
+        broker_fee,
+        deposit_pct,
+        gross_rent_monthly,
+        other_income_monthly,
+        _operating_expense_total(assumptions),
+        float(assumptions.get("cmhc_premium_rate", 0.0)),
+        float(assumptions.get("interest_rate", 0.0)),
+        int(assumptions.get("amort_years", 0)),
+    )
+
+
+def _metrics_from_inputs(inputs: tuple) -> Dict[str, float]:
+    (
+        purchase_price,
+        broker_fee,
+        deposit_pct,
+        gross_rent_monthly,
+        other_income_monthly,
+        operating_expense_total,
+        cmhc_premium_rate,
+        interest_rate,
+        amort_years,
+    ) = inputs
+    gross_rent_annual = gross_rent_monthly * 12
     other_income_annual = other_income_monthly * 12
 
     total_income_annual = gross_rent_annual + other_income_annual
 
-    operating_expenses = assumptions.get("operating_expenses", {})
-    operating_expense_total = float(assumptions.get("operating_expense_total") or sum(operating_expenses.values()))
-    if operating_expense_total <= 0 and operating_expenses:
-        operating_expense_total = sum(operating_expenses.values())
-
     noi = total_income_annual - operating_expense_total
 
     equity_required = (purchase_price + broker_fee) * deposit_pct
     loan_principal = purchase_price + broker_fee - equity_required
-    cmhc_premium_rate = float(assumptions.get("cmhc_premium_rate", 0.0))
     total_loan = loan_principal * (1 + cmhc_premium_rate)
 
-    interest_rate = float(assumptions.get("interest_rate", 0.0))
-    amort_years = int(assumptions.get("amort_years", 0))
     periods = amort_years * 12
     monthly_rate = interest_rate / 12
     monthly_debt_service = _pmt(monthly_rate, periods, total_loan)
@@ -266,26 +657,789 @@ def calculate_metrics(assumptions: Assumptions) -> Dict[str, float]:
     }
 
 
-def project_monthly_cash_flows(assumptions: Assumptions) -> pd.DataFrame:
-    metrics = calculate_metrics(assumptions)
+@timed("model.calculate_metrics")
+def calculate_metrics(assumptions: Assumptions | FrozenAssumptions) -> Dict[str, float]:
+    if isinstance(assumptions, FrozenAssumptions):
+        # Frozen assumptions cannot change, so their metrics are computed once and handed out as copies.
+        if assumptions._metrics is None:
+            assumptions._metrics = _metrics_from_inputs(_metric_inputs(assumptions))
+        return dict(assumptions._metrics)
+    return _metrics_from_inputs(_metric_inputs(assumptions))
+
+
+ScenarioFrame = Union["pd.DataFrame", np.ndarray]
+
+SCENARIO_COLUMNS: Dict[str, float] = {
+    "purchase_price": 0.0,
+    "broker_fee": 0.0,
+    "deposit_pct": 0.0,
+    "loan_to_value": np.nan,
+    "cmhc_premium_rate": 0.0,
+    "interest_rate": 0.0,
+    "amort_years": 0.0,
+    "operating_expense_total": 0.0,
+    "other_income_monthly": 0.0,
+}
+
+_UNIT_COLUMN_PATTERN = re.compile(r"^rent_(\d+)$")
+_SCENARIO_UNIT_PATTERN = re.compile(r"^(?:rent|units)_\d+$")
+
+
+def _operating_expense_total(assumptions: Assumptions) -> float:
+    operating_expenses = assumptions.get("operating_expenses", {})
+    operating_expense_total = float(assumptions.get("operating_expense_total") or sum(operating_expenses.values()))
+    if operating_expense_total <= 0 and operating_expenses:
+        operating_expense_total = sum(operating_expenses.values())
+    return operating_expense_total
+
+
+def _number(value: Any, name: str) -> float:
+    # JSON strings, booleans, lists and objects are rejected here rather than coerced later by numpy.
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):
+        raise TypeError(f"{name} must be a number, got {type(value).__name__}")
+    return float(value)
+
+
+def scenario_record(assumptions: Assumptions | FrozenAssumptions) -> Dict[str, float]:
+    if isinstance(assumptions, FrozenAssumptions):
+        if assumptions._record is None:
+            assumptions._record = _scenario_record(assumptions)
+        return dict(assumptions._record)
+    return _scenario_record(assumptions)
+
+
+def _scenario_record(assumptions: Assumptions) -> Dict[str, float]:
+    deposit_pct = float(assumptions.get("deposit_pct", 0.0))
+    record: Dict[str, float] = {
+        "purchase_price": float(assumptions.get("purchase_price", 0.0)),
+        "broker_fee": float(assumptions.get("broker_fee", 0.0)),
+        "deposit_pct": deposit_pct,
+        "loan_to_value": float(assumptions.get("loan_to_value", 1 - deposit_pct)),
+        "cmhc_premium_rate": float(assumptions.get("cmhc_premium_rate", 0.0)),
+        "interest_rate": float(assumptions.get("interest_rate", 0.0)),
+        "amort_years": int(assumptions.get("amort_years", 0)),
+        "operating_expense_total": _operating_expense_total(assumptions),
+        "other_income_monthly": sum(
+            _number(item["units"], f"other_income_items[{index}].units")
+            * _number(item["usage"], f"other_income_items[{index}].usage")
+            * _number(item["monthly_amount"], f"other_income_items[{index}].monthly_amount")
+            for index, item in enumerate(assumptions.get("other_income_items", []))
+        ),
+    }
+    for index, unit in enumerate(assumptions.get("unit_mix", [])):
+        record[f"units_{index}"] = _number(unit["units"], f"unit_mix[{index}].units")
+        record[f"rent_{index}"] = _number(unit["rent"], f"unit_mix[{index}].rent")
+    return record
+
+
+def scenario_frame(scenarios: Iterable[Assumptions]) -> pd.DataFrame:
+    import pandas as pd
+
+    return pd.DataFrame([scenario_record(assumptions) for assumptions in scenarios]).fillna(0.0)
+
+
+def _column_names(frame: ScenarioFrame | Mapping[str, Any]) -> List[str]:
+    if isinstance(frame, np.ndarray):
+        return list(frame.dtype.names or ())
+    if isinstance(frame, Mapping):
+        return [str(name) for name in frame]
+    return [str(name) for name in frame.columns]
+
+
+def _column_array(values: Any) -> np.ndarray:
+    # Series.__array__ costs several microseconds per column, which dominates small batches; to_numpy does not.
+    if hasattr(values, "to_numpy"):
+        return values.to_numpy(dtype=np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+
+def _scenario_columns(frame: ScenarioFrame | Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    names = [name for name in _column_names(frame) if name in SCENARIO_COLUMNS or _SCENARIO_UNIT_PATTERN.match(name)]
+    columns = {name: _column_array(frame[name]) for name in names}
+    if "amort_years" in columns:
+        columns["amort_years"] = np.trunc(columns["amort_years"])
+    return columns
+
+
+def _unit_indices(names: Iterable[str]) -> List[int]:
+    names = set(names)
+    indices = sorted(int(match.group(1)) for match in map(_UNIT_COLUMN_PATTERN.match, names) if match)
+    for index in indices:
+        if f"units_{index}" not in names:
+            raise ValueError(f"Scenario column 'rent_{index}' has no matching 'units_{index}' column")
+    return indices
+
+
+METRIC_NAMES = (
+    "noi",
+    "cash_flow",
+    "cash_on_cash",
+    "dscr",
+    "cap_rate",
+    "gross_rent_annual",
+    "other_income_annual",
+    "operating_expenses_annual",
+    "total_income_annual",
+    "debt_service_annual",
+    "monthly_debt_service",
+    "equity_required",
+    "total_loan",
+)
+
+
+def _metrics_block(columns: Mapping[str, Any]) -> np.ndarray:
+    def column(name: str) -> np.ndarray:
+        return np.asarray(columns.get(name, SCENARIO_COLUMNS[name]), dtype=np.float64)
+
+    shape = np.broadcast_shapes(
+        *(np.shape(value) for name, value in columns.items() if name in SCENARIO_COLUMNS or _SCENARIO_UNIT_PATTERN.match(name))
+    )
+    # Every metric is written in place into one row of this block, so the only temporaries are a scratch row and
+    # the inputs that have to be derived. calculate_metrics_batch wraps the block in a frame without copying it.
+    block = np.empty((len(METRIC_NAMES), *shape))
+    metrics = dict(zip(METRIC_NAMES, block))
+    scratch = np.empty(shape)
+
+    purchase_price = column("purchase_price")
+    broker_fee = column("broker_fee")
+    deposit_pct = column("deposit_pct")
+    loan_to_value = column("loan_to_value")
+    missing = np.isnan(loan_to_value)
+    if missing.any():
+        loan_to_value = np.where(missing, 1 - deposit_pct, loan_to_value)
+    unset = deposit_pct == 0
+    if unset.any():
+        deposit_pct = np.where(unset, 1 - loan_to_value, deposit_pct)
+
+    gross_rent_annual = metrics["gross_rent_annual"]
+    gross_rent_annual.fill(0.0)
+    for index in _unit_indices(columns):
+        units = np.asarray(columns[f"units_{index}"], dtype=np.float64)
+        np.multiply(units, np.asarray(columns[f"rent_{index}"], dtype=np.float64), out=scratch)
+        np.add(gross_rent_annual, scratch, out=gross_rent_annual)
+    np.multiply(gross_rent_annual, 12, out=gross_rent_annual)
+    np.multiply(column("other_income_monthly"), 12, out=metrics["other_income_annual"])
+    np.add(gross_rent_annual, metrics["other_income_annual"], out=metrics["total_income_annual"])
+
+    metrics["operating_expenses_annual"][...] = column("operating_expense_total")
+    noi = np.subtract(metrics["total_income_annual"], metrics["operating_expenses_annual"], out=metrics["noi"])
+
+    # Rows that are only filled in at the end double as scratch space until then.
+    np.add(purchase_price, broker_fee, out=scratch)
+    equity_required = np.clip(deposit_pct, 0.0, 1.0, out=metrics["equity_required"])
+    np.multiply(scratch, equity_required, out=equity_required)
+    loan_principal = np.subtract(scratch, equity_required, out=scratch)
+    premium = np.add(column("cmhc_premium_rate"), 1, out=metrics["cash_flow"])
+    total_loan = np.multiply(loan_principal, premium, out=metrics["total_loan"])
+
+    periods = np.multiply(column("amort_years"), 12, out=metrics["dscr"])
+    monthly_rate = np.divide(column("interest_rate"), 12, out=metrics["cap_rate"])
+    monthly_debt_service = _pmt_array(monthly_rate, periods, total_loan, out=metrics["monthly_debt_service"])
+    annual_debt_service = np.multiply(monthly_debt_service, 12, out=metrics["debt_service_annual"])
+
+    cash_flow = np.subtract(noi, annual_debt_service, out=metrics["cash_flow"])
+    # Zero denominators score 0 like the scalar path. They are rare, so the division runs unmasked and is patched after.
+    for name, numerator, denominator in (
+        ("cash_on_cash", cash_flow, equity_required),
+        ("dscr", noi, annual_debt_service),
+        ("cap_rate", noi, purchase_price),
+    ):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(numerator, denominator, out=metrics[name])
+        zero = denominator == 0
+        if zero.any():
+            np.copyto(metrics[name], 0.0, where=zero)
+    return block
+
+
+def metrics_arrays(columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    return dict(zip(METRIC_NAMES, _metrics_block(columns)))
+
+
+@lru_cache(maxsize=None)
+def _metric_index() -> pd.Index:
+    import pandas as pd
+
+    return pd.Index(METRIC_NAMES)
+
+
+@timed("model.calculate_metrics_batch")
+def calculate_metrics_batch(frame: ScenarioFrame) -> pd.DataFrame:
+    import pandas as pd
+
+    block = _metrics_block(_scenario_columns(frame))
+    index = None if isinstance(frame, np.ndarray) else frame.index
+    # The transposed block is Fortran-ordered, which pandas stores as a single float block without a copy.
+    return pd.DataFrame(block.T, columns=_metric_index(), index=index, copy=False)
+
+
+def override_column(columns: Dict[str, Any], name: str, values: Any) -> None:
+    if name == "rent_scale":
+        for index in _unit_indices(columns):
+            columns[f"rent_{index}"] = columns[f"rent_{index}"] * values
+    elif name == "loan_to_value":
+        columns["loan_to_value"] = values
+        columns["deposit_pct"] = 1 - values
+    elif name == "deposit_pct":
+        columns["deposit_pct"] = values
+        columns["loan_to_value"] = 1 - values
+    else:
+        columns[name] = values
+
+
+@timed("model.evaluate_grid")
+def evaluate_grid(
+    assumptions: Assumptions,
+    x: str,
+    x_values: Iterable[float],
+    y: str,
+    y_values: Iterable[float],
+) -> Dict[str, np.ndarray]:
+    columns: Dict[str, Any] = dict(scenario_record(assumptions))
+    override_column(columns, x, np.asarray(list(x_values), dtype=np.float64)[np.newaxis, :])
+    override_column(columns, y, np.asarray(list(y_values), dtype=np.float64)[:, np.newaxis])
+    return metrics_arrays(columns)
+
+
+TORNADO_INPUTS: Dict[str, str] = {
+    "purchase_price": "Purchase Price",
+    "rent_scale": "Rents",
+    "operating_expense_total": "Operating Expenses",
+    "interest_rate": "Interest Rate",
+    "loan_to_value": "Loan to Value",
+    "amort_years": "Amortization",
+}
+
+
+@timed("model.sensitivity_tornado")
+def sensitivity_tornado(
+    assumptions: Assumptions,
+    metric: str = "cash_flow",
+    swing: float = 0.1,
+    inputs: Iterable[str] = tuple(TORNADO_INPUTS),
+) -> pd.DataFrame:
+    import pandas as pd
+
+    record = scenario_record(assumptions)
+    names = list(inputs)
+    rows = []
+    for name in names:
+        base = 1.0 if name == "rent_scale" else record[name]
+        for factor in (1 - swing, 1 + swing):
+            columns: Dict[str, Any] = dict(record)
+            value = base * factor
+            override_column(columns, name, min(value, 1.0) if name == "loan_to_value" else value)
+            rows.append(columns)
+    results = calculate_metrics_batch(pd.DataFrame(rows))[metric].to_numpy().reshape(len(names), 2)
+    baseline_value = calculate_metrics(assumptions)[metric]
+    frame = pd.DataFrame(
+        {
+            "input": names,
+            "label": [TORNADO_INPUTS.get(name, name) for name in names],
+            "low": results[:, 0] - baseline_value,
+            "high": results[:, 1] - baseline_value,
+        }
+    )
+    frame["range"] = (frame["high"] - frame["low"]).abs()
+    return frame.sort_values("range", ignore_index=True)
+
+
+class DistributionSpec(TypedDict, total=False):
+    kind: str
+    loc: float
+    scale: float
+    low: float
+    mode: float
+    high: float
+    mean: float
+    sigma: float
+
+
+# Rent and operating expense draws are multipliers; vacancy and interest rate draws are added to the baseline rate.
+RISK_DISTRIBUTIONS: Dict[str, DistributionSpec] = {
+    "rent": {"kind": "normal", "loc": 1.0, "scale": 0.05},
+    "vacancy": {"kind": "triangular", "low": -0.03, "mode": 0.0, "high": 0.08},
+    "operating_expenses": {"kind": "lognormal", "mean": 0.0, "sigma": 0.08},
+    "interest_rate": {"kind": "normal", "loc": 0.0, "scale": 0.0075},
+}
+
+RISK_METRICS = ("noi", "cash_flow", "dscr")
+_RISK_HISTOGRAM_BINS = 4096
+_RISK_HISTOGRAM_MAX_BINS = 1 << 16
+
+
+def _draw(generator: np.random.Generator, spec: DistributionSpec, size: int) -> np.ndarray:
+    kind = spec.get("kind", "normal")
+    if kind == "normal":
+        return generator.normal(spec.get("loc", 0.0), spec.get("scale", 0.0), size)
+    if kind == "lognormal":
+        return generator.lognormal(spec.get("mean", 0.0), spec.get("sigma", 0.0), size)
+    if kind == "uniform":
+        return generator.uniform(spec.get("low", 0.0), spec.get("high", 1.0), size)
+    if kind == "triangular":
+        return generator.triangular(spec.get("low", 0.0), spec.get("mode", 0.0), spec.get("high", 0.0), size)
+    if kind == "fixed":
+        return np.full(size, spec.get("loc", 0.0))
+    raise ValueError(f"Unsupported distribution kind: {kind}")
+
+
+def _vacancy_expense(assumptions: Assumptions) -> float:
+    return sum(value for name, value in assumptions.get("operating_expenses", {}).items() if "vacancy" in name.lower())
+
+
+def _simulate_chunk(task: tuple) -> Dict[str, Any]:
+    record, vacancy_expense, distributions, seed, size, bins, dscr_threshold = task
+    generator = np.random.default_rng(seed)
+    draws = {name: _draw(generator, distributions[name], size) for name in RISK_DISTRIBUTIONS}
+
+    columns: Dict[str, Any] = dict(record)
+    override_column(columns, "rent_scale", draws["rent"])
+    gross_rent_annual = sum(columns[f"units_{index}"] * columns[f"rent_{index}"] for index in _unit_indices(columns)) * 12
+    base_gross_rent_annual = sum(record[f"units_{index}"] * record[f"rent_{index}"] for index in _unit_indices(record)) * 12
+    base_vacancy_rate = vacancy_expense / base_gross_rent_annual if base_gross_rent_annual else 0.0
+    vacancy_rate = np.clip(base_vacancy_rate + draws["vacancy"], 0.0, 1.0)
+    columns["operating_expense_total"] = (
+        record["operating_expense_total"] - vacancy_expense
+    ) * draws["operating_expenses"] + vacancy_rate * gross_rent_annual
+    columns["interest_rate"] = np.maximum(record["interest_rate"] + draws["interest_rate"], 0.0)
+    metrics = dict(metrics_arrays(columns))
+    # A path with no debt service has unbounded coverage, so it can never fall below the threshold.
+    metrics["dscr"] = np.where(metrics["debt_service_annual"] > 0, metrics["dscr"], np.inf)
+
+    summary: Dict[str, Any] = {"paths": size, "dscr_below": int(np.count_nonzero(metrics["dscr"] < dscr_threshold))}
+    for name in RISK_METRICS:
+        values = metrics[name]
+        finite = values[np.isfinite(values)]
+        summary[name] = {
+            "finite": int(finite.size),
+            "sum": float(finite.sum()),
+            "sum_squares": float(np.square(finite).sum()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+        }
+        if bins is None:
+            summary[name]["values"] = finite
+        else:
+            summary[name]["histogram"] = _bin_counts(finite, *bins[name])
+    return summary
+
+
+def _histogram_bins(values: np.ndarray) -> tuple[float, float]:
+    low, high = (float(values.min()), float(values.max())) if values.size else (0.0, 0.0)
+    padding = max(high - low, abs(high), 1e-9) * 0.5
+    return low - padding, (high - low + 2 * padding) / _RISK_HISTOGRAM_BINS
+
+
+def _bin_counts(values: np.ndarray, origin: float, width: float) -> tuple[int, int, np.ndarray]:
+    if not values.size:
+        return 0, 0, np.zeros(0, dtype=np.int64)
+    index = np.floor((values - origin) / width).astype(np.int64)
+    low, high = int(index.min()), int(index.max())
+    scale = 0
+    while (high >> scale) - (low >> scale) + 1 > _RISK_HISTOGRAM_MAX_BINS:
+        scale += 1
+    index >>= scale
+    return scale, low >> scale, np.bincount(index - (low >> scale))
+
+
+def _rebin(histogram: tuple[int, int, np.ndarray], scale: int) -> tuple[int, np.ndarray]:
+    current, offset, counts = histogram
+    positions = (offset + np.arange(len(counts), dtype=np.int64)) >> (scale - current)
+    if not len(positions):
+        return 0, counts
+    return int(positions[0]), np.bincount(positions - positions[0], weights=counts).astype(np.int64)
+
+
+def _merge_histograms(histograms: List[tuple[int, int, np.ndarray]]) -> tuple[int, int, np.ndarray]:
+    histograms = [histogram for histogram in histograms if len(histogram[2])]
+    if not histograms:
+        return 0, 0, np.zeros(0, dtype=np.int64)
+    # Bins are power-of-two multiples of one width anchored at the same origin, so coarsening keeps them aligned.
+    scale = max(histogram[0] for histogram in histograms)
+    while True:
+        spans = [(histogram[1] >> (scale - histogram[0]), (histogram[1] + len(histogram[2]) - 1) >> (scale - histogram[0])) for histogram in histograms]
+        low, high = min(span[0] for span in spans), max(span[1] for span in spans)
+        if high - low + 1 <= _RISK_HISTOGRAM_MAX_BINS:
+            break
+        scale += 1
+    counts = np.zeros(high - low + 1, dtype=np.int64)
+    for histogram in histograms:
+        offset, rebinned = _rebin(histogram, scale)
+        counts[offset - low : offset - low + len(rebinned)] += rebinned
+    return scale, low, counts
+
+
+def _histogram_percentile(counts: np.ndarray, edges: np.ndarray, percentile: float, unbounded: int = 0) -> float:
+    cumulative = np.cumsum(counts)
+    finite = int(cumulative[-1]) if len(cumulative) else 0
+    target = (finite + unbounded) * percentile / 100
+    if target > finite or not finite:
+        return float("inf")
+    index = int(np.searchsorted(cumulative, target))
+    index = min(index, len(counts) - 1)
+    below = cumulative[index - 1] if index else 0
+    fraction = (target - below) / counts[index] if counts[index] else 0.0
+    return float(edges[index] + fraction * (edges[index + 1] - edges[index]))
+
+
+@timed("model.simulate_risk")
+def simulate_risk(
+    assumptions: Assumptions | None = None,
+    paths: int = 1_000_000,
+    distributions: Mapping[str, DistributionSpec] | None = None,
+    chunk_size: int = 250_000,
+    seed: int = 0,
+    workers: int | None = None,
+    dscr_threshold: float = 1.2,
+    percentiles: Iterable[float] = (5, 50, 95),
+    progress: Callable[[float], None] | None = None,
+) -> Dict[str, Any]:
+    if paths <= 0:
+        raise ValueError(f"paths must be positive, got {paths}")
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    assumptions = assumptions if assumptions is not None else load_baseline_assumptions()
+    specs = {**RISK_DISTRIBUTIONS, **(distributions or {})}
+    record = scenario_record(assumptions)
+    vacancy_expense = _vacancy_expense(assumptions)
+    sizes = [min(chunk_size, paths - start) for start in range(0, paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    def task(index: int, bins: Dict[str, tuple[float, float]] | None) -> tuple:
+        return (record, vacancy_expense, specs, seeds[index], sizes[index], bins, dscr_threshold)
+
+    # The first chunk runs inline to fix the bin origin and width. Later chunks extend the range by whole bins
+    # (coarsening by powers of two if it grows too wide), so nothing is clipped and the merged histogram does not
+    # depend on chunking or worker count. Percentiles are exact to within one final bin width.
+    pilot = _simulate_chunk(task(0, None))
+    bins = {name: _histogram_bins(pilot[name]["values"]) for name in RISK_METRICS}
+    for name in RISK_METRICS:
+        pilot[name]["histogram"] = _bin_counts(pilot[name].pop("values"), *bins[name])
+
+    tasks = [task(index, bins) for index in range(1, len(sizes))]
+    workers = workers or os.cpu_count() or 1
+    parallel = workers > 1 and len(tasks) > 1
+    chunks = [pilot]
+    if progress is not None:
+        progress(pilot["paths"] / paths)
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) if parallel else nullcontext() as executor:
+        for chunk in executor.map(_simulate_chunk, tasks) if parallel else map(_simulate_chunk, tasks):
+            chunks.append(chunk)
+            if progress is not None:
+                progress(sum(item["paths"] for item in chunks) / paths)
+
+    total_paths = sum(chunk["paths"] for chunk in chunks)
+    result: Dict[str, Any] = {
+        "paths": total_paths,
+        "seed": seed,
+        "dscr_threshold": dscr_threshold,
+        "prob_dscr_below": sum(chunk["dscr_below"] for chunk in chunks) / total_paths,
+    }
+    for name in RISK_METRICS:
+        scale, offset, counts = _merge_histograms([chunk[name]["histogram"] for chunk in chunks])
+        origin, width = bins[name]
+        edges = origin + (offset + np.arange(len(counts) + 1)) * width * 2**scale
+        finite = sum(chunk[name]["finite"] for chunk in chunks)
+        # Mean and std cover finite values only; unbounded DSCR paths (no debt service) are counted separately.
+        mean = sum(chunk[name]["sum"] for chunk in chunks) / finite if finite else float("nan")
+        variance = sum(chunk[name]["sum_squares"] for chunk in chunks) / finite - mean**2 if finite else float("nan")
+        summary: Dict[str, Any] = {
+            "mean": mean,
+            "std": float(np.sqrt(max(variance, 0.0))) if finite else float("nan"),
+            "min": min(chunk[name]["min"] for chunk in chunks),
+            "max": max(chunk[name]["max"] for chunk in chunks),
+            "unbounded": total_paths - finite,
+            "histogram": counts,
+            "edges": edges,
+        }
+        for percentile in percentiles:
+            summary[f"p{percentile:g}"] = _histogram_percentile(counts, edges, percentile, total_paths - finite)
+        result[name] = summary
+    return result
+
+MAX_PROJECTION_YEARS = 40
+
+PROJECTION_SERIES = (
+    "gross_rent",
+    "other_income",
+    "operating_expenses",
+    "interest",
+    "principal",
+    "debt_service",
+    "net_cash_flow",
+    "loan_balance",
+    "equity",
+)
+
+
+PROJECTION_LABELS = {
+    "gross_rent": "Gross Rent",
+    "other_income": "Other Income",
+    "operating_expenses": "Operating Expenses",
+    "interest": "Interest",
+    "principal": "Principal",
+    "debt_service": "Debt Service",
+    "net_cash_flow": "Net Cash Flow",
+    "loan_balance": "Loan Balance",
+    "equity": "Equity",
+}
+
+
+def _irr_monthly(cash_flows: np.ndarray, iterations: int = 50, tolerance: float = 1e-10) -> np.ndarray:
+    rate = np.full(cash_flows.shape[1], 0.005)
+    converged = np.zeros(cash_flows.shape[1], dtype=bool)
+    for _ in range(iterations):
+        discount = 1 / (1 + rate)
+        # Horner's rule over the (period, scenario) matrix: NPV and dNPV/dv without materialising powers.
+        npv = np.zeros_like(rate)
+        slope = np.zeros_like(rate)
+        for flow in cash_flows[::-1]:
+            slope = slope * discount + npv
+            npv = npv * discount + flow
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(slope != 0, npv / slope, 0.0)
+        new_discount = discount - step
+        new_rate = np.clip(1 / new_discount - 1, -0.99, 10.0)
+        converged = np.abs(new_rate - rate) < tolerance
+        rate = np.where(np.isfinite(new_rate), new_rate, rate)
+        if converged.all():
+            break
+    return np.where(converged, rate, np.nan)
+
+
+# Monthly rates probed, from 0 down towards -100%, when bracketing the IRR of a scenario that loses money.
+_LOSS_RATE_GRID = np.expm1(-np.geomspace(1e-3, 7.0, 48))
+
+
+def _future_value(cash_flows: np.ndarray, rate: np.ndarray) -> np.ndarray:
+    # Compounding forward to the horizon keeps every factor in (0, 1] for rates in (-1, 0], so nothing overflows,
+    # and the value has the same sign as the NPV.
+    growth = 1 + rate
+    value = np.zeros_like(rate)
+    for flow in cash_flows:
+        value = value * growth + flow
+    return value
+
+
+def _irr_monthly_loss(cash_flows: np.ndarray, iterations: int = 100, tolerance: float = 1e-13) -> np.ndarray:
+    # These flows lose money, so their value at 0% is not positive. Scan down from 0 for the first sign change, which
+    # brackets the root closest to zero, then narrow it with Illinois regula falsi. No sign change means no IRR.
+    count = cash_flows.shape[1]
+    high = np.zeros(count)
+    f_high = _future_value(cash_flows, high)
+    low = np.full(count, np.nan)
+    f_low = np.full(count, np.nan)
+    found = f_high == 0
+    low[found], f_low[found] = 0.0, 0.0
+    for rate in _LOSS_RATE_GRID:
+        trial = np.full(count, rate)
+        f_trial = _future_value(cash_flows, trial)
+        bracket = ~found & (np.sign(f_trial) != np.sign(f_high))
+        low[bracket], f_low[bracket] = rate, f_trial[bracket]
+        found |= bracket
+        keep = ~found
+        high[keep], f_high[keep] = rate, f_trial[keep]
+        if found.all():
+            break
+    active = found & (f_high != 0) & (low != high)
+    for _ in range(iterations):
+        if not active.any():
+            break
+        a, b, f_a, f_b = low[active], high[active], f_low[active], f_high[active]
+        guess = b - f_b * (b - a) / (f_b - f_a)
+        f_guess = _future_value(cash_flows[:, active], guess)
+        crossed = np.sign(f_guess) != np.sign(f_b)
+        low[active] = np.where(crossed, b, a)
+        f_low[active] = np.where(crossed, f_b, f_a / 2)
+        high[active], f_high[active] = guess, f_guess
+        active[active] = (f_guess != 0) & (np.abs(guess - np.where(crossed, b, a)) > tolerance)
+    return np.where(found, high, np.nan)
+
+
+@timed("model.project_cash_flows_batch")
+def project_cash_flows_batch(
+    frame: ScenarioFrame | Mapping[str, Any],
+    years: int = 1,
+    rent_growth: Any = 0.0,
+    expense_growth: Any = 0.0,
+    exit_cap_rate: Any = None,
+    selling_cost_pct: Any = 0.0,
+    refinance_year: int | None = None,
+    refinance_rate: Any = None,
+    detail: bool = True,
+    irr: bool = True,
+) -> Dict[str, np.ndarray]:
+    if not 1 <= years <= MAX_PROJECTION_YEARS:
+        raise ValueError(f"Projection horizon must be between 1 and {MAX_PROJECTION_YEARS} years")
+    columns = _scenario_columns(frame)
+    metrics = metrics_arrays(columns)
+    scenarios = metrics["noi"].shape[0]
+    months = years * 12
+
     rent_monthly = metrics["gross_rent_annual"] / 12
     other_income_monthly = metrics["other_income_annual"] / 12
-    opex_monthly = metrics["operating_expenses_annual"] / 12
-    debt_monthly = metrics["debt_service_annual"] / 12
+    opex_monthly = np.broadcast_to(metrics["operating_expenses_annual"] / 12, (scenarios,))
+    rent_growth = np.broadcast_to(np.asarray(rent_growth, dtype=np.float64), (scenarios,))
+    expense_growth = np.broadcast_to(np.asarray(expense_growth, dtype=np.float64), (scenarios,))
 
-    rows = []
-    for month in range(1, 13):
-        total_income = rent_monthly + other_income_monthly
-        net_cash_flow = total_income - opex_monthly - debt_monthly
-        rows.append(
-            {
-                "Month": month,
-                "Gross Rent": rent_monthly,
-                "Other Income": other_income_monthly,
-                "Operating Expenses": opex_monthly,
-                "Debt Service": debt_monthly,
-                "Net Cash Flow": net_cash_flow,
-            }
+    monthly_rate = np.broadcast_to(columns.get("interest_rate", 0.0) / 12, (scenarios,)).copy()
+    periods = np.broadcast_to(columns.get("amort_years", 0.0) * 12, (scenarios,))
+    payment = metrics["monthly_debt_service"].copy()
+    balance = metrics["total_loan"].copy()
+
+    # Series are stored (month, scenario) so each month's update writes one contiguous row.
+    series = {name: np.empty((months, scenarios)) for name in (PROJECTION_SERIES if detail else ("net_cash_flow",))}
+    net_cash_flow = series["net_cash_flow"]
+    principal_paid = np.zeros(scenarios)
+    for month in range(months):
+        if month % 12 == 0:
+            year = month // 12
+            rent_factor = (1 + rent_growth) ** year
+            expense_factor = (1 + expense_growth) ** year
+            if refinance_year is not None and year == refinance_year and refinance_rate is not None:
+                monthly_rate = np.broadcast_to(np.asarray(refinance_rate, dtype=np.float64) / 12, (scenarios,)).copy()
+                payment = _pmt_array(monthly_rate, np.maximum(periods - month, 0), balance)
+        scheduled = (payment > 0) & (month < periods)
+        interest = np.where(scheduled, balance * monthly_rate, 0.0)
+        # The final scheduled payment retires whatever rounding residue is left on the balance.
+        payoff = interest + balance
+        debt_service = np.where(scheduled, np.where(month == periods - 1, payoff, np.minimum(payment, payoff)), 0.0)
+        principal = debt_service - interest
+        balance = balance - principal
+        principal_paid += principal
+        gross_rent = rent_monthly * rent_factor
+        other_income = other_income_monthly * rent_factor
+        operating_expenses = opex_monthly * expense_factor
+        net_cash_flow[month] = gross_rent + other_income - operating_expenses - debt_service
+        if detail:
+            series["gross_rent"][month] = gross_rent
+            series["other_income"][month] = other_income
+            series["operating_expenses"][month] = operating_expenses
+            series["interest"][month] = interest
+            series["principal"][month] = principal
+            series["debt_service"][month] = debt_service
+            series["loan_balance"][month] = balance
+            series["equity"][month] = metrics["equity_required"] + principal_paid
+
+    forward_noi = (rent_monthly + other_income_monthly) * 12 * (1 + rent_growth) ** years - opex_monthly * 12 * (
+        1 + expense_growth
+    ) ** years
+    cap_rate = metrics["cap_rate"] if exit_cap_rate is None else np.broadcast_to(exit_cap_rate, (scenarios,))
+    exit_value = np.divide(forward_noi, cap_rate, out=np.zeros(scenarios), where=cap_rate > 0)
+    exit_proceeds = exit_value * (1 - np.asarray(selling_cost_pct, dtype=np.float64)) - balance
+
+    equity_required = metrics["equity_required"]
+    invested = equity_required > 0
+    total_return = net_cash_flow.sum(axis=0) + exit_proceeds
+    equity_multiple = np.divide(total_return, equity_required, out=np.full(scenarios, np.nan), where=invested)
+    result = {
+        "month": np.arange(1, months + 1),
+        **series,
+        "exit_value": exit_value,
+        "exit_proceeds": exit_proceeds,
+        "ending_loan_balance": balance,
+        "equity_multiple": equity_multiple,
+    }
+    if not irr:
+        return result
+
+    equity_flows = np.empty((months + 1, scenarios))
+    equity_flows[0] = -equity_required
+    equity_flows[1:] = net_cash_flow
+    equity_flows[-1] += exit_proceeds
+    # With nothing positive after the investment, no rate discounts the flows to zero: a total loss, reported as -100%.
+    wiped_out = invested & ~(equity_flows[1:] > 0).any(axis=0)
+    # Getting back no more than was invested puts the IRR in (-100%, 0%], where it is bracketed rather than guessed.
+    losing = invested & ~wiped_out & (total_return <= equity_required)
+    gaining = invested & ~wiped_out & ~losing
+    monthly = np.full(scenarios, np.nan)
+    monthly[wiped_out] = -1.0
+    if losing.any():
+        monthly[losing] = _irr_monthly_loss(equity_flows[:, losing])
+    if gaining.any():
+        monthly[gaining] = _irr_monthly(equity_flows[:, gaining])
+    result["irr"] = (1 + monthly) ** 12 - 1
+    return result
+
+
+@timed("model.project_monthly_cash_flows")
+def project_monthly_cash_flows(assumptions: Assumptions, years: int = 1, **options: Any) -> pd.DataFrame:
+    import pandas as pd
+
+    # One scenario goes in as length-1 columns, skipping the DataFrame round trip; the series never need an IRR.
+    record = {name: [value] for name, value in scenario_record(assumptions).items()}
+    projection = project_cash_flows_batch(record, years=years, **{"irr": False, **options})
+    columns = {"Month": projection["month"]}
+    columns.update({label: projection[name][:, 0] for name, label in PROJECTION_LABELS.items()})
+    return pd.DataFrame(columns)
+
+
+def _default_bounds(variable: str, current: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    if variable == "interest_rate":
+        return np.zeros_like(current), np.full_like(current, 0.5)
+    if variable in ("loan_to_value", "deposit_pct"):
+        return np.zeros_like(current), np.ones_like(current)
+    return np.zeros_like(current), np.maximum(current, 1.0) * 10
+
+
+@timed("model.goal_seek")
+def goal_seek(
+    scenarios: Union[Assumptions, ScenarioFrame],
+    metric: str,
+    target: Any,
+    variable: str,
+    bounds: tuple[Any, Any] | None = None,
+    tolerance: float = 1e-10,
+    max_iterations: int = 100,
+) -> Any:
+    single = isinstance(scenarios, Mapping)
+    columns: Dict[str, Any] = dict(scenario_record(scenarios)) if single else _scenario_columns(scenarios)
+    size = 1 if single else len(scenarios)
+    current = np.broadcast_to(np.asarray(1.0 if variable == "rent_scale" else columns[variable], dtype=np.float64), (size,))
+    low, high = _default_bounds(variable, current) if bounds is None else bounds
+    low = np.broadcast_to(np.asarray(low, dtype=np.float64), (size,)).copy()
+    high = np.broadcast_to(np.asarray(high, dtype=np.float64), (size,)).copy()
+    target = np.broadcast_to(np.asarray(target, dtype=np.float64), (size,))
+
+    def residual(values: np.ndarray) -> np.ndarray:
+        trial = dict(columns)
+        override_column(trial, variable, values)
+        return metrics_arrays(trial)[metric] - target
+
+    f_low = residual(low)
+    f_high = residual(high)
+    bracketed = np.sign(f_low) * np.sign(f_high) <= 0
+    active = bracketed.copy()
+    side = np.zeros(size)
+    guess = np.where(f_low == 0, low, high)
+    # Illinois-modified regula falsi, run lock-step across every scenario that still has a bracket.
+    for _ in range(max_iterations):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            secant = (low * f_high - high * f_low) / (f_high - f_low)
+        candidate = np.where(np.isfinite(secant), secant, (low + high) / 2)
+        guess = np.where(active, candidate, guess)
+        f_guess = residual(guess)
+        done = (np.abs(f_guess) <= tolerance * (1 + np.abs(target))) | (
+            np.abs(high - low) <= tolerance * (1 + np.abs(guess))
         )
+        active &= ~done
+        if not active.any():
+            break
+        keep_high = active & (np.sign(f_guess) == np.sign(f_low))
+        keep_low = active & ~keep_high
+        f_high = np.where(keep_high & (side == 1), f_high / 2, f_high)
+        f_low = np.where(keep_low & (side == -1), f_low / 2, f_low)
+        low = np.where(keep_high, guess, low)
+        f_low = np.where(keep_high, f_guess, f_low)
+        high = np.where(keep_low, guess, high)
+        f_high = np.where(keep_low, f_guess, f_high)
+        side = np.where(keep_high, 1, np.where(keep_low, -1, side))
+
+    solution = np.where(bracketed, guess, np.nan)
+    return float(solution[0]) if single else solution
+
+
+if __name__ == "__main__":
+    from model_cli import main
 
-    return pd.DataFrame(rows)
+    raise SystemExit(main())
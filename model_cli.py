@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, List, Optional
+
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import sys
+
+import pandas as pd
+
+import batch_export
+import model
+import scoring
+
+FORMATS = ("jsonl", "csv", "parquet", "xlsx")
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def _decode(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as error:
+        return error
+
+
+def process_batch(task: tuple) -> pd.DataFrame:
+    start, lines, baseline, years, monthly, projection_options = task
+    return scoring.score_records([_decode(line) for line in lines], baseline, years, monthly, projection_options, start)
+
+
+def iter_batches(lines: Iterable[str], batch_size: int) -> Iterator[tuple[int, List[str]]]:
+    start = 0
+    iterator = (line for line in lines if line.strip())
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield start, batch
+        start += len(batch)
+
+
+def run_batches(tasks: Iterable[tuple], workers: int = 1) -> Iterator[pd.DataFrame]:
+    if workers <= 1:
+        yield from map(process_batch, tasks)
+        return
+    # At most two batches per worker are in flight, so memory stays bounded however large the input is.
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for task in tasks:
+            pending.append(executor.submit(process_batch, task))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+class _Writer:
+    def __init__(self, stream: IO[bytes], file_format: str, columns: List[str], layout: bool = False) -> None:
+        self.stream = stream
+        self.file_format = file_format
+        self.columns = columns
+        self.header = True
+        # Columnar formats stream through batch_export: Parquet row groups, or a write-only xlsx workbook.
+        self._exporter = (
+            batch_export.open_exporter(stream, columns, file_format, layout=layout)
+            if file_format in batch_export.EXPORT_FORMATS
+            else None
+        )
+
+    def write(self, frame: pd.DataFrame) -> None:
+        frame = frame[self.columns]
+        if self._exporter is not None:
+            self._exporter.write(frame)
+        elif self.file_format == "csv":
+            self.stream.write(frame.to_csv(index=False, header=self.header).encode())
+        else:
+            # pandas' to_json caps precision at 15 digits; json.dumps round-trips every float exactly.
+            records = scoring.json_records(frame)
+            self.stream.write("".join(json.dumps(record) + "\n" for record in records).encode())
+        self.header = False
+
+    def close(self) -> None:
+        if self._exporter is not None:
+            self._exporter.close()
+
+
+def _format_for(path: Optional[Path], requested: Optional[str]) -> str:
+    if requested:
+        return requested
+    suffix = path.suffix.lower().lstrip(".") if path else ""
+    if suffix in ("parquet", "pq"):
+        return "parquet"
+    if suffix == "xlsx":
+        return "xlsx"
+    return "csv" if suffix == "csv" else "jsonl"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m model", description="Underwrite JSONL assumptions records in batches.")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of assumptions records, or - for stdin")
+    parser.add_argument("-o", "--output", type=Path, help="output file (default stdout)")
+    parser.add_argument("-f", "--format", choices=FORMATS, help="output format (default from --output suffix, else jsonl)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes; 0 uses every core")
+    parser.add_argument("--baseline", action="store_true", help="treat each record as overrides on the workbook baseline")
+    parser.add_argument("--years", type=int, help="also project this many years and report IRR and exit values")
+    parser.add_argument("--monthly", action="store_true", help="with --years, include monthly net cash flows")
+    parser.add_argument("--rent-growth", type=float, default=0.0)
+    parser.add_argument("--expense-growth", type=float, default=0.0)
+    parser.add_argument("--exit-cap-rate", type=float)
+    parser.add_argument("--selling-cost-pct", type=float, default=0.0)
+    parser.add_argument("--workbook-layout", action="store_true", help="lay xlsx output out like the UofA sheet of 8plexmodel.xlsx")
+    args = parser.parse_args(argv)
+
+    file_format = _format_for(args.output, args.format)
+    if args.monthly and not args.years:
+        parser.error("--monthly requires --years")
+    if args.monthly and file_format in ("csv", "xlsx"):
+        parser.error(f"--monthly is not supported for {file_format} output")
+    if args.workbook_layout and file_format != "xlsx":
+        parser.error("--workbook-layout requires xlsx output")
+    if args.years and not 1 <= args.years <= model.MAX_PROJECTION_YEARS:
+        parser.error(f"--years must be between 1 and {model.MAX_PROJECTION_YEARS}")
+    if file_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("Parquet output requires pyarrow (pip install pyarrow)")
+
+    baseline = model.load_baseline_assumptions() if args.baseline else None
+    projection_options = {
+        "rent_growth": args.rent_growth,
+        "expense_growth": args.expense_growth,
+        "exit_cap_rate": args.exit_cap_rate,
+        "selling_cost_pct": args.selling_cost_pct,
+    }
+    workers = args.workers or os.cpu_count() or 1
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    target = open(args.output, "wb") if args.output else sys.stdout.buffer
+    writer = _Writer(target, file_format, scoring.output_columns(args.years, args.monthly), args.workbook_layout)
+    try:
+        tasks = (
+            (start, lines, baseline, args.years, args.monthly, projection_options)
+            for start, lines in iter_batches(source, args.batch_size)
+        )
+        for frame in run_batches(tasks, workers):
+            writer.write(frame)
+    except BaseException:
+        with contextlib.suppress(Exception):
+            writer.close()
+        raise
+    else:
+        writer.close()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout.buffer:
+            target.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import model
+from instrumentation import timed
+
+Bounds = Tuple[Optional[float], Optional[float]]
+
+OPTIMIZER_VARIABLES: Dict[str, str] = {
+    "purchase_price": "Purchase Price",
+    "loan_to_value": "Loan to Value",
+    "amort_years": "Amortization",
+    "rent_scale": "Rents",
+    "interest_rate": "Interest Rate",
+    "operating_expense_total": "Operating Expenses",
+}
+INTEGER_VARIABLES = ("amort_years",)
+PARETO_METRICS = ("cash_flow", "equity_required")
+_CHUNK_SIZE = 200_000
+MAX_GRID_POINTS = 50_000
+
+
+def default_bounds(assumptions: model.Assumptions | model.FrozenAssumptions, variable: str) -> Tuple[float, float]:
+    record = model.scenario_record(assumptions)
+    if variable == "loan_to_value":
+        return 0.5, 0.95
+    if variable == "amort_years":
+        return 20.0, max(float(record["amort_years"]), 25.0)
+    if variable == "rent_scale":
+        return 0.9, 1.1
+    if variable == "interest_rate":
+        return 0.03, 0.07
+    current = float(record[variable])
+    return current * 0.8, current * 1.2
+
+
+def _evaluate(record: Mapping[str, float], names: List[str], points: np.ndarray) -> Dict[str, np.ndarray]:
+    columns: Dict[str, Any] = dict(record)
+    for index, name in enumerate(names):
+        model.override_column(columns, name, points[:, index])
+    return model.metrics_arrays(columns)
+
+
+def _feasible(metrics: Mapping[str, np.ndarray], constraints: Mapping[str, Bounds]) -> np.ndarray:
+    mask = np.ones(len(metrics["cash_flow"]), dtype=bool)
+    for name, (low, high) in constraints.items():
+        if low is not None:
+            mask &= metrics[name] >= low
+        if high is not None:
+            mask &= metrics[name] <= high
+    return mask
+
+
+def _snap(points: np.ndarray, names: List[str], low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    points = np.clip(points, low, high)
+    for index, name in enumerate(names):
+        if name in INTEGER_VARIABLES:
+            points[:, index] = np.round(points[:, index])
+    return points
+
+
+def pareto_front(cash_flow: np.ndarray, equity_required: np.ndarray) -> np.ndarray:
+    order = np.lexsort((-cash_flow, equity_required))
+    best = np.maximum.accumulate(cash_flow[order])
+    # A point survives only if it beats the cash flow of every point needing no more equity.
+    keep = np.empty(len(order), dtype=bool)
+    keep[:1] = True
+    keep[1:] = cash_flow[order][1:] > best[:-1]
+    return order[keep]
+
+
+@timed("optimizer.optimize")
+def optimize(
+    assumptions: model.Assumptions | model.FrozenAssumptions,
+    variables: Mapping[str, Bounds | None] | Iterable[str],
+    objective: str = "cash_on_cash",
+    maximize: bool = True,
+    constraints: Mapping[str, Bounds] | None = None,
+    resolution: int = 12,
+    refine_rounds: int = 6,
+    seeds: int = 16,
+    max_grid_points: int = MAX_GRID_POINTS,
+) -> Dict[str, Any]:
+    if not isinstance(variables, Mapping):
+        variables = dict.fromkeys(variables)
+    names = list(variables)
+    bounds = [variables[name] or default_bounds(assumptions, name) for name in names]
+    low = np.array([bound[0] for bound in bounds], dtype=np.float64)
+    high = np.array([bound[1] for bound in bounds], dtype=np.float64)
+    constraints = dict(constraints or {})
+    record = model.scenario_record(assumptions)
+    sign = 1.0 if maximize else -1.0
+
+    # The coarse grid grows as resolution ** dimensions, so wide searches start coarser and lean on refinement.
+    while resolution > 2 and resolution ** len(names) > max_grid_points:
+        resolution -= 1
+    axes = [np.linspace(low[index], high[index], resolution) for index in range(len(names))]
+    grid = _snap(np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(names)), names, low, high)
+
+    kept_points: List[np.ndarray] = []
+    kept_metrics: List[Dict[str, np.ndarray]] = []
+    evaluated = 0
+
+    def evaluate(points: np.ndarray) -> None:
+        nonlocal evaluated
+        for start in range(0, len(points), _CHUNK_SIZE):
+            chunk = points[start : start + _CHUNK_SIZE]
+            metrics = _evaluate(record, names, chunk)
+            evaluated += len(chunk)
+            # Infeasible points are pruned immediately; only feasible ones feed refinement and the frontier.
+            mask = _feasible(metrics, constraints)
+            if mask.any():
+                kept_points.append(chunk[mask])
+                kept_metrics.append({name: np.array(values[mask]) for name, values in metrics.items()})
+
+    evaluate(grid)
+    step = (high - low) / max(resolution - 1, 1)
+    offsets = np.stack(np.meshgrid(*([[-1.0, 0.0, 1.0]] * len(names)), indexing="ij"), axis=-1).reshape(-1, len(names))
+    for _ in range(refine_rounds):
+        if not kept_points:
+            break
+        points = np.concatenate(kept_points)
+        scores = sign * np.concatenate([metrics[objective] for metrics in kept_metrics])
+        front = pareto_front(
+            np.concatenate([metrics["cash_flow"] for metrics in kept_metrics]),
+            np.concatenate([metrics["equity_required"] for metrics in kept_metrics]),
+        )
+        best = np.argsort(-scores, kind="stable")[:seeds]
+        centers = np.unique(points[np.concatenate([best, front[: seeds * 4]])], axis=0)
+        step = step / 2
+        candidates = (centers[:, np.newaxis, :] + offsets[np.newaxis, :, :] * step).reshape(-1, len(names))
+        evaluate(np.unique(_snap(candidates, names, low, high), axis=0))
+
+    columns = [*names, "noi", "cash_flow", "cash_on_cash", "dscr", "cap_rate", "equity_required", "total_loan"]
+    if not kept_points:
+        empty = pd.DataFrame(columns=columns)
+        return {"best": None, "pareto": empty, "evaluated": evaluated, "feasible": 0}
+
+    points = np.concatenate(kept_points)
+    metrics = {name: np.concatenate([chunk[name] for chunk in kept_metrics]) for name in kept_metrics[0]}
+    table = pd.DataFrame(points, columns=names)
+    for name in columns[len(names) :]:
+        table[name] = metrics[name]
+    table = table.drop_duplicates(subset=names, ignore_index=True)
+
+    best_index = int(np.argmax(sign * table[objective].to_numpy()))
+    front = pareto_front(table["cash_flow"].to_numpy(), table["equity_required"].to_numpy())
+    return {
+        "best": table.iloc[best_index].to_dict(),
+        "pareto": table.iloc[front].reset_index(drop=True),
+        "evaluated": evaluated,
+        "feasible": len(table),
+    }
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Union
+
+import numpy as np
+import pandas as pd
+
+import model
+
+PortfolioSource = Union[str, Path, IO[bytes], pd.DataFrame, Iterable[pd.DataFrame]]
+
+ID_COLUMNS = ("property_id", "name")
+OPERATING_EXPENSE_PREFIX = "opex_"
+OTHER_INCOME_PREFIX = "other_income_"
+RANKING_COLUMNS = (
+    "purchase_price",
+    "noi",
+    "cash_flow",
+    "cash_on_cash",
+    "dscr",
+    "cap_rate",
+    "equity_required",
+    "total_loan",
+)
+_TOTAL_COLUMNS = ("purchase_price", "noi", "debt_service_annual", "cash_flow", "equity_required", "total_loan")
+
+
+def iter_portfolio_chunks(source: PortfolioSource, chunk_size: int = 50_000, file_format: str | None = None) -> Iterator[pd.DataFrame]:
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_size):
+            yield source.iloc[start : start + chunk_size]
+        return
+    if not isinstance(source, (str, Path)) and not hasattr(source, "read"):
+        yield from source
+        return
+
+    if file_format is None:
+        name = str(source) if isinstance(source, (str, Path)) else str(getattr(source, "name", ""))
+        file_format = "parquet" if name.lower().endswith((".parquet", ".pq")) else "csv"
+    if file_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise ImportError("Reading Parquet portfolios requires pyarrow (pip install pyarrow)") from error
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_size, thousands=",")
+
+
+def prepare_chunk(chunk: pd.DataFrame, offset: int = 0) -> pd.DataFrame:
+    frame = chunk.reset_index(drop=True)
+    opex_columns = [column for column in frame.columns if str(column).startswith(OPERATING_EXPENSE_PREFIX)]
+    if opex_columns:
+        itemized = frame[opex_columns].fillna(0.0).sum(axis=1)
+        total = frame["operating_expense_total"] if "operating_expense_total" in frame else 0.0
+        # Same rule as calculate_metrics: itemized lines only stand in for a missing or non-positive total.
+        frame["operating_expense_total"] = np.where(np.asarray(total, dtype=np.float64) > 0, total, itemized)
+    income_columns = [
+        column
+        for column in frame.columns
+        if str(column).startswith(OTHER_INCOME_PREFIX) and column != "other_income_monthly"
+    ]
+    if income_columns and "other_income_monthly" not in frame:
+        frame["other_income_monthly"] = frame[income_columns].fillna(0.0).sum(axis=1)
+    if "property_id" not in frame:
+        # Ids number rows across the whole source, so chunks after the first carry on from the previous one.
+        frame["property_id"] = np.arange(offset, offset + len(frame))
+    numeric = [column for column in frame.columns if column not in ID_COLUMNS]
+    frame[numeric] = frame[numeric].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+    return frame
+
+
+def score_portfolio(
+    source: PortfolioSource,
+    chunk_size: int = 50_000,
+    top_n: int = 100,
+    sort_by: str = "cash_on_cash",
+    ascending: bool = False,
+    file_format: str | None = None,
+) -> Dict[str, Any]:
+    totals = dict.fromkeys(_TOTAL_COLUMNS, 0.0)
+    properties = 0
+    ranking: pd.DataFrame | None = None
+    for chunk in iter_portfolio_chunks(source, chunk_size, file_format):
+        frame = prepare_chunk(chunk, offset=properties)
+        if frame.empty:
+            continue
+        metrics = model.calculate_metrics_batch(frame)
+        properties += len(frame)
+        for column in _TOTAL_COLUMNS:
+            source_column = frame[column] if column == "purchase_price" else metrics[column]
+            totals[column] += float(source_column.sum())
+
+        scored = frame[[column for column in ID_COLUMNS if column in frame]].copy()
+        scored["purchase_price"] = frame["purchase_price"]
+        for column in RANKING_COLUMNS[1:]:
+            scored[column] = metrics[column]
+        # Only the running top-N survives each chunk, so memory tracks chunk_size rather than portfolio size.
+        candidates = scored if ranking is None else pd.concat([ranking, scored], ignore_index=True)
+        ranking = candidates.sort_values(sort_by, ascending=ascending, kind="stable").head(top_n).reset_index(drop=True)
+
+    summary = {
+        "properties": properties,
+        "purchase_price": totals["purchase_price"],
+        "noi": totals["noi"],
+        "debt_service_annual": totals["debt_service_annual"],
+        "cash_flow": totals["cash_flow"],
+        "equity_required": totals["equity_required"],
+        "total_loan": totals["total_loan"],
+        "weighted_dscr": totals["noi"] / totals["debt_service_annual"] if totals["debt_service_annual"] else 0.0,
+        "cap_rate": totals["noi"] / totals["purchase_price"] if totals["purchase_price"] else 0.0,
+        "cash_on_cash": totals["cash_flow"] / totals["equity_required"] if totals["equity_required"] else 0.0,
+    }
+    if ranking is None:
+        ranking = pd.DataFrame(columns=["property_id", *RANKING_COLUMNS])
+    ranking.insert(0, "rank", np.arange(1, len(ranking) + 1))
+    return {"totals": summary, "rankings": ranking}
+
+
+def portfolio_frame(properties: Iterable[model.Assumptions], names: Iterable[str] | None = None) -> pd.DataFrame:
+    frame = model.scenario_frame(properties)
+    frame.insert(0, "property_id", np.arange(len(frame)))
+    if names is not None:
+        frame.insert(1, "name", list(names))
+    return frame
+
+
+def ranking_records(rankings: pd.DataFrame) -> List[Dict[str, Any]]:
+    return rankings.round(6).to_dict("records")
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import uuid
+
+import model
+
+DATA_DIR = Path(__file__).resolve().with_name("data")
+SCENARIOS_JSON_PATH = DATA_DIR / "scenarios.json"
+DEFAULT_STORE_PATH = DATA_DIR / "scenarios.sqlite3"
+STORE_PATH_ENV = "SCENARIO_STORE_PATH"
+
+METRIC_COLUMNS = (
+    "noi",
+    "cash_flow",
+    "cash_on_cash",
+    "dscr",
+    "cap_rate",
+    "debt_service_annual",
+    "equity_required",
+    "total_loan",
+)
+INDEXED_METRICS = ("dscr", "cap_rate", "cash_flow")
+_SUMMARY_COLUMNS = ("id", "name", "created_at", "assumptions_hash", *METRIC_COLUMNS)
+_ROW_FIELDS = ("unit_mix", "other_income_items")
+
+Bounds = Tuple[Optional[float], Optional[float]]
+
+
+@lru_cache(maxsize=1024)
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+
+
+def from_json_assumptions(assumptions: Mapping[str, Any]) -> model.Assumptions:
+    converted: Dict[str, Any] = {}
+    for key, value in assumptions.items():
+        name = _snake_case(key)
+        if name in _ROW_FIELDS:
+            # Operating expense labels are data, but unit and income row keys are camelCase fields.
+            value = [{_snake_case(field): item for field, item in row.items()} for row in value]
+        converted[name] = value
+    return converted  # type: ignore[return-value]
+
+
+def _canonical_json(assumptions: Mapping[str, Any]) -> str:
+    if isinstance(assumptions, model.FrozenAssumptions):
+        assumptions = assumptions.to_dict()
+    return json.dumps(assumptions, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def assumptions_hash(assumptions: Mapping[str, Any]) -> str:
+    return hashlib.sha256(_canonical_json(assumptions).encode()).hexdigest()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _metric_rows(assumptions: List[model.Assumptions]) -> List[Dict[str, float]]:
+    if len(assumptions) == 1:
+        return [model.calculate_metrics(assumptions[0])]
+    metrics = model.calculate_metrics_batch(model.scenario_frame(assumptions))
+    return metrics[list(METRIC_COLUMNS)].to_dict("records")
+
+
+class ScenarioStore:
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path or os.environ.get(STORE_PATH_ENV) or DEFAULT_STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        metrics = ", ".join(f"{name} real not null" for name in METRIC_COLUMNS)
+        with self._connect() as connection:
+            # WAL is a property of the database file, so it is set once here rather than on every connection.
+            connection.execute("pragma journal_mode=wal")
+            connection.execute(
+                "create table if not exists scenarios ("
+                "id text primary key, name text not null, created_at text not null, "
+                f"assumptions_hash text not null, assumptions text not null, {metrics}, "
+                "model_version text not null default '')"
+            )
+            columns = {row["name"] for row in connection.execute("pragma table_info(scenarios)")}
+            if "model_version" not in columns:
+                # Stores written before metrics were versioned start out stale; refresh_metrics recomputes them.
+                connection.execute("alter table scenarios add column model_version text not null default ''")
+            connection.execute("create index if not exists scenarios_hash on scenarios (assumptions_hash, model_version)")
+            for name in INDEXED_METRICS:
+                connection.execute(f"create index if not exists scenarios_{name} on scenarios ({name})")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            connection.row_factory = sqlite3.Row
+            connection.execute("pragma synchronous=normal")
+            yield connection
+        finally:
+            connection.close()
+
+    def __len__(self) -> int:
+        with self._connect() as connection:
+            return connection.execute("select count(*) from scenarios").fetchone()[0]
+
+    def save(
+        self,
+        assumptions: model.Assumptions | model.FrozenAssumptions,
+        name: str = "",
+        scenario_id: str | None = None,
+        created_at: str | None = None,
+    ) -> Dict[str, Any]:
+        scenario_id = scenario_id or str(uuid.uuid4())
+        self.save_many([{"id": scenario_id, "name": name, "created_at": created_at, "assumptions": assumptions}])
+        return self.get(scenario_id)  # type: ignore[return-value]
+
+    def save_many(self, records: Iterable[Mapping[str, Any]], chunk_size: int = 10_000) -> int:
+        saved = 0
+        chunk: List[Mapping[str, Any]] = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                saved += self._insert(chunk)
+                chunk = []
+        if chunk:
+            saved += self._insert(chunk)
+        return saved
+
+    def _insert(self, records: List[Mapping[str, Any]]) -> int:
+        assumptions = [
+            record["assumptions"].to_dict()
+            if isinstance(record["assumptions"], model.FrozenAssumptions)
+            else dict(record["assumptions"])
+            for record in records
+        ]
+        payloads = [_canonical_json(item) for item in assumptions]
+        digests = [hashlib.sha256(payload.encode()).hexdigest() for payload in payloads]
+        version = model.metrics_version()
+        with self._connect() as connection:
+            known = self._known_metrics(connection, set(digests), version)
+            missing = [index for index, digest in enumerate(digests) if digest not in known]
+            # Metrics are computed once per distinct assumptions, in a single vectorized pass per chunk.
+            if missing:
+                for index, metrics in zip(missing, _metric_rows([assumptions[index] for index in missing])):
+                    known.setdefault(digests[index], metrics)
+            rows = [
+                (
+                    record.get("id") or str(uuid.uuid4()),
+                    record.get("name") or "",
+                    record.get("created_at") or record.get("createdAt") or _now(),
+                    digest,
+                    payload,
+                    *(float(known[digest][name]) for name in METRIC_COLUMNS),
+                    version,
+                )
+                for record, payload, digest in zip(records, payloads, digests)
+            ]
+            names = ("id", "name", "created_at", "assumptions_hash", "assumptions", *METRIC_COLUMNS, "model_version")
+            placeholders = ", ".join("?" * len(names))
+            connection.execute("begin")
+            try:
+                connection.executemany(f"insert or replace into scenarios ({', '.join(names)}) values ({placeholders})", rows)
+            except sqlite3.Error:
+                connection.execute("rollback")
+                raise
+            connection.execute("commit")
+        return len(rows)
+
+    def _known_metrics(self, connection: sqlite3.Connection, digests: set, version: str) -> Dict[str, Dict[str, float]]:
+        known: Dict[str, Dict[str, float]] = {}
+        ordered = sorted(digests)
+        for start in range(0, len(ordered), 500):
+            batch = ordered[start : start + 500]
+            # Only rows scored by the current model are reused; anything older is recomputed.
+            query = (
+                f"select assumptions_hash, {', '.join(METRIC_COLUMNS)} from scenarios "
+                f"where model_version = ? and assumptions_hash in ({', '.join('?' * len(batch))})"
+            )
+            for row in connection.execute(query, [version, *batch]):
+                known[row["assumptions_hash"]] = {name: row[name] for name in METRIC_COLUMNS}
+        return known
+
+    def refresh_metrics(self, chunk_size: int = 10_000) -> int:
+        version = model.metrics_version()
+        with self._connect() as connection:
+            stale = [row["id"] for row in connection.execute("select id from scenarios where model_version != ?", (version,))]
+        refreshed = 0
+        for start in range(0, len(stale), chunk_size):
+            ids = stale[start : start + chunk_size]
+            with self._connect() as connection:
+                rows = []
+                for offset in range(0, len(ids), 500):
+                    batch = ids[offset : offset + 500]
+                    query = f"select id, assumptions from scenarios where id in ({', '.join('?' * len(batch))})"
+                    rows.extend(connection.execute(query, batch).fetchall())
+                metrics = _metric_rows([json.loads(row["assumptions"]) for row in rows])
+                assignments = ", ".join(f"{name} = ?" for name in METRIC_COLUMNS)
+                updates = [
+                    (*(float(values[name]) for name in METRIC_COLUMNS), version, row["id"])
+                    for row, values in zip(rows, metrics)
+                ]
+                connection.execute("begin")
+                try:
+                    connection.executemany(f"update scenarios set {assignments}, model_version = ? where id = ?", updates)
+                except sqlite3.Error:
+                    connection.execute("rollback")
+                    raise
+                connection.execute("commit")
+            refreshed += len(updates)
+        return refreshed
+
+    def import_json(self, path: str | Path = SCENARIOS_JSON_PATH, chunk_size: int = 10_000) -> int:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if not isinstance(data, list):
+            return 0
+        records = (
+            {
+                "id": item.get("id"),
+                "name": item.get("name", ""),
+                "created_at": item.get("createdAt"),
+                "assumptions": from_json_assumptions(item.get("assumptions") or {}),
+            }
+            for item in data
+        )
+        return self.save_many(records, chunk_size)
+
+    def get(self, scenario_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as connection:
+            row = connection.execute("select * from scenarios where id = ?", (scenario_id,)).fetchone()
+        return self._record(row) if row is not None else None
+
+    def delete(self, scenario_id: str) -> bool:
+        with self._connect() as connection:
+            return connection.execute("delete from scenarios where id = ?", (scenario_id,)).rowcount > 0
+
+    def _record(self, row: sqlite3.Row) -> Dict[str, Any]:
+        record = {name: row[name] for name in _SUMMARY_COLUMNS}
+        record["assumptions"] = json.loads(row["assumptions"])
+        return record
+
+    def query(
+        self,
+        bounds: Mapping[str, Bounds] | None = None,
+        order_by: str = "cash_flow",
+        descending: bool = True,
+        limit: int | None = 100,
+        include_assumptions: bool = False,
+    ) -> List[Dict[str, Any]]:
+        return list(self.iter_query(bounds, order_by, descending, limit, include_assumptions))
+
+    def iter_query(
+        self,
+        bounds: Mapping[str, Bounds] | None = None,
+        order_by: str = "cash_flow",
+        descending: bool = True,
+        limit: int | None = None,
+        include_assumptions: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        clauses: List[str] = []
+        parameters: List[Any] = []
+        for name, (low, high) in (bounds or {}).items():
+            if name not in METRIC_COLUMNS:
+                raise ValueError(f"Unknown metric {name!r}; expected one of {METRIC_COLUMNS}")
+            if low is not None:
+                clauses.append(f"{name} >= ?")
+                parameters.append(low)
+            if high is not None:
+                clauses.append(f"{name} <= ?")
+                parameters.append(high)
+        if order_by not in METRIC_COLUMNS:
+            raise ValueError(f"Unknown metric {order_by!r}; expected one of {METRIC_COLUMNS}")
+        columns = "*" if include_assumptions else ", ".join(_SUMMARY_COLUMNS)
+        query = f"select {columns} from scenarios"
+        if clauses:
+            query += " where " + " and ".join(clauses)
+        query += f" order by {order_by} {'desc' if descending else 'asc'}, id"
+        if limit is not None:
+            query += " limit ?"
+            parameters.append(limit)
+        with self._connect() as connection:
+            for row in connection.execute(query, parameters):
+                yield self._record(row) if include_assumptions else {name: row[name] for name in _SUMMARY_COLUMNS}
+
+    def top(self, metric: str = "cash_flow", n: int = 10, ascending: bool = False) -> List[Dict[str, Any]]:
+        return self.query(order_by=metric, descending=not ascending, limit=n)
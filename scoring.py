@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+import model
+
+METRIC_COLUMNS = (
+    "noi",
+    "cash_flow",
+    "cash_on_cash",
+    "dscr",
+    "cap_rate",
+    "gross_rent_annual",
+    "other_income_annual",
+    "operating_expenses_annual",
+    "total_income_annual",
+    "debt_service_annual",
+    "monthly_debt_service",
+    "equity_required",
+    "total_loan",
+)
+PROJECTION_COLUMNS = ("exit_value", "exit_proceeds", "ending_loan_balance", "irr", "equity_multiple")
+
+
+def output_columns(years: int | None = None, monthly: bool = False) -> List[str]:
+    columns = ["row", "id", "error", *METRIC_COLUMNS]
+    if years:
+        columns.extend(PROJECTION_COLUMNS)
+        if monthly:
+            columns.append("monthly_net_cash_flow")
+    return columns
+
+
+def _prepare(record: Any, baseline: model.Assumptions | None) -> tuple[Any, model.Assumptions]:
+    if not isinstance(record, dict):
+        raise ValueError("expected a JSON object")
+    identifier = record.get("id")
+    assumptions = record["assumptions"] if isinstance(record.get("assumptions"), dict) else record
+    if baseline is not None:
+        assumptions = model.merge_assumptions(baseline, assumptions)
+    return identifier, assumptions
+
+
+def score_records(
+    records: List[Any],
+    baseline: model.Assumptions | None = None,
+    years: int | None = None,
+    monthly: bool = False,
+    projection_options: Dict[str, Any] | None = None,
+    start: int = 0,
+) -> pd.DataFrame:
+    rows: List[Dict[str, Any]] = []
+    scenarios: List[Dict[str, float]] = []
+    valid: List[int] = []
+    for offset, record in enumerate(records):
+        row: Dict[str, Any] = {"row": start + offset, "id": None, "error": None}
+        try:
+            if isinstance(record, Exception):
+                raise record
+            identifier, assumptions = _prepare(record, baseline)
+            row["id"] = None if identifier is None else str(identifier)
+            scenarios.append(model.scenario_record(assumptions))
+            valid.append(offset)
+        except (ValueError, KeyError, TypeError) as error:
+            row["error"] = f"{type(error).__name__}: {error}"
+        rows.append(row)
+
+    frame = pd.DataFrame(rows, columns=["row", "id", "error"], dtype=object)
+    frame["row"] = frame["row"].astype(np.int64)
+    for name in output_columns(years, monthly)[3:]:
+        frame[name] = np.nan if name != "monthly_net_cash_flow" else None
+    if not scenarios:
+        return frame
+
+    # One vectorized pass scores every valid record in the batch.
+    columns = pd.DataFrame(scenarios).fillna(0.0)
+    metrics = model.calculate_metrics_batch(columns)
+    for name in METRIC_COLUMNS:
+        frame.loc[valid, name] = metrics[name].to_numpy()
+    if years:
+        options = {}
+        for name, value in (projection_options or {}).items():
+            values = None if value is None else np.asarray(value, dtype=np.float64)
+            # Per-record option lists follow the input rows, so keep only the entries of records that parsed.
+            options[name] = values[valid] if values is not None and values.ndim == 1 and len(values) == len(records) else values
+        projection = model.project_cash_flows_batch(columns, years=years, detail=monthly, **options)
+        for name in PROJECTION_COLUMNS:
+            frame.loc[valid, name] = projection[name]
+        if monthly:
+            series = projection["net_cash_flow"].T.tolist()
+            frame["monthly_net_cash_flow"] = frame["monthly_net_cash_flow"].astype(object)
+            for offset, values in zip(valid, series):
+                frame.at[offset, "monthly_net_cash_flow"] = values
+    return frame
+
+
+def json_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import market_rents
+import model
+
+SHARED_TABLES_ENV = model.SHARED_TABLES_ENV
+CHECK_INTERVAL_ENV = "EIGHTPLEX_SHARED_TABLES_CHECK"
+# Names the server instance that owns a set of blocks; configure() defaults it to the gunicorn master's PID.
+INSTANCE_ENV = "EIGHTPLEX_SHARED_TABLES_INSTANCE"
+DEFAULT_CHECK_INTERVAL = 2.0
+BLOCK_PREFIX = "eightplex-reference-"
+_MAGIC = b"8PLXREF1"
+_FORMAT_VERSION = 1
+_ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sQ")
+
+Sources = Tuple[Tuple[str, Path], ...]
+DEFAULT_SOURCES: Sources = (("workbook", model.WORKBOOK_PATH), *market_rents.MARKET_RENT_FILES.items())
+
+
+def default_directory() -> Path:
+    shm = Path("/dev/shm")
+    return shm if shm.is_dir() and os.access(shm, os.W_OK) else Path(tempfile.gettempdir())
+
+
+def instance_token() -> str:
+    token = os.environ.get(INSTANCE_ENV) or str(os.getpid())
+    if not re.fullmatch(r"[A-Za-z0-9_.]+", token):
+        raise ValueError(f"{INSTANCE_ENV} may only contain letters, digits, '_' and '.', got {token!r}")
+    return token
+
+
+def _instance_blocks(directory: Path, token: str) -> List[Path]:
+    # Tokens never contain '-', so this matches only the named instance's blocks.
+    return sorted(directory.glob(f"{BLOCK_PREFIX}{token}-*.bin"))
+
+
+def source_signature(sources: Sources = DEFAULT_SOURCES) -> tuple:
+    signature = []
+    for name, path in sources:
+        stat = Path(path).stat()
+        signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def version_stamp(sources: Sources = DEFAULT_SOURCES) -> str:
+    digest = hashlib.sha256(f"{_FORMAT_VERSION}:{model._builder_fingerprint()}".encode())
+    for name, path in sources:
+        digest.update(name.encode())
+        digest.update(hashlib.sha256(Path(path).read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _build_payload(sources: Sources, stamp: str) -> bytes:
+    paths = dict(sources)
+    workbook = Path(paths["workbook"])
+    snapshot = model._load_snapshot(workbook, workbook.with_name(f".{workbook.stem}.cache.json"))
+    table = market_rents.read_market_rents(tuple((name, Path(path)) for name, path in sources if name != "workbook"))
+
+    # Rents are stored column-major, so each bedroom column is one contiguous run of float64s.
+    arrays = {"market_rents": np.asfortranarray(table.rents, dtype=np.float64)}
+    header: Dict[str, Any] = {
+        "stamp": stamp,
+        "format": _FORMAT_VERSION,
+        "snapshot": snapshot,
+        "market_rent_names": [str(name) for name in table.names],
+        "market_rent_keys": [str(key) for key in table.keys],
+        "market_rent_sources": [str(source) for source in table.sources],
+        "arrays": {},
+    }
+    # Array offsets depend on the header size, so reserve generously and lay arrays out after it.
+    draft = json.dumps(header, separators=(",", ":")).encode()
+    offset = _aligned(_PREAMBLE.size + len(draft) + 1024 * (len(arrays) + 1))
+    for name, array in arrays.items():
+        header["arrays"][name] = {"offset": offset, "shape": list(array.shape), "dtype": array.dtype.str, "order": "F"}
+        offset = _aligned(offset + array.nbytes)
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    payload = bytearray(offset)
+    _PREAMBLE.pack_into(payload, 0, _MAGIC, len(encoded))
+    payload[_PREAMBLE.size : _PREAMBLE.size + len(encoded)] = encoded
+    for name, array in arrays.items():
+        start = header["arrays"][name]["offset"]
+        payload[start : start + array.nbytes] = array.tobytes(order="F")
+    return bytes(payload)
+
+
+def ensure_block(directory: str | Path | None = None, sources: Sources = DEFAULT_SOURCES) -> Path:
+    directory = Path(directory or os.environ.get(SHARED_TABLES_ENV) or default_directory())
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = version_stamp(sources)
+    token = instance_token()
+    path = directory / f"{BLOCK_PREFIX}{token}-{stamp[:16]}.bin"
+    if path.exists():
+        return path
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        temporary.write_bytes(_build_payload(sources, stamp))
+        os.replace(temporary, path)
+    finally:
+        temporary.unlink(missing_ok=True)
+    # This instance's superseded blocks can go: processes that still map them keep their pages until they
+    # reload. Blocks owned by other instances sharing the directory are left to their owners.
+    for stale in _instance_blocks(directory, token):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
+
+
+class ReferenceBlock:
+    __slots__ = ("path", "stamp", "snapshot", "market_rents", "signature", "_header", "_table", "_frozen")
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as stream:
+            buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, length = _PREAMBLE.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} is not a reference block")
+        header = json.loads(buffer[_PREAMBLE.size : _PREAMBLE.size + length])
+        if header.get("format") != _FORMAT_VERSION:
+            raise ValueError(f"{self.path} has block format {header.get('format')}, expected {_FORMAT_VERSION}")
+        # Arrays are read-only views straight onto the mapping and are shared between workers. The header,
+        # including the ~2 KB baseline snapshot, is parsed into each process's own heap; what the block saves
+        # there is every worker re-reading and re-evaluating the workbook, not the memory of the snapshot.
+        arrays = {
+            name: np.ndarray(spec["shape"], dtype=np.dtype(spec["dtype"]), buffer=buffer, offset=spec["offset"], order=spec["order"])
+            for name, spec in header["arrays"].items()
+        }
+        self._header = header
+        self.stamp: str = header["stamp"]
+        self.snapshot: Dict[str, Any] = header["snapshot"]
+        self.market_rents = arrays["market_rents"]
+        self.signature: tuple = ()
+        self._table: Optional[market_rents.MarketRentTable] = None
+        self._frozen: Optional[model.FrozenAssumptions] = None
+
+    def frozen_baseline(self) -> model.FrozenAssumptions:
+        if self._frozen is None:
+            self._frozen = model.FrozenAssumptions(self.snapshot["baseline"])
+        return self._frozen
+
+    def market_rent_table(self) -> market_rents.MarketRentTable:
+        if self._table is None:
+            self._table = market_rents.MarketRentTable(
+                self._header["market_rent_names"],
+                self._header["market_rent_sources"],
+                self.market_rents,
+                keys=self._header["market_rent_keys"],
+            )
+        return self._table
+
+
+def _open_current(directory: str | Path | None, sources: Sources, attempts: int = 3) -> ReferenceBlock:
+    # A sibling worker that saw a newer source can retire the block between building and mapping it; rebuild then.
+    for _ in range(attempts - 1):
+        try:
+            return ReferenceBlock(ensure_block(directory, sources))
+        except FileNotFoundError:
+            continue
+    return ReferenceBlock(ensure_block(directory, sources))
+
+
+_lock = threading.Lock()
+_current: Optional[ReferenceBlock] = None
+_checked = 0.0
+
+
+def current(directory: str | Path | None = None, sources: Sources = DEFAULT_SOURCES) -> ReferenceBlock:
+    global _current, _checked
+    block = _current
+    interval = float(os.environ.get(CHECK_INTERVAL_ENV, DEFAULT_CHECK_INTERVAL))
+    if block is not None and time.monotonic() - _checked < interval:
+        return block
+    with _lock:
+        # A cheap stat check gates the content hash, so an unchanged source tree costs three stat calls.
+        signature = source_signature(sources)
+        if _current is None or _current.signature != signature:
+            block = _open_current(directory, sources)
+            block.signature = signature
+            _current = block
+        _checked = time.monotonic()
+        return _current
+
+
+def enabled() -> bool:
+    return bool(os.environ.get(SHARED_TABLES_ENV))
+
+
+def configure(directory: str | Path | None = None) -> Path:
+    directory = Path(directory or os.environ.get(SHARED_TABLES_ENV) or default_directory())
+    os.environ[SHARED_TABLES_ENV] = str(directory)
+    os.environ.setdefault(INSTANCE_ENV, str(os.getpid()))
+    return ensure_block(directory)
+
+
+def cleanup(directory: str | Path | None = None) -> int:
+    directory = Path(directory or os.environ.get(SHARED_TABLES_ENV) or default_directory())
+    removed = 0
+    for path in _instance_blocks(directory, instance_token()):
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def reset() -> None:
+    global _current, _checked
+    with _lock:
+        _current, _checked = None, 0.0
+
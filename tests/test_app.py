@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from contextvars import copy_context
+
+import dash
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+import numpy as np
+
+import app
+import model
+
+
+def test_financing_change_patches_only_debt_service_bar():
+    patch = app.update_debt_service(2_400_000, 4.5, 80, 2450, 1450, 60459.33)
+
+    operations = patch.to_plotly_json()["operations"]
+    assert [operation["location"] for operation in operations] == [["data", 0, "y", 3]]
+
+
+def test_dashboard_update_sends_card_text_and_cash_flow_values():
+    outputs = app.update_dashboard(2_400_000, 2450, 1450, 60459.33, 4.5, 80)
+
+    assumptions = app.build_assumptions(2_400_000, 2450, 1450, 60459.33, 4.5, 80)
+    metrics = model.calculate_metrics(assumptions)
+    assert list(outputs[: len(app.METRIC_CARD_IDS)]) == [value for _, value in app.metric_card_values(metrics)]
+    operations = outputs[-1].to_plotly_json()["operations"]
+    assert operations[0]["location"] == ["data", 0, "y"]
+    assert len(operations[0]["params"]["value"]) == 12
+
+
+def _triggered_by(prop_id, callback, *args):
+    def call():
+        context_value.set(AttributeDict(triggered_inputs=[{"prop_id": prop_id, "value": None}]))
+        return callback(*args)
+
+    return copy_context().run(call)
+
+
+def test_heatmaps_skip_sliders_the_grid_already_sweeps():
+    inputs = (2_400_000, 2450, 1450, 60459.33, 4.5, 80, "rate-ltv")
+
+    assert _triggered_by("interest-slider.value", app.update_sensitivity, *inputs) == (dash.no_update, dash.no_update)
+    assert _triggered_by("ltv-slider.value", app.update_sensitivity, *inputs[:5], 70, "rate-ltv") == (dash.no_update, dash.no_update)
+
+    dscr, _ = _triggered_by("opex-slider.value", app.update_sensitivity, *inputs)
+    assert [operation["location"] for operation in dscr.to_plotly_json()["operations"]] == [["data", 0, "z"]]
+
+    dscr, _ = _triggered_by("grid-axes.value", app.update_sensitivity, *inputs[:6], "price-rent")
+    locations = [operation["location"] for operation in dscr.to_plotly_json()["operations"]]
+    assert ["data", 0, "x"] in locations and ["layout", "xaxis", "title", "text"] in locations
+
+    dscr, _ = _triggered_by("interest-slider.value", app.update_sensitivity, *inputs[:6], "price-rent")
+    assert len(dscr.to_plotly_json()["operations"]) == 1
+    dscr, _ = _triggered_by("purchase-price-input.value", app.update_sensitivity, *inputs[:6], "price-rent")
+    assert ["data", 0, "x"] in [operation["location"] for operation in dscr.to_plotly_json()["operations"]]
+
+
+def test_skipped_heatmap_updates_match_a_full_recompute():
+    base = app.compute_sensitivity(app.build_assumptions(2_400_000, 2450, 1450, 60459.33, 4.5, 80), "rate-ltv")
+    moved = app.compute_sensitivity(app.build_assumptions(2_400_000, 2450, 1450, 60459.33, 5.5, 70), "rate-ltv")
+
+    assert np.array_equal(base["dscr"], moved["dscr"]) and np.array_equal(base["cash_on_cash"], moved["cash_on_cash"])
+
+
+def test_tornado_has_its_own_callback():
+    operations = app.update_tornado(2_400_000, 2450, 1450, 60459.33, 4.5, 80).to_plotly_json()["operations"]
+
+    assert {operation["location"][0] for operation in operations} == {"data"}
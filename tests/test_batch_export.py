@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import batch_export
+import model
+import model_cli
+
+
+def test_xlsx_export_rolls_over_to_new_sheets_at_the_row_limit(tmp_path):
+    target = tmp_path / "results.xlsx"
+    frames = (pd.DataFrame({"row": range(start, start + 4), "cash_flow": [1.5, np.nan, 2.5, 3.5]}) for start in (0, 4, 8))
+
+    rows = batch_export.export_frames(frames, target, max_rows=5)
+
+    workbook = openpyxl.load_workbook(target)
+    assert rows == 12
+    assert workbook.sheetnames == ["Results", "Results (2)", "Results (3)"]
+    assert list(workbook["Results"].values) == [("row", "cash_flow"), (0, 1.5), (1, None), (2, 2.5), (3, 3.5)]
+    assert [values[0] for values in workbook["Results (3)"].values] == ["row", 8, 9, 10, 11]
+
+
+def test_monthly_projections_export_in_workbook_layout(tmp_path):
+    frame = model.scenario_frame([model.load_baseline_assumptions()] * 3)
+    frame["id"] = ["a", "b", "c"]
+    target = tmp_path / "monthly.xlsx"
+
+    rows = batch_export.export_monthly_projections(frame, target, years=2, layout=True, chunk_size=2)
+
+    sheet = openpyxl.load_workbook(target)["Monthly"]
+    projection = model.project_cash_flows_batch(frame, years=2)
+    assert rows == 3 * 24
+    assert sheet["B2"].value == batch_export.WORKBOOK_TITLE
+    assert [cell.value for cell in sheet[4]][1:5] == ["Scenario #", "Scenario", "Month", "Gross Rent"]
+    assert [cell.value for cell in sheet[30]][1:4] == [1, "b", 2]
+    assert sheet.cell(30, 11).value == pytest.approx(projection["net_cash_flow"][1, 1])
+    assert sheet.cell(30, 5).number_format == "#,##0"
+
+
+def test_cli_writes_xlsx_with_workbook_layout(tmp_path):
+    source = tmp_path / "deals.jsonl"
+    source.write_text("".join(json.dumps({"id": index, "interest_rate": 0.03 + index / 1000}) + "\n" for index in range(5)))
+    target = tmp_path / "deals.xlsx"
+
+    assert model_cli.main([str(source), "-o", str(target), "--baseline", "--workbook-layout", "--batch-size", "2"]) == 0
+
+    sheet = openpyxl.load_workbook(target)["UofA"]
+    header = [cell.value for cell in sheet[4]]
+    expected = model.calculate_metrics(model.merge_assumptions(model.load_baseline_assumptions(), {"interest_rate": 0.034}))
+    assert header[header.index("DSCR")] == "DSCR" and sheet.max_row == 9
+    assert sheet.cell(9, header.index("CF after debt") + 1).value == pytest.approx(expected["cash_flow"])
+    assert sheet.cell(9, header.index("Cash on cash") + 1).number_format == "0.0%"
+    with pytest.raises(SystemExit):
+        model_cli.main([str(source), "-o", str(tmp_path / "deals.csv"), "--workbook-layout"])
+
+
+def test_parquet_export_writes_fixed_size_row_groups(tmp_path):
+    target = tmp_path / "results.parquet"
+    frames = (pd.DataFrame({"row": np.arange(start, start + 7), "dscr": np.linspace(1, 2, 7)}) for start in range(0, 35, 7))
+
+    assert batch_export.export_frames(frames, target, row_group_size=10) == 35
+
+    metadata = pq.ParquetFile(target).metadata
+    assert [metadata.row_group(index).num_rows for index in range(metadata.num_row_groups)] == [10, 10, 10, 5]
+    assert pq.read_table(target).column("row").to_pylist() == list(range(35))
+
+
+def test_export_errors_are_not_masked_by_close(tmp_path, monkeypatch):
+    def frames():
+        yield pd.DataFrame({"row": [0, 1]})
+        raise ValueError("bad batch")
+
+    save = batch_export.XlsxExporter.close
+
+    def close(self):
+        save(self)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(batch_export.XlsxExporter, "close", close)
+
+    with pytest.raises(ValueError, match="bad batch"):
+        batch_export.export_frames(frames(), tmp_path / "results.xlsx")
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import json
+
+from benchmarks import run
+
+
+def test_compare_flags_only_slowdowns_past_threshold():
+    baseline = {"fast": 1.0, "steady": 1.0, "new-only-in-baseline": 1.0}
+    results = {"fast": 1.6, "steady": 1.4, "unbaselined": 9.0}
+
+    regressions = run.compare(results, baseline, threshold=0.5)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("fast:")
+
+
+def test_update_writes_machine_readable_baseline(tmp_path, monkeypatch):
+    monkeypatch.setattr(run, "collect", lambda selected, skip_large: {"model.calculate_metrics": 2e-6})
+    baseline = tmp_path / "baseline.json"
+
+    assert run.main(["--update", "--baseline", str(baseline)]) == 0
+    assert json.loads(baseline.read_text())["results"] == {"model.calculate_metrics": 2e-6}
+
+    monkeypatch.setattr(run, "collect", lambda selected, skip_large: {"model.calculate_metrics": 4e-6})
+    assert run.main(["--baseline", str(baseline), "--threshold", "0.5"]) == 1
+    assert run.main(["--baseline", str(baseline), "--threshold", "1.5"]) == 0
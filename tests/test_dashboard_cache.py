@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import dashboard_cache
+
+
+def test_keys_ignore_sub_precision_slider_noise():
+    assert dashboard_cache.cache_key((2446808.511, 2450, 1450.0, 60459.33, 4.0654, 95)) == dashboard_cache.cache_key(
+        (2446808.512, 2450.0, 1450, 60459.33, 4.06540001, 95.0)
+    )
+    assert dashboard_cache.normalize_inputs((None, "", 1, 2, 3, 4))[:2] == (None, None)
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = dashboard_cache.ResultCache(max_entries=2, max_bytes=1024)
+    cache.put("a", {"value": 1})
+    cache.put("b", {"value": 2})
+    assert cache.get("a") == {"value": 1}
+    cache.put("c", {"value": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"value": 1}
+    assert cache.stats()["evictions"] == 1
+
+    cache.put("big", {"value": "x" * 900})
+    assert cache.stats()["bytes"] <= 1024
+    assert cache.get("big") is not None
+
+    stats = cache.stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_shared_store_serves_other_workers(tmp_path):
+    path = tmp_path / "dashboard-cache.sqlite"
+    first = dashboard_cache.ResultCache(shared_path=path)
+    second = dashboard_cache.ResultCache(shared_path=path)
+
+    first.put("key", {"cards": [["NOI", "$1"]]})
+
+    assert second.get("key") == {"cards": [["NOI", "$1"]]}
+    assert second.stats()["shared_hits"] == 1
+    assert second.get("key") == {"cards": [["NOI", "$1"]]}
+    assert second.stats()["hits"] == 1
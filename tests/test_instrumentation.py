@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import time
+
+import app
+import instrumentation
+
+
+def test_stages_are_recorded_only_while_enabled():
+    instrumentation.registry.reset()
+    instrumentation.enable(False)
+    app.result_cache.clear()
+    app.update_dashboard(2_400_000, 2450, 1450, 60459.33, 4.5, 80)
+    assert instrumentation.registry.snapshot() == {}
+
+    instrumentation.enable()
+    try:
+        app.result_cache.clear()
+        app.update_dashboard(2_400_000, 2450, 1450, 60459.33, 4.5, 80)
+        app.update_dashboard(2_400_000, 2450, 1450, 60459.33, 4.5, 80)
+    finally:
+        instrumentation.enable(False)
+
+    snapshot = instrumentation.registry.snapshot()
+    assert snapshot["dashboard.update_dashboard"]["count"] == 2
+    assert snapshot["dashboard.cache_lookup"]["count"] == 2
+    assert snapshot["dashboard.projection"]["count"] == 1
+    assert snapshot["model.calculate_metrics"]["count"] == 1
+    assert sum(snapshot["dashboard.patch"]["counts"]) == 2
+
+
+def test_metrics_endpoint_renders_prometheus_histograms():
+    instrumentation.registry.reset()
+    instrumentation.registry.observe("model.calculate_metrics", 0.0003)
+    instrumentation.registry.observe("model.calculate_metrics", 7.0)
+
+    response = app.server.test_client().get("/metrics")
+
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert 'eightplex_stage_seconds_bucket{stage="model.calculate_metrics",le="0.0005"} 1' in body
+    assert 'eightplex_stage_seconds_bucket{stage="model.calculate_metrics",le="+Inf"} 2' in body
+    assert 'eightplex_stage_seconds_count{stage="model.calculate_metrics"} 2' in body
+    assert "eightplex_dashboard_cache_hits " in body
+    assert "# TYPE eightplex_dashboard_cache_hits counter" in body
+    assert "# TYPE eightplex_dashboard_cache_entries gauge" in body
+    instrumentation.registry.reset()
+
+
+def test_request_latency_is_labelled_by_route_pattern():
+    instrumentation.registry.reset()
+    instrumentation.enable()
+    try:
+        client = app.server.test_client()
+        client.get("/metrics")
+        client.get("/no-such-route-1")
+        client.get("/no-such-route-2")
+    finally:
+        instrumentation.enable(False)
+
+    stages = set(instrumentation.registry.snapshot())
+    instrumentation.registry.reset()
+    assert "http /metrics" in stages
+    assert not any("no-such-route" in stage for stage in stages)
+
+
+def test_sampling_profiler_collects_collapsed_stacks():
+    profiler = instrumentation.SamplingProfiler(interval=0.001)
+    profiler.start()
+    deadline = time.perf_counter() + 0.1
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    profiler.stop()
+
+    assert "test_sampling_profiler_collects_collapsed_stacks" in profiler.collapsed()
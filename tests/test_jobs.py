@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+import app
+import jobs
+import model
+
+
+@jobs.task("test-countdown")
+def _countdown(params, progress):
+    steps = params["steps"]
+    for step in range(steps):
+        time.sleep(params.get("delay", 0.01))
+        progress((step + 1) / steps, f"step {step + 1}")
+    if params.get("fail"):
+        raise ValueError("bad input")
+    return {"steps": steps}
+
+
+def _wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for job state"
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = jobs.JobManager(tmp_path / "jobs.sqlite3", workers=2)
+    yield manager
+    manager.shutdown()
+
+
+def test_grid_job_matches_evaluate_grid_and_caches_by_input_hash(manager):
+    baseline = model.load_frozen_baseline()
+    params = {
+        "assumptions": baseline,
+        "x": {"name": "interest_rate", "low": 0.03, "high": 0.06, "points": 7},
+        "y": {"name": "loan_to_value", "low": 0.6, "high": 0.9, "points": 5},
+        "chunk_rows": 2,
+    }
+
+    job_id = manager.submit("grid", params)
+    status = manager.wait(job_id, timeout=30)
+
+    assert status["status"] == jobs.DONE and status["progress"] == 1.0
+    expected = model.evaluate_grid(baseline, "interest_rate", np.linspace(0.03, 0.06, 7), "loan_to_value", np.linspace(0.6, 0.9, 5))
+    assert np.allclose(manager.result(job_id)["dscr"], expected["dscr"])
+    assert manager.submit("grid", dict(params)) == job_id
+    assert manager.submit("grid", {**params, "chunk_rows": 3}) != job_id
+
+
+def test_jobs_report_progress_and_can_be_cancelled(manager):
+    job_id = manager.submit("test-countdown", {"steps": 2000})
+    _wait_for(lambda: manager.status(job_id)["progress"] > 0)
+
+    assert manager.status(job_id)["status"] == jobs.RUNNING
+    assert manager.cancel(job_id)
+    _wait_for(lambda: manager.status(job_id)["status"] in jobs.FINISHED_STATES)
+    status = manager.status(job_id)
+    assert status["status"] == jobs.CANCELLED and 0 < status["progress"] < 1
+    assert manager.result(job_id) is None
+    assert manager.submit("test-countdown", {"steps": 2000}) != job_id
+
+
+def test_failed_jobs_record_the_error(manager):
+    job_id = manager.submit("test-countdown", {"steps": 1, "fail": True})
+
+    status = manager.wait(job_id, timeout=10)
+
+    assert status["status"] == jobs.FAILED and status["error"] == "ValueError: bad input"
+    with pytest.raises(ValueError):
+        manager.submit("no-such-job", {})
+
+
+def test_dashboard_runs_analyses_in_the_background(manager, monkeypatch):
+    monkeypatch.setattr(app, "job_manager", lambda: manager)
+    monkeypatch.setattr(app, "JOB_GRID_RESOLUTION", 20)
+
+    job, poll_disabled, _ = app.start_job(1, "grid", "rate-ltv", 2_400_000, 2450, 1450, 60459.33, 4.5, 80)
+    assert poll_disabled is False
+    manager.wait(job["id"], timeout=30)
+    progress, status, figure, poll_disabled = app.poll_job(1, job)
+
+    assert progress == 1 and poll_disabled and status.endswith("finished.")
+    assert np.asarray(figure.data[0].z).shape == (20, 20)
+
+
+def test_importing_the_app_does_not_create_the_jobs_database(tmp_path):
+    database = tmp_path / "jobs.sqlite3"
+    environment = {**os.environ, jobs.JOBS_PATH_ENV: str(database)}
+    root = Path(app.__file__).resolve().parent
+    subprocess.run([sys.executable, "-c", "import app"], cwd=root, env=environment, check=True)
+
+    assert not database.exists()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import math
+
+import pytest
+
+import market_rents
+import model
+
+
+def test_parses_thousands_separators_and_missing_cells():
+    table = market_rents.load_market_rents()
+
+    castledown = table.match("Castledown")
+    assert table.rents[castledown].tolist()[:4] == [900.0, 1251.0, 1461.0, 1650.0]
+    assert math.isnan(table.rent("Airdrie", 4))
+    assert table.rent("Calgary", 4) == 2249.0
+
+
+def test_location_keys_are_normalized_and_fuzzy_matched():
+    table = market_rents.load_market_rents()
+
+    assert table.names[table.match("hudsons bay reserve")] == "Hudson's Bay Reserve"
+    assert table.names[table.match("Calgary")] == "CALGARY*"
+    assert table.names[table.match("Airdire")] == "AIRDRIE"
+    assert table.match("Nowhere Particular") is None
+
+
+def test_fill_unit_mix_uses_inferred_bedrooms():
+    assumptions = model.load_baseline_assumptions()
+
+    filled = market_rents.fill_unit_mix_rents(assumptions, "Downtown", source="edmonton")
+
+    assert [unit["rent"] for unit in filled["unit_mix"]] == [1927.0, 1625.0]
+    assert assumptions["unit_mix"][0]["rent"] == 2450.0
+
+
+def test_rank_locations_matches_per_location_underwriting():
+    assumptions = model.load_baseline_assumptions()
+
+    ranking = market_rents.rank_locations(assumptions)
+
+    assert ranking["cash_on_cash"].is_monotonic_decreasing
+    best = ranking.iloc[0]
+    filled = market_rents.fill_unit_mix_rents(assumptions, best["location"], source="alberta")
+    assert model.calculate_metrics(filled)["cash_on_cash"] == pytest.approx(best["cash_on_cash"], rel=1e-12)
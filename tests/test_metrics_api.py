@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import gzip
+import json
+
+import pytest
+
+import app
+import metrics_api
+import model
+
+
+@pytest.fixture
+def client():
+    return app.server.test_client()
+
+
+def test_single_scenario_overrides_baseline(client):
+    response = client.post("/api/v1/metrics", json={"interest_rate": 0.05})
+
+    assert response.status_code == 200
+    expected = model.calculate_metrics(model.merge_assumptions(model.load_baseline_assumptions(), {"interest_rate": 0.05}))
+    body = response.get_json()
+    assert body["cash_flow"] == expected["cash_flow"]
+    assert body["error"] is None
+
+
+def test_batch_scores_every_scenario_in_one_call(client, monkeypatch):
+    calls = []
+    batch = model.calculate_metrics_batch
+    monkeypatch.setattr(model, "calculate_metrics_batch", lambda frame: calls.append(len(frame)) or batch(frame))
+    scenarios = [{"id": index, "purchase_price": 2_000_000 + index * 1000} for index in range(2000)] + ["bad"]
+
+    response = client.post(
+        "/api/v1/metrics",
+        json={"scenarios": scenarios, "years": 3, "monthly": True},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    body = json.loads(gzip.decompress(response.get_data()))
+    assert calls == [2000]
+    assert body["count"] == 2001
+    assert body["results"][5]["id"] == "5"
+    assert len(body["results"][5]["monthly_net_cash_flow"]) == 36
+    assert body["results"][-1]["error"].startswith("ValueError")
+
+
+def test_gzip_request_bodies_and_limits(client, monkeypatch):
+    payload = gzip.compress(json.dumps([{"interest_rate": 0.04}] * 3).encode())
+    response = client.post(
+        "/api/v1/metrics", data=payload, headers={"Content-Encoding": "gzip", "Content-Type": "application/json"}
+    )
+    assert response.status_code == 200
+    assert response.get_json()["count"] == 3
+
+    monkeypatch.setattr(metrics_api, "MAX_SCENARIOS", 2)
+    assert client.post("/api/v1/metrics", json=[{}, {}, {}]).status_code == 413
+    monkeypatch.setattr(metrics_api, "MAX_REQUEST_BYTES", 64)
+    assert client.post("/api/v1/metrics", json={"scenarios": [{"purchase_price": 1}] * 20}).status_code == 413
+    assert client.post("/api/v1/metrics", data=b"{", content_type="application/json").status_code == 400
+    assert client.post("/api/v1/metrics", json={"years": 99, "scenario": {}}).status_code == 400
+
+
+def test_projection_options_are_validated_and_follow_their_scenarios(client):
+    for value in ("abc", True, [0.02], [0.01, "x"], {"low": 0.01}):
+        response = client.post("/api/v1/metrics", json={"scenarios": [{}, {}], "years": 5, "rent_growth": value})
+        assert response.status_code == 400, value
+        assert "rent_growth" in response.get_json()["error"]
+
+    response = client.post(
+        "/api/v1/metrics",
+        json={"scenarios": [{}, "bad", {}], "years": 5, "rent_growth": [0.0, 0.5, 0.03], "exit_cap_rate": 0.05},
+    )
+
+    assert response.status_code == 200
+    flat, bad, growing = response.get_json()["results"]
+    assert bad["error"] and flat["irr"] < growing["irr"]
+    expected = model.project_cash_flows_batch(
+        model.scenario_frame([model.load_baseline_assumptions()]), years=5, rent_growth=0.03, exit_cap_rate=0.05
+    )
+    assert growing["irr"] == pytest.approx(expected["irr"][0])
+
+
+def test_malformed_nested_values_fail_only_their_own_scenario(client):
+    response = client.post("/api/v1/metrics", json={"scenario": {"unit_mix": [{"units": [1], "rent": 2}]}})
+
+    assert response.status_code == 422
+    assert response.get_json()["error"] == "TypeError: unit_mix[0].units must be a number, got list"
+
+    scenarios = [
+        {"interest_rate": 0.05},
+        {"unit_mix": [{"units": "2", "rent": 3000}]},
+        {"other_income_items": [{"units": 1, "usage": True, "monthly_amount": 50}]},
+        {"unit_mix": [{}, {"rent": 1600}]},
+    ]
+    response = client.post("/api/v1/metrics", json={"scenarios": scenarios})
+
+    assert response.status_code == 200
+    good, text, flag, partial = response.get_json()["results"]
+    assert text["error"] == "TypeError: unit_mix[0].units must be a number, got str" and text["noi"] is None
+    assert flag["error"].startswith("TypeError: other_income_items[0].usage")
+    expected = model.calculate_metrics(model.merge_assumptions(model.load_baseline_assumptions(), scenarios[0]))
+    assert good["error"] is None and good["cash_flow"] == pytest.approx(expected["cash_flow"])
+    expected = model.calculate_metrics(model.merge_assumptions(model.load_baseline_assumptions(), scenarios[3]))
+    assert partial["error"] is None and partial["noi"] == pytest.approx(expected["noi"])
@@ -1,24 +1,73 @@
 from __future__ import annotations
 
+import json
+import shutil
 from pathlib import Path
 
+import numpy as np
+import numpy_financial as npf
 import pytest
 from openpyxl import load_workbook
 
 import model
 
-WORKBOOK = load_workbook(Path(__file__).resolve().parents[1] / "8plexmodel.xlsx", data_only=True)
 TOLERANCE = 1e-6
 
 
-def test_baseline_metrics_match_workbook():
-    assumptions = model.load_baseline_assumptions()
-    metrics = model.calculate_metrics(assumptions)
+def test_baseline_metrics_match_workbook(tmp_path):
+    # Expected values come straight from openpyxl, and the baseline is rebuilt without the sidecar cache.
+    fresh = model._load_snapshot(model.WORKBOOK_PATH, tmp_path / "cache.json")["baseline"]
+    assert model.load_baseline_assumptions() == fresh
+    metrics = model.calculate_metrics(fresh)
+
+    workbook = load_workbook(model.WORKBOOK_PATH, data_only=True, read_only=True)
+    try:
+        for key, (sheet, cell) in model.OUTPUT_CELL_MAP.items():
+            expected = workbook[sheet][cell].value
+            assert expected is not None
+            assert metrics[key] == pytest.approx(expected, rel=1e-4, abs=1e-2)
+    finally:
+        workbook.close()
+
+
+def test_baseline_cache_is_reused_until_workbook_changes(tmp_path, monkeypatch):
+    workbook_path = tmp_path / "8plexmodel.xlsx"
+    cache_path = tmp_path / ".8plexmodel.cache.json"
+    shutil.copy(model.WORKBOOK_PATH, workbook_path)
+
+    built = model._load_snapshot(workbook_path, cache_path)
+    assert built["baseline"] == model.load_baseline_assumptions()
+    assert json.loads(cache_path.read_text())["workbook_sha256"] == model._workbook_digest(workbook_path)
+
+    def fail_extract(path):
+        raise AssertionError("workbook should not be parsed on a cache hit")
+
+    monkeypatch.setattr(model, "extract_cells", fail_extract)
+    assert model._load_snapshot(workbook_path, cache_path) == built
+
+    stale = dict(built, workbook_sha256="0" * 64)
+    cache_path.write_text(json.dumps(stale))
+    monkeypatch.undo()
+    rebuilt = model._load_snapshot(workbook_path, cache_path)
+    assert rebuilt["workbook_sha256"] == built["workbook_sha256"]
+
+
+def test_baseline_cache_is_rebuilt_when_the_builder_changes(tmp_path, monkeypatch):
+    workbook_path = tmp_path / "8plexmodel.xlsx"
+    cache_path = tmp_path / ".8plexmodel.cache.json"
+    shutil.copy(model.WORKBOOK_PATH, workbook_path)
+    built = model._load_snapshot(workbook_path, cache_path)
 
-    for key, (sheet, cell) in model.OUTPUT_CELL_MAP.items():
-        expected = WORKBOOK[sheet][cell].value
-        assert expected is not None
-        assert metrics[key] == pytest.approx(expected, rel=1e-4, abs=1e-2)
+    # A cache written by an older version of the inference code must not keep serving its stale rate.
+    cache_path.write_text(json.dumps({**built, "builder": "0" * 64, "baseline": {**built["baseline"], "interest_rate": 0.5}}))
+    assert model._load_snapshot(workbook_path, cache_path)["baseline"] == built["baseline"]
+
+    model._builder_fingerprint.cache_clear()
+    monkeypatch.setattr(model, "_infer_interest_rate", lambda *args: 0.0)
+    try:
+        assert model._builder_fingerprint() != built["builder"]
+    finally:
+        model._builder_fingerprint.cache_clear()
 
 
 def test_richer_rent_and_lower_rate_improves_metrics():
@@ -45,3 +94,248 @@ def test_monthly_projection_aligns_with_annual_cash_flow():
     assert len(monthly_projection) == 12
     assert set(["Month", "Gross Rent", "Net Cash Flow"]).issubset(monthly_projection.columns)
     assert pytest.approx(monthly_projection["Net Cash Flow"].sum(), rel=1e-4) == metrics["cash_flow"]
+
+
+def test_batch_metrics_match_scalar_metrics_exactly():
+    scenarios = []
+    for index in range(60):
+        assumptions = model.load_baseline_assumptions()
+        assumptions["purchase_price"] *= 0.8 + index / 100
+        assumptions["interest_rate"] = 0.0 if index % 7 == 0 else 0.02 + index / 1000
+        assumptions["amort_years"] = 0 if index % 11 == 0 else 25 + index % 26
+        assumptions["loan_to_value"] = 0.65 + (index % 30) / 100
+        assumptions["deposit_pct"] = 0.0 if index % 3 == 0 else 1 - assumptions["loan_to_value"]
+        assumptions["unit_mix"][0]["rent"] += index * 10
+        scenarios.append(assumptions)
+    scenarios.append({**model.load_baseline_assumptions(), "purchase_price": 0.0, "broker_fee": 0.0})
+
+    frame = model.scenario_frame(scenarios)
+    expected = [model.calculate_metrics(assumptions) for assumptions in scenarios]
+
+    for batch in (model.calculate_metrics_batch(frame), model.calculate_metrics_batch(frame.to_records(index=False))):
+        for row, metrics in zip(batch.to_dict("records"), expected):
+            assert row == metrics
+
+
+def test_batch_metrics_reject_rent_columns_without_unit_counts():
+    frame = model.scenario_frame([model.load_baseline_assumptions()]).drop(columns="units_1")
+
+    with pytest.raises(ValueError, match="rent_1"):
+        model.calculate_metrics_batch(frame)
+
+
+def test_vectorized_pmt_handles_zero_rate_and_zero_periods():
+    payments = model._pmt_array([0.004, 0.0, 0.004, 0.004], [300, 120, 0, 300], [100000.0, 120000.0, 100000.0, 0.0])
+
+    assert payments.tolist() == [model._pmt(0.004, 300, 100000.0), 1000.0, 0.0, 0.0]
+
+
+def test_grid_evaluation_matches_scalar_metrics_at_each_point():
+    assumptions = model.load_baseline_assumptions()
+    rates = [0.03, 0.045, 0.06]
+    ltvs = [0.65, 0.8, 0.95]
+
+    grid = model.evaluate_grid(assumptions, "interest_rate", rates, "loan_to_value", ltvs)
+
+    assert grid["dscr"].shape == (len(ltvs), len(rates))
+    for row, ltv in enumerate(ltvs):
+        for column, rate in enumerate(rates):
+            point = model.load_baseline_assumptions()
+            point["interest_rate"] = rate
+            point["loan_to_value"] = ltv
+            point["deposit_pct"] = 1 - ltv
+            expected = model.calculate_metrics(point)
+            assert grid["dscr"][row, column] == pytest.approx(expected["dscr"], rel=1e-12)
+            assert grid["cash_on_cash"][row, column] == pytest.approx(expected["cash_on_cash"], rel=1e-12)
+
+
+def test_tornado_ranks_inputs_by_cash_flow_swing():
+    tornado = model.sensitivity_tornado(model.load_baseline_assumptions())
+
+    assert set(tornado["input"]) == set(model.TORNADO_INPUTS)
+    assert tornado["range"].is_monotonic_increasing
+    rents = tornado.set_index("input").loc["rent_scale"]
+    assert rents["low"] < 0 < rents["high"]
+
+
+def test_risk_simulation_is_reproducible_across_workers():
+    serial = model.simulate_risk(paths=20_000, chunk_size=4_000, seed=7, workers=1)
+    parallel = model.simulate_risk(paths=20_000, chunk_size=4_000, seed=7, workers=2)
+
+    assert serial["paths"] == 20_000
+    assert serial["prob_dscr_below"] == parallel["prob_dscr_below"]
+    for name in model.RISK_METRICS:
+        assert serial[name]["p5"] < serial[name]["p50"] < serial[name]["p95"]
+        assert serial[name]["p50"] == parallel[name]["p50"]
+        assert (serial[name]["histogram"] == parallel[name]["histogram"]).all()
+
+
+def test_risk_simulation_without_variance_reproduces_baseline():
+    assumptions = model.load_baseline_assumptions()
+    metrics = model.calculate_metrics(assumptions)
+    fixed = {
+        "rent": {"kind": "fixed", "loc": 1.0},
+        "vacancy": {"kind": "fixed", "loc": 0.0},
+        "operating_expenses": {"kind": "fixed", "loc": 1.0},
+        "interest_rate": {"kind": "fixed", "loc": 0.0},
+    }
+
+    result = model.simulate_risk(assumptions, paths=1_000, distributions=fixed, workers=1)
+
+    for name in model.RISK_METRICS:
+        assert result[name]["mean"] == pytest.approx(metrics[name], rel=1e-9)
+        assert result[name]["p50"] == pytest.approx(metrics[name], rel=1e-3)
+    assert result["prob_dscr_below"] == (1.0 if metrics["dscr"] < 1.2 else 0.0)
+
+
+def test_risk_simulation_rejects_empty_runs():
+    with pytest.raises(ValueError, match="paths"):
+        model.simulate_risk(paths=0, workers=1)
+
+
+def test_risk_simulation_treats_debt_free_paths_as_unbounded_coverage():
+    assumptions = model.load_baseline_assumptions()
+    assumptions["deposit_pct"] = 1.0
+    assumptions["loan_to_value"] = 0.0
+
+    result = model.simulate_risk(assumptions, paths=2_000, workers=1)
+
+    assert result["prob_dscr_below"] == 0.0
+    assert result["dscr"]["unbounded"] == 2_000
+    assert result["dscr"]["p50"] == float("inf")
+
+
+def test_risk_histogram_extends_past_the_pilot_range():
+    wide = {"rent": {"kind": "normal", "loc": 1.0, "scale": 0.01}}
+    result = model.simulate_risk(paths=40_000, chunk_size=100, distributions=wide, seed=3, workers=1)
+
+    for name in ("noi", "cash_flow"):
+        histogram, edges = result[name]["histogram"], result[name]["edges"]
+        assert histogram.sum() == 40_000
+        assert edges[0] <= result[name]["min"] and result[name]["max"] <= edges[-1]
+
+
+def test_projection_amortizes_loan_and_tracks_equity():
+    assumptions = model.load_baseline_assumptions()
+    assumptions["amort_years"] = 25
+    metrics = model.calculate_metrics(assumptions)
+
+    projection = model.project_monthly_cash_flows(assumptions, years=30, rent_growth=0.02, expense_growth=0.02)
+
+    assert len(projection) == 360
+    assert (projection["Debt Service"] - projection["Interest"] - projection["Principal"]).abs().max() < 1e-6
+    assert projection["Principal"].sum() == pytest.approx(metrics["total_loan"], rel=1e-9)
+    assert projection["Loan Balance"].iloc[299] == pytest.approx(0.0, abs=1e-6)
+    assert projection["Debt Service"].iloc[300:].eq(0).all()
+    assert projection["Equity"].iloc[-1] == pytest.approx(metrics["equity_required"] + metrics["total_loan"], rel=1e-9)
+    assert projection["Gross Rent"].iloc[12] == pytest.approx(projection["Gross Rent"].iloc[0] * 1.02)
+
+
+def test_batch_projection_reports_irr_and_equity_multiple():
+    assumptions = model.load_baseline_assumptions()
+    assumptions["loan_to_value"] = 0.75
+    assumptions["deposit_pct"] = 0.25
+    frame = model.scenario_frame([assumptions, assumptions])
+
+    projection = model.project_cash_flows_batch(frame, years=10, rent_growth=[0.0, 0.03], detail=False)
+
+    equity = model.calculate_metrics(assumptions)["equity_required"]
+    flows = np.concatenate([[-equity], projection["net_cash_flow"][:, 0]])
+    flows[-1] += projection["exit_proceeds"][0]
+    monthly = (1 + projection["irr"][0]) ** (1 / 12) - 1
+    assert np.sum(flows / (1 + monthly) ** np.arange(len(flows))) == pytest.approx(0.0, abs=1e-4)
+    assert projection["irr"][1] > projection["irr"][0]
+    assert projection["equity_multiple"][0] == pytest.approx((flows.sum() + equity) / equity)
+
+
+def test_batch_projection_solves_losses_and_reports_total_loss_and_no_irr():
+    baseline = model.load_baseline_assumptions()
+    vacant = model.merge_assumptions(
+        baseline, {"unit_mix": [{"rent": 0}, {"rent": 0}], "other_income_items": [{"monthly_amount": 0}] * 2}
+    )
+    frame = model.scenario_frame([baseline, vacant])
+
+    partial = model.project_cash_flows_batch(frame, years=5)
+    short = model.project_cash_flows_batch(frame, years=1)
+    skipped = model.project_cash_flows_batch(frame, years=1, irr=False)
+
+    # Money back but less than was put in: a real negative IRR exists and must match numpy_financial.
+    equity = model.calculate_metrics(baseline)["equity_required"]
+    flows = np.concatenate([[-equity], partial["net_cash_flow"][:, 0]])
+    flows[-1] += partial["exit_proceeds"][0]
+    assert 0 < partial["equity_multiple"][0] < 1
+    assert partial["irr"][0] == pytest.approx((1 + npf.irr(flows)) ** 12 - 1, rel=1e-9)
+    assert -1 < partial["irr"][0] < 0
+    # Nothing positive ever comes back on the vacant building: a total loss.
+    assert partial["irr"][1] == short["irr"][1] == -1.0
+    # A year of positive cash flow followed by a sale below the loan balance has no rate that zeroes the NPV.
+    flows = np.concatenate([[-equity], short["net_cash_flow"][:, 0]])
+    flows[-1] += short["exit_proceeds"][0]
+    assert np.isnan(npf.irr(flows)) and np.isnan(short["irr"][0])
+    assert "irr" not in skipped
+    assert np.array_equal(skipped["equity_multiple"], short["equity_multiple"])
+
+
+def test_projection_rejects_horizon_outside_supported_range():
+    with pytest.raises(ValueError):
+        model.project_monthly_cash_flows(model.load_baseline_assumptions(), years=41)
+
+
+def test_annuity_rate_solver_inverts_pmt():
+    rates = np.array([0.001, 0.0035, 0.01])
+    periods = np.array([60, 300, 600])
+    payments = [model._pmt(rate, int(n), 250000.0) for rate, n in zip(rates, periods)]
+
+    solved = model._solve_annuity_rate(payments, 250000.0, periods)
+
+    assert solved == pytest.approx(rates, rel=1e-10)
+    for payment, n, rate in zip(payments, periods, solved):
+        assert model._solve_annuity_rate_scalar(payment, 250000.0, float(n)) == pytest.approx(rate, rel=1e-12)
+    assert model._infer_interest_rate(0.0, 250000.0, 25, default=0.05) == 0.05
+
+
+def test_goal_seek_hits_targets_for_single_and_batched_scenarios():
+    assumptions = model.load_baseline_assumptions()
+
+    max_price = model.goal_seek(assumptions, "dscr", 1.25, "purchase_price")
+    priced = model.load_baseline_assumptions()
+    priced["purchase_price"] = max_price
+    assert model.calculate_metrics(priced)["dscr"] == pytest.approx(1.25, rel=1e-8)
+
+    break_even_rate = model.goal_seek(assumptions, "cash_flow", 0.0, "interest_rate")
+    financed = model.load_baseline_assumptions()
+    financed["interest_rate"] = break_even_rate
+    assert model.calculate_metrics(financed)["cash_flow"] == pytest.approx(0.0, abs=1e-4)
+
+    frame = model.scenario_frame([assumptions] * 3)
+    rents = model.goal_seek(frame, "cash_flow", [0.0, 10000.0, 1e9], "rent_1")
+    assert rents[0] < rents[1]
+    assert np.isnan(rents[2])
+
+
+def test_frozen_assumptions_round_trip_and_share_unchanged_fields():
+    baseline = model.load_baseline_assumptions()
+    frozen = model.FrozenAssumptions(baseline)
+
+    assert frozen.to_dict() == baseline
+    assert frozen == baseline
+    assert model.calculate_metrics(frozen) == model.calculate_metrics(baseline)
+    assert model.scenario_record(frozen) == model.scenario_record(baseline)
+
+    updated = frozen.with_(interest_rate=0.05).with_unit(0, rent=3000.0)
+    assert frozen["interest_rate"] == baseline["interest_rate"]
+    assert updated["unit_mix"][0]["rent"] == 3000.0
+    assert updated["operating_expenses"] is frozen["operating_expenses"]
+    assert updated["unit_mix"][1] is frozen["unit_mix"][1]
+
+    expected = model.load_baseline_assumptions()
+    expected["interest_rate"] = 0.05
+    expected["unit_mix"][0]["rent"] = 3000.0
+    assert updated.to_dict() == expected
+    assert model.calculate_metrics(updated) == model.calculate_metrics(expected)
+    assert model.goal_seek(updated, "dscr", 1.2, "interest_rate") == pytest.approx(
+        model.goal_seek(expected, "dscr", 1.2, "interest_rate")
+    )
+
+    with pytest.raises(TypeError):
+        updated["unit_mix"][0]["rent"] = 1.0
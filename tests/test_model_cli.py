@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import csv
+import json
+
+import pytest
+
+import model
+import model_cli
+import scoring
+
+
+def _write_records(path, count: int) -> list:
+    baseline = model.load_baseline_assumptions()
+    overrides = []
+    with path.open("w") as stream:
+        for index in range(count):
+            override = {"id": f"deal-{index}", "interest_rate": 0.03 + index * 0.001, "unit_mix": [{"rent": 2000 + index}]}
+            overrides.append(override)
+            stream.write(json.dumps(override) + "\n")
+        stream.write("{not json\n\n")
+        stream.write(json.dumps({"assumptions": baseline}) + "\n")
+    return overrides
+
+
+def test_streams_metrics_for_baseline_overrides_in_batches(tmp_path):
+    source = tmp_path / "deals.jsonl"
+    overrides = _write_records(source, 25)
+    output = tmp_path / "metrics.jsonl"
+
+    assert model_cli.main([str(source), "-o", str(output), "--baseline", "--batch-size", "10", "--workers", "2"]) == 0
+
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row["row"] for row in rows] == list(range(27))
+    for row, override in zip(rows, overrides):
+        expected = model.calculate_metrics(model.merge_assumptions(model.load_baseline_assumptions(), override))
+        assert row["id"] == override["id"]
+        assert row["cash_flow"] == expected["cash_flow"]
+        assert row["dscr"] == expected["dscr"]
+    assert rows[25]["error"].startswith("JSONDecodeError") and rows[25]["noi"] is None
+    assert rows[26]["noi"] == model.calculate_metrics(model.load_baseline_assumptions())["noi"]
+
+
+def test_csv_output_with_projection_columns(tmp_path):
+    source = tmp_path / "deals.jsonl"
+    _write_records(source, 3)
+    output = tmp_path / "metrics.csv"
+
+    assert model_cli.main([str(source), "-o", str(output), "--baseline", "--years", "5"]) == 0
+
+    with output.open() as stream:
+        rows = list(csv.DictReader(stream))
+    assert list(rows[0]) == scoring.output_columns(5)
+    projection = model.project_cash_flows_batch(
+        model.scenario_frame([model.merge_assumptions(model.load_baseline_assumptions(), {"interest_rate": 0.03, "unit_mix": [{"rent": 2000}]})]),
+        years=5,
+    )
+    assert float(rows[0]["irr"]) == pytest.approx(projection["irr"][0])
+
+
+def test_merge_assumptions_applies_partial_overrides():
+    baseline = model.load_frozen_baseline()
+    merged = model.merge_assumptions(baseline, {"unit_mix": [{}, {"rent": 1600}], "loan_to_value": 0.8, "operating_expenses": {"Insurance": 0}})
+
+    assert merged["unit_mix"][0] == baseline["unit_mix"][0]
+    assert merged["unit_mix"][1]["rent"] == 1600
+    assert merged["deposit_pct"] == pytest.approx(0.2)
+    expenses = {**baseline["operating_expenses"], "Insurance": 0}
+    assert merged["operating_expense_total"] == pytest.approx(sum(expenses.values()))
+    assert baseline["unit_mix"][1]["rent"] != 1600
+
+
+def test_malformed_nested_values_become_error_rows(tmp_path):
+    source = tmp_path / "deals.jsonl"
+    lines = [{"id": "good-0"}, {"id": "bad", "unit_mix": [{"units": {"a": 1}, "rent": 3000}]}, {"id": "good-1", "interest_rate": 0.05}]
+    source.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    output = tmp_path / "metrics.jsonl"
+
+    assert model_cli.main([str(source), "-o", str(output), "--baseline", "--years", "3"]) == 0
+
+    good, bad, other = [json.loads(line) for line in output.read_text().splitlines()]
+    assert bad["id"] == "bad" and bad["error"] == "TypeError: unit_mix[0].units must be a number, got dict"
+    assert bad["noi"] is None and bad["irr"] is None
+    for row, line in ((good, lines[0]), (other, lines[2])):
+        expected = model.calculate_metrics(model.merge_assumptions(model.load_baseline_assumptions(), line))
+        assert row["error"] is None and row["cash_flow"] == expected["cash_flow"]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import itertools
+
+import numpy as np
+import pytest
+
+import app
+import model
+import optimizer
+
+
+def test_pareto_front_keeps_only_non_dominated_points():
+    cash_flow = np.array([10.0, 12.0, 8.0, 15.0, 12.0])
+    equity = np.array([100.0, 150.0, 90.0, 300.0, 200.0])
+
+    front = set(optimizer.pareto_front(cash_flow, equity))
+
+    assert front == {0, 1, 2, 3}
+
+
+def _deal(baseline, loan_to_value, interest_rate, amort_years):
+    return baseline.with_(
+        loan_to_value=loan_to_value, deposit_pct=1 - loan_to_value, interest_rate=interest_rate, amort_years=amort_years
+    )
+
+
+def test_optimize_respects_constraints_and_beats_brute_force_grid():
+    baseline = model.load_frozen_baseline()
+    variables = {"loan_to_value": (0.5, 0.9), "interest_rate": (0.04, 0.07), "amort_years": (20, 30)}
+    constraints = {"dscr": (1.25, None), "equity_required": (None, 900_000)}
+
+    result = optimizer.optimize(baseline, variables, objective="cash_flow", constraints=constraints, resolution=5)
+
+    best = result["best"]
+    assert best["dscr"] >= 1.25 and best["equity_required"] <= 900_000
+    assert best["amort_years"] == round(best["amort_years"])
+    brute = -np.inf
+    for ltv, rate, years in itertools.product(np.linspace(0.5, 0.9, 5), np.linspace(0.04, 0.07, 5), range(20, 31)):
+        metrics = model.calculate_metrics(_deal(baseline, ltv, rate, years))
+        if metrics["dscr"] >= 1.25 and metrics["equity_required"] <= 900_000:
+            brute = max(brute, metrics["cash_flow"])
+    assert best["cash_flow"] >= brute - 1e-6
+    recomputed = model.calculate_metrics(
+        _deal(baseline, best["loan_to_value"], best["interest_rate"], int(best["amort_years"]))
+    )
+    assert recomputed["cash_flow"] == pytest.approx(best["cash_flow"])
+
+    pareto = result["pareto"]
+    assert (pareto["dscr"] >= 1.25).all() and (pareto["equity_required"] <= 900_000).all()
+    assert pareto["equity_required"].is_monotonic_increasing and pareto["cash_flow"].is_monotonic_increasing
+
+
+def test_optimize_reports_infeasible_constraints():
+    result = optimizer.optimize(model.load_frozen_baseline(), ["loan_to_value"], constraints={"dscr": (10.0, None)})
+
+    assert result["best"] is None and result["pareto"].empty and result["feasible"] == 0
+
+
+def test_optimize_coarsens_the_grid_for_many_variables():
+    baseline = model.load_frozen_baseline()
+    variables = list(optimizer.OPTIMIZER_VARIABLES)
+
+    result = optimizer.optimize(baseline, variables, refine_rounds=0, max_grid_points=5_000)
+
+    assert result["evaluated"] <= 5_000
+    assert result["evaluated"] == 4 ** len(variables)
+
+
+def test_dashboard_optimizer_callback_draws_frontier():
+    figure, status = app.update_optimizer(
+        1, "cash_on_cash", ["purchase_price", "loan_to_value"], 1.25, 600_000, 2_400_000, 2450, 1450, 60459.33, 4.5, 80
+    )
+
+    assert len(figure.data[0].x) > 0 and len(figure.data[1].x) == 1
+    assert status.startswith("Best cash on cash")
+    assert app.update_optimizer(1, "cash_flow", [], 1.25, 600_000, 2_400_000, 2450, 1450, 60459.33, 4.5, 80)[1]
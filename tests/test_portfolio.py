@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+
+import model
+import portfolio
+
+
+def _properties():
+    properties = []
+    for index, scale in enumerate((0.8, 1.0, 1.1, 1.3, 0.9)):
+        assumptions = model.load_baseline_assumptions()
+        assumptions["purchase_price"] *= scale
+        assumptions["interest_rate"] += index * 0.002
+        properties.append(assumptions)
+    return properties
+
+
+def test_streaming_score_matches_batch_totals_and_rankings():
+    properties = _properties()
+    frame = portfolio.portfolio_frame(properties, names=[f"Deal {index}" for index in range(len(properties))])
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False)
+    buffer.seek(0)
+
+    result = portfolio.score_portfolio(buffer, chunk_size=2, top_n=3, sort_by="dscr")
+
+    metrics = [model.calculate_metrics(assumptions) for assumptions in properties]
+    totals = result["totals"]
+    assert totals["properties"] == len(properties)
+    assert totals["noi"] == pytest.approx(sum(item["noi"] for item in metrics))
+    assert totals["equity_required"] == pytest.approx(sum(item["equity_required"] for item in metrics))
+    assert totals["weighted_dscr"] == pytest.approx(
+        sum(item["noi"] for item in metrics) / sum(item["debt_service_annual"] for item in metrics)
+    )
+    expected_order = sorted(range(len(metrics)), key=lambda index: -metrics[index]["dscr"])[:3]
+    assert result["rankings"]["property_id"].tolist() == expected_order
+    assert result["rankings"]["rank"].tolist() == [1, 2, 3]
+
+
+def test_itemized_operating_expenses_stand_in_for_missing_total():
+    frame = portfolio.portfolio_frame(_properties()[:1]).drop(columns=["operating_expense_total"])
+    frame["opex_taxes"] = 40000.0
+    frame["opex_insurance"] = 10000.0
+
+    result = portfolio.score_portfolio(frame)
+
+    expected = model.load_baseline_assumptions()
+    expected["purchase_price"] *= 0.8
+    expected["operating_expense_total"] = 50000.0
+    assert result["totals"]["noi"] == pytest.approx(model.calculate_metrics(expected)["noi"])
+
+
+def test_generated_property_ids_continue_across_chunks():
+    properties = _properties()
+    frame = portfolio.portfolio_frame(properties).drop(columns=["property_id"])
+
+    result = portfolio.score_portfolio(frame, chunk_size=2, top_n=len(properties), sort_by="dscr")
+
+    metrics = [model.calculate_metrics(assumptions) for assumptions in properties]
+    expected_order = sorted(range(len(metrics)), key=lambda index: -metrics[index]["dscr"])
+    assert result["rankings"]["property_id"].tolist() == expected_order
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+import model
+import scenario_store
+
+
+def _json_scenarios(count: int) -> list:
+    baseline = model.load_baseline_assumptions()
+    scenarios = []
+    for index in range(count):
+        scenarios.append(
+            {
+                "id": f"scenario-{index}",
+                "name": f"Scenario {index}",
+                "createdAt": f"2024-01-{index + 1:02d}T00:00:00.000Z",
+                "assumptions": {
+                    "purchasePrice": baseline["purchase_price"] + index * 50_000,
+                    "brokerFee": baseline["broker_fee"],
+                    "depositPct": baseline["deposit_pct"],
+                    "operatingExpenseTotal": baseline["operating_expense_total"],
+                    "operatingExpenses": baseline["operating_expenses"],
+                    "unitMix": baseline["unit_mix"],
+                    "otherIncomeItems": [
+                        {"name": item["name"], "units": item["units"], "usage": item["usage"], "monthlyAmount": item["monthly_amount"]}
+                        for item in baseline["other_income_items"]
+                    ],
+                    "interestRate": baseline["interest_rate"],
+                    "amortYears": baseline["amort_years"],
+                    "cmhcPremiumRate": baseline["cmhc_premium_rate"],
+                    "loanToValue": baseline["loan_to_value"],
+                },
+            }
+        )
+    return scenarios
+
+
+def test_bulk_import_precomputes_metrics_from_json_format(tmp_path):
+    path = tmp_path / "scenarios.json"
+    path.write_text(json.dumps(_json_scenarios(20)))
+    store = scenario_store.ScenarioStore(tmp_path / "scenarios.sqlite3")
+
+    assert store.import_json(path, chunk_size=7) == 20
+    assert len(store) == 20
+
+    saved = store.get("scenario-3")
+    assert saved["name"] == "Scenario 3"
+    assert saved["created_at"] == "2024-01-04T00:00:00.000Z"
+    assert saved["assumptions"]["other_income_items"][0]["monthly_amount"] == 100
+    metrics = model.calculate_metrics(saved["assumptions"])
+    for name in scenario_store.METRIC_COLUMNS:
+        assert saved[name] == metrics[name]
+    assert saved["assumptions_hash"] == scenario_store.assumptions_hash(saved["assumptions"])
+
+
+def test_top_n_and_range_queries(tmp_path):
+    store = scenario_store.ScenarioStore(tmp_path / "scenarios.sqlite3")
+    store.save_many(
+        {"id": item["id"], "name": item["name"], "assumptions": scenario_store.from_json_assumptions(item["assumptions"])}
+        for item in _json_scenarios(20)
+    )
+
+    top = store.top("cash_flow", n=3)
+    assert [row["id"] for row in top] == ["scenario-0", "scenario-1", "scenario-2"]
+    assert "assumptions" not in top[0]
+
+    dscrs = sorted(row["dscr"] for row in store.query(limit=None))
+    low, high = dscrs[5], dscrs[10]
+    matches = store.query({"dscr": (low, high)}, order_by="dscr", descending=False, limit=None)
+    assert [row["dscr"] for row in matches] == dscrs[5:11]
+
+    with pytest.raises(ValueError):
+        store.query({"name": (0, 1)})
+
+
+def test_save_reuses_metrics_for_identical_assumptions(tmp_path, monkeypatch):
+    store = scenario_store.ScenarioStore(tmp_path / "scenarios.sqlite3")
+    baseline = model.load_frozen_baseline()
+    first = store.save(baseline, name="Baseline")
+
+    monkeypatch.setattr(scenario_store, "_metric_rows", lambda assumptions: pytest.fail("metrics recomputed"))
+    second = store.save(baseline.to_dict(), name="Copy")
+
+    assert second["assumptions_hash"] == first["assumptions_hash"]
+    assert second["cash_flow"] == first["cash_flow"]
+    assert store.delete(first["id"]) and not store.delete(first["id"])
+    assert len(store) == 1
+
+
+def test_metrics_from_another_model_version_are_recomputed(tmp_path, monkeypatch):
+    store = scenario_store.ScenarioStore(tmp_path / "scenarios.sqlite3")
+    baseline = model.load_frozen_baseline()
+    first = store.save(baseline, name="Baseline")
+    assert store.refresh_metrics() == 0
+
+    monkeypatch.setattr(model, "METRICS_VERSION", model.METRICS_VERSION + 1)
+    computed = []
+    original = scenario_store._metric_rows
+    monkeypatch.setattr(scenario_store, "_metric_rows", lambda assumptions: computed.append(len(assumptions)) or original(assumptions))
+    store.save(baseline.to_dict(), name="Copy")
+
+    assert computed == [1]
+    assert store.refresh_metrics() == 1
+    assert store.refresh_metrics() == 0
+    assert store.get(first["id"])["cash_flow"] == pytest.approx(first["cash_flow"])
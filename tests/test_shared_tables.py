@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import market_rents
+import model
+import shared_tables
+
+
+@pytest.fixture
+def sources(tmp_path):
+    copied = []
+    for name, path in shared_tables.DEFAULT_SOURCES:
+        target = tmp_path / "sources" / path.name
+        target.parent.mkdir(exist_ok=True)
+        shutil.copy(path, target)
+        copied.append((name, target))
+    shared_tables.reset()
+    yield tuple(copied)
+    shared_tables.reset()
+
+
+def test_block_exposes_reference_tables_without_copying(tmp_path, sources):
+    path = shared_tables.ensure_block(tmp_path / "blocks", sources)
+    block = shared_tables.ReferenceBlock(path)
+
+    expected = market_rents.read_market_rents(tuple(market_rents.MARKET_RENT_FILES.items()))
+    assert np.array_equal(block.market_rents, expected.rents, equal_nan=True)
+    assert not block.market_rents.flags.writeable and not block.market_rents.flags.owndata
+    assert block.market_rents.flags.f_contiguous
+    assert block.frozen_baseline() == model.load_frozen_baseline()
+    assert block.market_rent_table().rent("Castledown", 3) == expected.rent("Castledown", 3)
+    assert shared_tables.ensure_block(tmp_path / "blocks", sources) == path
+
+
+def test_current_block_reloads_when_a_source_changes(tmp_path, sources, monkeypatch):
+    monkeypatch.setenv(shared_tables.CHECK_INTERVAL_ENV, "0")
+    directory = tmp_path / "blocks"
+    first = shared_tables.current(directory, sources)
+    assert shared_tables.current(directory, sources) is first
+
+    rents = dict(sources)["edmonton"]
+    rents.write_text(rents.read_text(encoding="utf-8-sig").replace("Castledown,900", "Castledown,950"), encoding="utf-8")
+    os.utime(rents, ns=(rents.stat().st_atime_ns, rents.stat().st_mtime_ns + 1_000_000))
+    second = shared_tables.current(directory, sources)
+
+    assert second.stamp != first.stamp
+    assert second.market_rent_table().rent("Castledown", 0) == 950
+    assert first.market_rent_table().rent("Castledown", 0) == 900
+    assert [path.name for path in directory.glob("*.bin")] == [second.path.name]
+
+
+def test_model_and_market_rents_read_from_the_shared_block(tmp_path, monkeypatch):
+    shared_tables.reset()
+    monkeypatch.setenv(shared_tables.SHARED_TABLES_ENV, str(tmp_path))
+    try:
+        block = shared_tables.current()
+        assert model.load_frozen_baseline() is block.frozen_baseline()
+        assert model.baseline_version() == block.snapshot["workbook_sha256"]
+        assert model.load_baseline_assumptions() == model.load_frozen_baseline().to_dict()
+        assert market_rents.load_market_rents().rents is block.market_rents
+    finally:
+        shared_tables.reset()
+
+
+def test_instances_only_retire_and_clean_up_their_own_blocks(tmp_path, sources, monkeypatch):
+    directory = tmp_path / "blocks"
+    monkeypatch.setenv(shared_tables.INSTANCE_ENV, "other")
+    theirs = shared_tables.ensure_block(directory, sources)
+    monkeypatch.setenv(shared_tables.INSTANCE_ENV, "mine")
+    stale = directory / f"{shared_tables.BLOCK_PREFIX}mine-0000000000000000.bin"
+    stale.write_bytes(b"superseded")
+
+    mine = shared_tables.ensure_block(directory, sources)
+
+    assert mine != theirs and theirs.exists() and not stale.exists()
+    assert shared_tables.ReferenceBlock(theirs).stamp == shared_tables.ReferenceBlock(mine).stamp
+    assert shared_tables.cleanup(directory) == 1
+    assert [path.name for path in directory.glob("*.bin")] == [theirs.name]
+    monkeypatch.setenv(shared_tables.INSTANCE_ENV, "bad-token")
+    with pytest.raises(ValueError):
+        shared_tables.ensure_block(directory, sources)
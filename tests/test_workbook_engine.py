@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import pytest
+from openpyxl import load_workbook
+
+import model
+import workbook_engine
+
+
+def _cached_values(path):
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return {
+            model.cell_key(worksheet.title, cell.coordinate): cell.value
+            for worksheet in workbook.worksheets
+            for row in worksheet.iter_rows()
+            for cell in row
+            if hasattr(cell, "coordinate")
+        }
+    finally:
+        workbook.close()
+
+
+def test_compiled_workbook_reproduces_cached_values():
+    engine = workbook_engine.load_workbook_engine()
+    cached = _cached_values(model.WORKBOOK_PATH)
+
+    assert engine.formulas
+    for key in engine.formulas:
+        # Excel saved a result for every formula cell; each one must match, not just the mapped cells.
+        expected = cached[key]
+        if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+            assert engine[key] == pytest.approx(expected, rel=1e-9, abs=1e-9), key
+        else:
+            assert engine[key] == expected, key
+    for name, (sheet, cell) in model.OUTPUT_CELL_MAP.items():
+        assert engine.get(sheet, cell) == pytest.approx(model._read_cell(sheet, cell)), name
+
+
+def test_changing_an_input_recalculates_only_downstream_cells():
+    engine = workbook_engine.load_workbook_engine()
+    noi = engine["UofA!C34"]
+
+    recalculated = engine.set_inputs({"UofA!C4": 2_500_000})
+
+    assert recalculated == ["UofA!C6", "UofA!C8", "UofA!C36", "UofA!C37", "UofA!I40", "UofA!I42", "UofA!C44"]
+    assert engine["UofA!C34"] == noi
+    assert engine["UofA!I42"] == pytest.approx(noi / 2_500_000)
+    assert engine["UofA!C6"] == pytest.approx(2_500_000 + engine["UofA!C5"])
+
+
+def test_excel_precedence_percent_and_errors():
+    engine = workbook_engine.WorkbookEngine(
+        {
+            "S!A1": 2,
+            "S!A2": "=-A1^2",
+            "S!A3": "=1+2*3^2-50%",
+            "S!A4": '=IF(A1>1,"big","small")&"!"',
+            "S!A5": "=A3/(A1-2)",
+            "S!A6": "=A5+1",
+            "S!A7": "=SUM(A1:A3,10)",
+        }
+    )
+
+    assert engine["S!A2"] == 4
+    assert engine["S!A3"] == 18.5
+    assert engine["S!A4"] == "big!"
+    assert engine["S!A5"] == "#DIV/0!"
+    assert engine["S!A6"] == "#DIV/0!"
+    assert engine["S!A7"] == 34.5
+
+    recalculated = engine.set_inputs({"S!A1": 3})
+    assert sorted(recalculated) == ["S!A2", "S!A4", "S!A5", "S!A6", "S!A7"]
+    assert recalculated.index("S!A5") < recalculated.index("S!A6")
+    assert engine["S!A6"] == pytest.approx(19.5)
+
+
+def test_if_evaluates_only_the_branch_taken_and_concat_formats_like_excel():
+    engine = workbook_engine.WorkbookEngine(
+        {
+            "S!A1": 0,
+            "S!B1": 5,
+            "S!A2": "=IF(A1=0,0,B1/A1)",
+            "S!A3": "=IF(A1<>0,B1/A1)",
+            "S!A4": '=1&"-"&B1/2&"-"&(A1=0)',
+            "S!A5": '=IF("text",1,2)',
+        }
+    )
+
+    assert engine["S!A2"] == 0
+    assert engine["S!A3"] is False
+    assert engine["S!A4"] == "1-2.5-TRUE"
+    assert engine["S!A5"] == "#VALUE!"
+    engine.set_inputs({"S!A1": 2})
+    assert engine["S!A2"] == 2.5
+
+
+def test_formula_overrides_and_invalid_graphs():
+    engine = workbook_engine.WorkbookEngine({"S!A1": 1, "S!A2": "=A1*2", "S!A3": "=A2+1"})
+    assert engine.set_inputs({"S!A2": "=A1*10"}) == ["S!A2", "S!A3"]
+    assert engine["S!A3"] == 11
+
+    with pytest.raises(ValueError, match="Circular"):
+        workbook_engine.WorkbookEngine({"S!A1": "=A2", "S!A2": "=A1"})
+    with pytest.raises(ValueError, match="Unsupported function"):
+        workbook_engine.WorkbookEngine({"S!A1": "=VLOOKUP(1,B1:C2,2)"})
+
+
+def test_blank_references_stay_blank_outside_arithmetic():
+    engine = workbook_engine.WorkbookEngine(
+        {"S!A1": None, "S!B1": '=A1&"x"', "S!B2": "=A1+1", "S!B3": "=-A1", "S!B4": "=A1", "S!B5": '=A1=""', "S!B6": "=A1=0"}
+    )
+
+    assert engine["S!B1"] == "x"
+    assert engine["S!B2"] == 1
+    assert engine["S!B3"] == 0
+    assert engine["S!B4"] == 0
+    assert engine["S!B5"] is True
+    assert engine["S!B6"] is True
+
+
+def test_aggregates_skip_text_in_references_but_convert_literals():
+    engine = workbook_engine.WorkbookEngine(
+        {"S!D1": "abc", "S!D2": 4, "S!E1": "=SUM(D1)", "S!E2": "=SUM(D1,D2)", "S!E3": "=COUNT(D1,D2)", "S!E4": '=SUM("3",D2)', "S!E5": "=ABS(D1)"}
+    )
+
+    assert engine["S!E1"] == 0
+    assert engine["S!E2"] == 4
+    assert engine["S!E3"] == 1
+    assert engine["S!E4"] == 7
+    assert engine["S!E5"] == "#VALUE!"
+
+
+def test_text_comparisons_ignore_case():
+    engine = workbook_engine.WorkbookEngine(
+        {"S!D1": "abc", "S!E1": '=D1="ABC"', "S!E2": '=D1<>"ABC"', "S!E3": '=D1<"abd"', "S!E4": "=D1>5"}
+    )
+
+    assert engine["S!E1"] is True
+    assert engine["S!E2"] is False
+    assert engine["S!E3"] is True
+    assert engine["S!E4"] is True
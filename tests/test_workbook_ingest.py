@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import shutil
+
+import pytest
+from openpyxl import load_workbook
+
+import model
+import workbook_ingest
+
+
+def test_ingests_directory_with_per_file_errors(tmp_path):
+    shutil.copy(model.WORKBOOK_PATH, tmp_path / "a_baseline.xlsx")
+    workbook = load_workbook(model.WORKBOOK_PATH)
+    workbook["UofA"]["C4"] = 2_000_000
+    workbook.save(tmp_path / "b_repriced.xlsx")
+    (tmp_path / "c_broken.xlsx").write_bytes(b"not a workbook")
+    (tmp_path / "~$a_baseline.xlsx").write_bytes(b"lock file")
+
+    table = workbook_ingest.ingest_workbooks(tmp_path, workers=2)
+
+    assert [path.rsplit("/", 1)[-1] for path in table["file"]] == ["a_baseline.xlsx", "b_repriced.xlsx", "c_broken.xlsx"]
+    baseline, repriced, broken = table.to_dict("records")
+    assert baseline["error"] is None
+    assert baseline["cash_flow"] == pytest.approx(model._read_cell(*model.OUTPUT_CELL_MAP["cash_flow"]))
+    assert repriced["error"] is None
+    assert repriced["purchase_price"] == 2_000_000
+    assert repriced["cap_rate"] == pytest.approx(baseline["noi"] / 2_000_000)
+    assert broken["error"].startswith("BadZipFile")
+
+
+def test_unsupported_formulas_fail_only_the_outputs_that_depend_on_them(tmp_path):
+    workbook = load_workbook(model.WORKBOOK_PATH)
+    workbook["UofA"]["Z99"] = "=VLOOKUP(1,A1:B2,2)"
+    workbook.save(tmp_path / "unrelated.xlsx")
+    workbook["UofA"]["C5"] = "=VLOOKUP(1,A1:B2,2)"
+    workbook.save(tmp_path / "mapped.xlsx")
+
+    unrelated = workbook_ingest.ingest_workbook(tmp_path / "unrelated.xlsx")
+    mapped = workbook_ingest.ingest_workbook(tmp_path / "mapped.xlsx")
+
+    assert unrelated["error"] is None
+    assert unrelated["metrics"]["cash_flow"] == pytest.approx(model._read_cell(*model.OUTPUT_CELL_MAP["cash_flow"]))
+    assert mapped["error"].startswith("ValueError: UofA!C")
+    assert "UofA!C5" in mapped["error"] and "VLOOKUP" in mapped["error"]
@@ -0,0 +1,467 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set
+
+import math
+import operator
+import re
+
+import model
+
+CellKey = str
+
+_REFERENCE_PATTERN = re.compile(
+    r"^(?:(?:'(?P<quoted>(?:[^']|'')+)'|(?P<sheet>[^!':]+))!)?"
+    r"\$?(?P<col>[A-Z]{1,3})\$?(?P<row>\d+)"
+    r"(?::\$?(?P<end_col>[A-Z]{1,3})\$?(?P<end_row>\d+))?$"
+)
+
+# Excel precedence, loosest first: comparison, concatenation, additive, multiplicative, power.
+_INFIX_POWER = {"=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1, "&": 2, "+": 3, "-": 3, "*": 4, "/": 4, "^": 5}
+_PERCENT_POWER = 6
+_PREFIX_POWER = 7
+_PYTHON_OPERATORS = {"^": "**"}
+_COMPARISONS = {"=": operator.eq, "<>": operator.ne, "<": operator.lt, ">": operator.gt, "<=": operator.le, ">=": operator.ge}
+# Functions that, like Excel, ignore text, logicals and blanks reached through a reference.
+_AGGREGATES = {"SUM", "MIN", "MAX", "AVERAGE", "COUNT", "AND", "OR"}
+
+
+class ExcelError(str):
+    pass
+
+
+class _ErrorSignal(Exception):
+    def __init__(self, error: ExcelError) -> None:
+        super().__init__(error)
+        self.error = error
+
+
+def _numbers(arguments: Iterable[Any]) -> List[float]:
+    values: List[float] = []
+    for argument in arguments:
+        # References (compiled to lists) contribute only their numbers; literal arguments are converted.
+        if isinstance(argument, list):
+            values.extend(value for value in argument if isinstance(value, (int, float)) and not isinstance(value, bool))
+        elif argument is not None:
+            values.append(float(argument))
+    return values
+
+
+def _n(value: Any) -> Any:
+    # Blank cells stay None until arithmetic needs them, where Excel reads them as zero.
+    return 0.0 if value is None else value
+
+
+def _comparable(value: Any, other: Any) -> tuple:
+    if value is None:
+        value = "" if isinstance(other, str) else False if isinstance(other, bool) else 0.0
+    # Excel orders numbers before text before logicals, and compares text without regard to case.
+    if isinstance(value, bool):
+        return (2, value)
+    if isinstance(value, str):
+        return (1, value.casefold())
+    return (0, value)
+
+
+def _compare(name: str, left: Any, right: Any) -> bool:
+    return _COMPARISONS[name](_comparable(left, right), _comparable(right, left))
+
+
+def _round(value: float, digits: int = 0) -> float:
+    factor = 10.0 ** int(digits)
+    return math.copysign(math.floor(abs(value) * factor + 0.5) / factor, value)
+
+
+def _pmt(rate: float, periods: float, present_value: float, future_value: float = 0.0, due: float = 0.0) -> float:
+    if rate == 0:
+        return -(present_value + future_value) / periods
+    growth = (1 + rate) ** periods
+    return -(rate * (present_value * growth + future_value)) / ((1 + rate * bool(due)) * (growth - 1))
+
+
+def _average(*arguments: Any) -> float:
+    values = _numbers(arguments)
+    if not values:
+        raise ZeroDivisionError
+    return sum(values) / len(values)
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        # Excel's General format: no trailing ".0", at most 15 significant digits.
+        return f"{value:.15g}".upper()
+    return str(value)
+
+
+def _concat(left: Any, right: Any) -> str:
+    return _text(left) + _text(right)
+
+
+def _condition(value: Any) -> bool:
+    if isinstance(value, str):
+        raise _ErrorSignal(ExcelError("#VALUE!"))
+    return bool(value)
+
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "SUM": lambda *arguments: sum(_numbers(arguments)),
+    "MIN": lambda *arguments: min(_numbers(arguments), default=0.0),
+    "MAX": lambda *arguments: max(_numbers(arguments), default=0.0),
+    "AVERAGE": _average,
+    "COUNT": lambda *arguments: len(_numbers(arguments)),
+    "ABS": abs,
+    "ROUND": _round,
+    "IF": lambda condition, when_true=True, when_false=False: when_true if _condition(condition) else when_false,
+    "AND": lambda *arguments: all(_numbers(arguments)),
+    "OR": lambda *arguments: any(_numbers(arguments)),
+    "NOT": lambda value: not value,
+    "PMT": _pmt,
+}
+
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+def _column_letters(number: int) -> str:
+    letters = ""
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _expand_reference(reference: str, sheet: str) -> List[CellKey]:
+    match = _REFERENCE_PATTERN.match(reference)
+    if match is None:
+        raise ValueError(f"Unsupported reference {reference!r}")
+    sheet = (match.group("quoted") or "").replace("''", "'") or match.group("sheet") or sheet
+    start_col, start_row = _column_number(match.group("col")), int(match.group("row"))
+    end_col = _column_number(match.group("end_col")) if match.group("end_col") else start_col
+    end_row = int(match.group("end_row")) if match.group("end_row") else start_row
+    return [
+        model.cell_key(sheet, f"{_column_letters(col)}{row}")
+        for row in range(min(start_row, end_row), max(start_row, end_row) + 1)
+        for col in range(min(start_col, end_col), max(start_col, end_col) + 1)
+    ]
+
+
+class _FormulaCompiler:
+    def __init__(self, formula: str, sheet: str) -> None:
+        from openpyxl.formula import Tokenizer
+
+        self.formula = formula
+        self.sheet = sheet
+        self.tokens = [token for token in Tokenizer(formula).items if token.type != "WHITE-SPACE"]
+        self.position = 0
+        self.precedents: Set[CellKey] = set()
+
+    def compile(self) -> str:
+        expression = self._expression(0)
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.position].value!r} in {self.formula!r}")
+        return expression
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise ValueError(f"Unexpected end of formula {self.formula!r}")
+        self.position += 1
+        return token
+
+    def _expression(self, minimum_power: int) -> str:
+        left = self._prefix()
+        while True:
+            token = self._peek()
+            if token is None:
+                return left
+            if token.type == "OPERATOR-POSTFIX" and _PERCENT_POWER >= minimum_power:
+                self.position += 1
+                left = f"({_numeric(left)} / 100)"
+                continue
+            power = _INFIX_POWER.get(token.value) if token.type == "OPERATOR-INFIX" else None
+            if power is None or power <= minimum_power:
+                return left
+            self.position += 1
+            right = self._expression(power)
+            if token.value == "&":
+                left = f"_concat({left}, {right})"
+            elif token.value in _COMPARISONS:
+                left = f"_compare({token.value!r}, {left}, {right})"
+            else:
+                left = f"({_numeric(left)} {_PYTHON_OPERATORS.get(token.value, token.value)} {_numeric(right)})"
+
+    def _prefix(self) -> str:
+        token = self._next()
+        if token.type == "OPERATOR-PREFIX":
+            operand = self._expression(_PREFIX_POWER)
+            return f"(-{_numeric(operand)})" if token.value == "-" else operand
+        if token.type == "OPERAND":
+            return self._operand(token)
+        if token.type == "PAREN" and token.subtype == "OPEN":
+            inner = self._expression(0)
+            self._expect("PAREN")
+            return f"({inner})"
+        if token.type == "FUNC" and token.subtype == "OPEN":
+            return self._function(token.value[:-1].upper().removeprefix("_XLFN."))
+        raise ValueError(f"Unexpected {token.value!r} in {self.formula!r}")
+
+    def _expect(self, token_type: str) -> None:
+        token = self._next()
+        if token.type != token_type or token.subtype != "CLOSE":
+            raise ValueError(f"Expected closing bracket, got {token.value!r} in {self.formula!r}")
+
+    def _function(self, name: str) -> str:
+        if name not in FUNCTIONS:
+            raise ValueError(f"Unsupported function {name} in {self.formula!r}")
+        arguments: List[str] = []
+        token = self._peek()
+        if token is not None and token.type == "FUNC" and token.subtype == "CLOSE":
+            self.position += 1
+        else:
+            while True:
+                start = self.position
+                argument = self._expression(0)
+                if name in _AGGREGATES and self.position == start + 1 and self.tokens[start].subtype == "RANGE":
+                    # A lone reference is passed as a one-cell range, so its text or blank is skipped, not converted.
+                    keys = _expand_reference(self.tokens[start].value, self.sheet)
+                    argument = f"_values({tuple(keys)!r})"
+                elif name not in _AGGREGATES and name not in ("IF", "NOT"):
+                    argument = _numeric(argument)
+                arguments.append(argument)
+                token = self._next()
+                if token.type == "SEP" and token.subtype == "ARG":
+                    continue
+                if token.type == "FUNC" and token.subtype == "CLOSE":
+                    break
+                raise ValueError(f"Unexpected {token.value!r} in {self.formula!r}")
+        if name == "IF" and 2 <= len(arguments) <= 3:
+            # Only the branch taken is evaluated, so guards like IF(A1=0,0,B1/A1) never raise from the other side.
+            when_false = arguments[2] if len(arguments) == 3 else "False"
+            return f"(({arguments[1]}) if _condition({arguments[0]}) else ({when_false}))"
+        return f"_fn[{name!r}]({', '.join(arguments)})"
+
+    def _operand(self, token) -> str:
+        if token.subtype == "NUMBER":
+            return repr(float(token.value))
+        if token.subtype == "TEXT":
+            return repr(token.value[1:-1].replace('""', '"'))
+        if token.subtype == "LOGICAL":
+            return repr(token.value.upper() == "TRUE")
+        if token.subtype == "ERROR":
+            return f"_raise({token.value!r})"
+        keys = _expand_reference(token.value, self.sheet)
+        self.precedents.update(keys)
+        if ":" in token.value:
+            return f"_values({tuple(keys)!r})"
+        return f"_cell({keys[0]!r})"
+
+
+def _numeric(expression: str) -> str:
+    try:
+        float(expression)
+    except ValueError:
+        return f"_n({expression})"
+    return expression
+
+
+def _raise(code: str) -> Any:
+    raise _ErrorSignal(ExcelError(code))
+
+
+def _unsupported(_cell: Callable[..., Any], _values: Callable[..., Any]) -> Any:
+    raise _ErrorSignal(ExcelError("#NAME?"))
+
+
+def compile_formula(formula: str, sheet: str) -> tuple[Callable[..., Any], Set[CellKey], str]:
+    compiler = _FormulaCompiler(formula, sheet)
+    source = compiler.compile()
+    namespace = {
+        "_fn": FUNCTIONS,
+        "_concat": _concat,
+        "_compare": _compare,
+        "_condition": _condition,
+        "_n": _n,
+        "_raise": _raise,
+        "__builtins__": {},
+    }
+    function = eval(f"lambda _cell, _values: {source}", namespace)
+    return function, compiler.precedents, source
+
+
+class WorkbookEngine:
+    def __init__(self, cells: Mapping[CellKey, Any], strict: bool = True) -> None:
+        self.strict = strict
+        self.unsupported: Dict[CellKey, str] = {}
+        self.values: Dict[CellKey, Any] = {}
+        self.formulas: Dict[CellKey, str] = {}
+        self.sources: Dict[CellKey, str] = {}
+        self.precedents: Dict[CellKey, Set[CellKey]] = {}
+        self.dependents: Dict[CellKey, Set[CellKey]] = {}
+        self._compiled: Dict[CellKey, Callable[..., Any]] = {}
+        self._order: Dict[CellKey, int] = {}
+        for key, value in cells.items():
+            if isinstance(value, str) and value.startswith("="):
+                self._add_formula(key, value)
+            else:
+                self.values[key] = value
+        self._sort()
+        self.recalculate()
+
+    def _add_formula(self, key: CellKey, formula: str) -> None:
+        sheet = key.rsplit("!", 1)[0]
+        try:
+            function, precedents, source = compile_formula(formula, sheet)
+        except ValueError as error:
+            if self.strict:
+                raise
+            # As in Excel's #NAME?, the error only reaches cells that actually depend on this one.
+            self.unsupported[key] = str(error)
+            function, precedents, source = _unsupported, set(), "_raise('#NAME?')"
+        self.formulas[key] = formula
+        self.sources[key] = source
+        self._compiled[key] = function
+        self.precedents[key] = precedents
+        for precedent in precedents:
+            self.dependents.setdefault(precedent, set()).add(key)
+
+    def _remove_formula(self, key: CellKey) -> None:
+        for precedent in self.precedents.pop(key, ()):
+            self.dependents[precedent].discard(key)
+        self.formulas.pop(key, None)
+        self.unsupported.pop(key, None)
+        self.sources.pop(key, None)
+        self._compiled.pop(key, None)
+
+    def _sort(self) -> None:
+        order: Dict[CellKey, int] = {}
+        visiting: Set[CellKey] = set()
+        for root in self.formulas:
+            if root in order:
+                continue
+            stack = [(root, iter(self.precedents[root]))]
+            visiting.add(root)
+            while stack:
+                key, pending = stack[-1]
+                for precedent in pending:
+                    if precedent in visiting:
+                        raise ValueError(f"Circular reference through {precedent}")
+                    if precedent in self.formulas and precedent not in order:
+                        visiting.add(precedent)
+                        stack.append((precedent, iter(self.precedents[precedent])))
+                        break
+                else:
+                    stack.pop()
+                    visiting.discard(key)
+                    order[key] = len(order)
+        self._order = order
+
+    def _cell(self, key: CellKey) -> Any:
+        value = self.values.get(key)
+        if isinstance(value, ExcelError):
+            raise _ErrorSignal(value)
+        return value
+
+    def _values(self, keys: tuple) -> List[Any]:
+        values = [self.values.get(key) for key in keys]
+        for value in values:
+            if isinstance(value, ExcelError):
+                raise _ErrorSignal(value)
+        return values
+
+    def _evaluate(self, key: CellKey) -> None:
+        try:
+            value = self._compiled[key](self._cell, self._values)
+        except _ErrorSignal as signal:
+            value = signal.error
+        except ZeroDivisionError:
+            value = ExcelError("#DIV/0!")
+        except (TypeError, ValueError, OverflowError):
+            value = ExcelError("#VALUE!")
+        # A formula that only passes a blank through, like =A1, displays 0.
+        self.values[key] = 0.0 if value is None else value
+
+    def __getitem__(self, key: CellKey) -> Any:
+        return self.values.get(key)
+
+    def get(self, sheet: str, cell: str) -> Any:
+        return self.values.get(model.cell_key(sheet, cell))
+
+    def inputs(self) -> List[CellKey]:
+        return sorted(key for key in self.dependents if key not in self.formulas and self.dependents[key])
+
+    def upstream(self, keys: Iterable[CellKey]) -> Set[CellKey]:
+        found: Set[CellKey] = set()
+        pending = list(keys)
+        while pending:
+            for precedent in self.precedents.get(pending.pop(), ()):
+                if precedent not in found:
+                    found.add(precedent)
+                    pending.append(precedent)
+        return found
+
+    def downstream(self, keys: Iterable[CellKey]) -> List[CellKey]:
+        affected: Set[CellKey] = set()
+        pending = list(keys)
+        while pending:
+            for dependent in self.dependents.get(pending.pop(), ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    pending.append(dependent)
+        return sorted(affected, key=self._order.__getitem__)
+
+    def recalculate(self) -> None:
+        for key in sorted(self._order, key=self._order.__getitem__):
+            self._evaluate(key)
+
+    def set_inputs(self, changes: Mapping[CellKey, Any]) -> List[CellKey]:
+        resorted = False
+        for key, value in changes.items():
+            if isinstance(value, str) and value.startswith("="):
+                self._remove_formula(key)
+                self._add_formula(key, value)
+                resorted = True
+            else:
+                if key in self.formulas:
+                    self._remove_formula(key)
+                    resorted = True
+                self.values[key] = value
+        if resorted:
+            self._sort()
+        # Only the changed formulas and the transitive dependents of everything changed are re-evaluated.
+        targets = set(self.downstream(changes)).union(key for key in changes if key in self.formulas)
+        recalculated = sorted(targets, key=self._order.__getitem__)
+        for key in recalculated:
+            self._evaluate(key)
+        return recalculated
+
+
+def _read_workbook_cells(path: Path) -> Dict[CellKey, Any]:
+    from openpyxl import load_workbook
+
+    cells: Dict[CellKey, Any] = {}
+    workbook = load_workbook(path, read_only=True, data_only=False)
+    try:
+        for worksheet in workbook.worksheets:
+            for row in worksheet.iter_rows():
+                for cell in row:
+                    if cell.value is not None and hasattr(cell, "coordinate"):
+                        cells[model.cell_key(worksheet.title, cell.coordinate)] = cell.value
+    finally:
+        workbook.close()
+    return cells
+
+
+def load_workbook_engine(path: Optional[Path] = None, strict: bool = True) -> WorkbookEngine:
+    return WorkbookEngine(_read_workbook_cells(path or model.WORKBOOK_PATH), strict=strict)
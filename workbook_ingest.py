@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+import os
+
+import pandas as pd
+
+import model
+
+WORKBOOK_PATTERNS = ("*.xlsx", "*.xlsm")
+_METRIC_COLUMNS = ("noi", "cash_flow", "cash_on_cash", "dscr", "cap_rate", "debt_service_annual", "equity_required", "total_loan")
+
+
+def find_workbooks(directory: str | Path, patterns: Iterable[str] = WORKBOOK_PATTERNS) -> List[Path]:
+    root = Path(directory)
+    files = {path for pattern in patterns for path in root.glob(pattern) if not path.name.startswith("~$")}
+    return sorted(files)
+
+
+def _workbook_cells(path: Path) -> Dict[str, Any]:
+    cells = model.extract_cells(path)
+    if any(value is None for value in cells.values()):
+        # Workbooks saved by tools other than Excel carry no cached formula results; recompute the gaps.
+        import workbook_engine
+
+        # Formulas the engine cannot compile only matter if a mapped cell actually depends on them.
+        engine = workbook_engine.load_workbook_engine(path, strict=False)
+        for key, value in cells.items():
+            if value is None:
+                blocked = sorted(engine.unsupported.keys() & ({key} | engine.upstream([key])))
+                if blocked:
+                    raise ValueError(f"{key} cannot be computed; {blocked[0]}: {engine.unsupported[blocked[0]]}")
+                cells[key] = engine[key]
+    return cells
+
+
+def ingest_workbook(path: str | Path) -> Dict[str, Any]:
+    path = Path(path)
+    try:
+        cells = _workbook_cells(path)
+        assumptions = model.build_baseline_assumptions(lambda sheet, cell: cells[model.cell_key(sheet, cell)])
+        metrics = model.calculate_metrics(assumptions)
+    except Exception as error:
+        return {"file": str(path), "error": f"{type(error).__name__}: {error}", "assumptions": None, "metrics": None}
+    return {"file": str(path), "error": None, "assumptions": assumptions, "metrics": metrics}
+
+
+def iter_ingested(paths: Iterable[str | Path], workers: int | None = None) -> Iterator[Dict[str, Any]]:
+    paths = [Path(path) for path in paths]
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        yield from map(ingest_workbook, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(ingest_workbook, paths, chunksize=max(1, len(paths) // (workers * 4)))
+
+
+def ingest_workbooks(
+    source: str | Path | Iterable[str | Path],
+    workers: int | None = None,
+    patterns: Iterable[str] = WORKBOOK_PATTERNS,
+) -> pd.DataFrame:
+    paths = find_workbooks(source, patterns) if isinstance(source, (str, Path)) else list(source)
+    rows: List[Dict[str, Any]] = []
+    for result in iter_ingested(paths, workers):
+        row: Dict[str, Any] = {"file": result["file"], "error": result["error"]}
+        if result["error"] is None:
+            row.update(model.scenario_record(result["assumptions"]))
+            row.update({name: result["metrics"][name] for name in _METRIC_COLUMNS})
+        rows.append(row)
+    return pd.DataFrame(rows, columns=None if rows else ["file", "error"])